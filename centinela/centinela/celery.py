@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 
 # Establecer el módulo de configuración de Django para el programa 'celery'
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'centinela.settings')
@@ -14,6 +15,22 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Cargar módulos de tareas de todas las aplicaciones Django registradas
 app.autodiscover_tasks()
 
+@celeryd_init.connect
+def dimensionar_worker(sender=None, conf=None, options=None, **kwargs):
+    """
+    Si el worker se lanza sin --concurrency, se dimensiona según los cupos que
+    declaran en el registro los módulos de las colas que atiende (-Q).
+    """
+    options = options or {}
+    if options.get('concurrency'):
+        return
+    colas = options.get('queues') or [conf.task_default_queue]
+    if isinstance(colas, str):
+        colas = colas.split(',')
+    from scanner import registry
+    conf.worker_concurrency = registry.concurrencia_para_colas(colas)
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
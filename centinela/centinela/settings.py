@@ -144,6 +144,77 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché (Redis, base 1 para no mezclarse con el broker en la base 0)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://redis_broker:6379/1'),
+        'KEY_PREFIX': 'centinela',
+    }
+}
+
+# TTL (segundos) de la caché de resultados por módulo. 0 = no se cachea.
+# DNS usa además el menor TTL de los registros resueltos como tope.
+SCANNER_CACHE_TTL = {
+    'whois': 7 * 24 * 60 * 60,  # 7 días por dominio registrado (acotado por la fecha de expiración)
+    'dns': 60 * 60,             # máximo 1 hora
+    'ssl': 6 * 60 * 60,         # 6 horas
+    'headers': 60 * 60,         # 1 hora
+    'dorks': 24 * 60 * 60,      # 1 día
+    'nmap': 30 * 60,            # 30 minutos
+    'subdomains': 12 * 60 * 60, # 12 horas
+}
+
+# Modo asyncio: los módulos de I/O (costo "io" en el registro) de un escaneo se
+# ejecutan juntos en una sola tarea, concurrentes sobre un event loop.
+SCANNER_IO_ASYNC = True
+
+# Limitador de tasa (token bucket en Redis) por destino: (capacidad, tokens por segundo).
+# Cada módulo declara en MODULO["limites"] cuántos tokens consume de cada destino.
+SCANNER_RATELIMIT_URL = os.getenv('RATELIMIT_URL', 'redis://redis_broker:6379/2')
+SCANNER_RATE_LIMITS = {
+    'host': (5, 1.0),          # por objetivo: ráfaga de 5, luego 1 por segundo
+    'whois': (3, 0.2),         # por servidor whois del registro: 1 cada 5 segundos
+    'google_cse': (10, 0.1),   # API key de Google CSE: 1 consulta cada 10 segundos
+}
+
+# Planificador fair-share: cupo de tareas en vuelo por usuario y prioridad de cada carril
+# (0 es la más alta en el transporte Redis de Celery)
+SCANNER_FAIRSHARE_URL = os.getenv('FAIRSHARE_URL', 'redis://redis_broker:6379/2')
+SCANNER_FAIRSHARE_CUPO = 4
+SCANNER_FAIRSHARE_TTL = 60 * 60  # si un worker muere, su cupo se recupera a la hora
+SCANNER_PRIORIDAD_CARRIL = {
+    'interactivo': 0,
+    'programado': 3,
+    'masivo': 6,
+}
+
+# Coalescencia: ejecuciones idénticas (módulo + objetivo) en vuelo se comparten entre escaneos
+SCANNER_COALESCENCIA_URL = os.getenv('COALESCENCIA_URL', 'redis://redis_broker:6379/2')
+
+# Caché DNS compartida por los módulos (dns, ssl, nmap): LRU en cada proceso + Redis
+SCANNER_DNSCACHE_URL = os.getenv('DNS_CACHE_URL', 'redis://redis_broker:6379/2')
+
+# Motor de dorks (scanner/modulos/motor_dorks.py): caché de respuestas de Google CSE por
+# consulta y libro de cuota diaria, compartidos por todos los workers
+SCANNER_DORKS_URL = os.getenv('DORKS_CACHE_URL', 'redis://redis_broker:6379/2')
+
+# Re-escaneo incremental (módulos con "incremental" en su MODULO, p. ej. nmap): cuánto hacia
+# atrás se busca un resultado previo del mismo objetivo para reutilizar lo que siga vigente.
+# 0 lo desactiva; "Forzar escaneo nuevo" también.
+SCANNER_INCREMENTAL_VENTANA = 7 * 24 * 60 * 60  # 7 días
+
+# Escaneos masivos: máximo de objetivos por lote y tamaño de cada tanda (INSERT + encolado)
+SCANNER_LOTE_MAX = 10000
+SCANNER_LOTE_CHUNK = 500
+
+# Objetivos de red (CIDR o rango): tope de hosts por objetivo y reparto en fragmentos.
+# Cada fragmento es una tarea propia en la cola del módulo (nmap: heavy), así que suman
+# todos los workers de esa cola; el cupo fair-share del usuario acota cuántos van a la vez.
+SCANNER_RED_MAX_HOSTS = 65536        # una /16
+SCANNER_FRAGMENTO_HOSTS = 64         # direcciones por fragmento
+SCANNER_FRAGMENTO_REINTENTOS = 2     # reintentos de un fragmento fallido (solo ese fragmento)
+
 # Configuración de Celery
 # Broker URL (Redis recomendado para producción)
 CELERY_BROKER_URL = 'redis://redis_broker:6379/0'
@@ -163,18 +234,34 @@ CELERY_TASK_DEFAULT_QUEUE = 'default'
 CELERY_TASK_DEFAULT_EXCHANGE = 'default'
 CELERY_TASK_DEFAULT_ROUTING_KEY = 'default'
 
+# Prioridad de mensajes en Redis: cada cola se divide en sub-colas por prioridad y
+# el worker (con prefetch 1) siempre toma primero la de mayor prioridad
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
 # Configuración adicional
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutos
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
 
-# TODOS los tasks van a la cola "default" excepto nmap que va a "heavy"
+# Cola por defecto de las tareas. La cola de cada módulo (default, heavy, ...) la declara
+# el propio módulo en su MODULO y se aplica al despachar (ver scanner/registry.py)
 CELERY_TASK_ROUTES = {
     'scanner.tasks.run_modulo_task': {
         'queue': 'default',
 
     },
+    # Orquestador: tarea corta, solo toca la base de datos
+    'scanner.tasks.start_scan': {'queue': 'default'},
+    'scanner.tasks.start_lote': {'queue': 'default'},
+    'scanner.tasks.run_modulos_io_task': {'queue': 'default'},
+    'scanner.tasks.vigilar_suscripcion': {'queue': 'default'},
+    # Fragmentos de una red: la cola real (la del módulo) se fija al despachar
+    'scanner.tasks.run_fragmento_task': {'queue': 'heavy'},
 }
 
 
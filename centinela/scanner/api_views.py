@@ -1,12 +1,24 @@
-from rest_framework import viewsets, serializers
-from rest_framework.permissions import IsAuthenticated
-from .models import resultadoModulo
+from rest_framework import mixins, status, viewsets, serializers
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import certificados, registry
+from .forms import BulkScanForm, opciones_modulos
+from .lotes import crear_lote
+from .models import Certificado, LoteEscaneo, TextoCrudo, resultadoModulo
+from .modulos import dnscache, motor_dorks
 
 # Serializador
 class ResultadoModuloSerializer(serializers.ModelSerializer):
+    fragmentos = serializers.SerializerMethodField()
+
     class Meta:
         model = resultadoModulo
-        fields = ['id', 'escaneo', 'nombre_modulo', 'estado', 'resultado', 'fecha_ejecucion']
+        fields = ['id', 'escaneo', 'nombre_modulo', 'estado', 'resultado', 'resultado_parcial', 'fragmentos', 'fecha_ejecucion']
+
+    def get_fragmentos(self, resultado):
+        # Solo los módulos repartidos sobre una red: avance y hosts/minuto
+        return resultado.resumen_fragmentos() if resultado.fragmentos_total else None
 
 # ViewSet
 class ResultadoModuloViewSet(viewsets.ModelViewSet):
@@ -28,3 +40,134 @@ class ResultadoModuloViewSet(viewsets.ModelViewSet):
             qs = qs.filter(escaneo__id=escaneo_id)
 
         return qs
+
+    def list(self, request, *args, **kwargs):
+        filas = list(self.filter_queryset(self.get_queryset()))
+        # Las huellas de certificados se reemplazan por sus datos: una consulta para todas las filas
+        certificados.hidratar(fila.resultado for fila in filas)
+        return Response(self.get_serializer(filas, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        fila = self.get_object()
+        certificados.hidratar([fila.resultado])
+        return Response(self.get_serializer(fila).data)
+
+
+# Certificados y textos crudos se comparten por huella entre usuarios: quien no es admin solo
+# abre los que aparecen en resultados de sus propios escaneos (la huella va como texto en el JSON)
+def _referenciados(vista, qs, modulos):
+    if vista.request.user.is_staff:
+        return qs
+    huella = vista.kwargs.get(vista.lookup_url_kwarg or vista.lookup_field, '')
+    visible = resultadoModulo.objects.filter(
+        escaneo__user=vista.request.user, nombre_modulo__in=modulos, resultado__icontains=huella,
+    ).exists()
+    return qs if visible else qs.none()
+
+
+# Serializador de certificados (almacén compartido por huella SHA-256)
+class CertificadoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Certificado
+        fields = ['sha256', 'pem', 'datos', 'fecha_registro']
+
+
+# ViewSet de certificados: solo lectura, por huella (el PEM no viaja dentro de cada resultado)
+class CertificadoViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CertificadoSerializer
+    lookup_value_regex = '[0-9a-f]{64}'
+
+    def get_queryset(self):
+        return _referenciados(self, Certificado.objects.all(), [s.nombre for s in registry.todos() if s.certificados])
+
+
+# Serializador de textos crudos (whois): se descomprimen solo aquí
+class TextoCrudoSerializer(serializers.ModelSerializer):
+    texto = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TextoCrudo
+        fields = ['sha256', 'tamano', 'texto', 'fecha_registro']
+
+    def get_texto(self, texto):
+        return texto.texto()
+
+
+# ViewSet de textos crudos: solo lectura, por huella (los resultados guardan solo la referencia)
+class TextoCrudoViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = TextoCrudoSerializer
+    lookup_value_regex = '[0-9a-f]{64}'
+
+    def get_queryset(self):
+        return _referenciados(self, TextoCrudo.objects.all(), [s.nombre for s in registry.todos() if s.textos])
+
+
+# Serializador de lotes (escaneos masivos)
+class LoteEscaneoSerializer(serializers.ModelSerializer):
+    progreso = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LoteEscaneo
+        fields = ['id', 'modulos', 'total_objetivos', 'rechazados', 'fecha_creacion', 'progreso']
+
+    def get_progreso(self, lote):
+        return lote.progreso()
+
+
+# ViewSet de lotes
+class LoteEscaneoViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = LoteEscaneoSerializer
+    """
+    Escaneos masivos. POST recibe "objetivos" (lista o texto, uno por línea) y/o un
+    "archivo" CSV, más "modules" y "forzar" opcional. GET /lotes/<id>/ devuelve el
+    progreso del lote (completados, fallidos, pendientes) con una sola consulta agregada.
+    """
+
+    def get_queryset(self):
+        qs = LoteEscaneo.objects.con_progreso()
+        if not self.request.user.is_staff:  # si no es admin
+            qs = qs.filter(user=self.request.user)
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        if hasattr(request.data, 'getlist'):  # formulario / multipart (el CSV viene en request.FILES)
+            datos = request.POST
+        else:  # JSON: "objetivos" puede ser una lista
+            datos = dict(request.data)
+            if isinstance(datos.get('objetivos'), list):
+                datos['objetivos'] = '\n'.join(str(o) for o in datos['objetivos'])
+
+        form = BulkScanForm(datos, request.FILES)
+        if not form.is_valid():
+            return Response(form.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        lote = crear_lote(request.user, form.iterar_objetivos(), form.cleaned_data['modules'], form.cleaned_data['forzar'],
+                          opciones_modulos(form.cleaned_data))
+        return Response(self.get_serializer(lote).data, status=status.HTTP_201_CREATED)
+
+
+# Contadores de la caché DNS compartida (solo administradores)
+class DNSCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    """
+    GET /dnscache/ devuelve los hit/miss de la caché DNS: los globales (todos los
+    workers, acumulados en Redis) y los de este proceso.
+    """
+
+    def get(self, request):
+        return Response(dnscache.estadisticas())
+
+
+# Libro de cuota de Google CSE del motor de dorks (solo administradores)
+class DorksCuotaView(APIView):
+    permission_classes = [IsAdminUser]
+    """
+    GET /dorks/cuota/ devuelve el uso del día según el libro de cuota compartido
+    (consultas hechas, presupuesto diario y lo que queda).
+    """
+
+    def get(self, request):
+        return Response(motor_dorks.cuota())
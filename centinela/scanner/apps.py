@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ScannerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scanner'
+
+    def ready(self):
+        # La caché DNS y el motor de dorks no importan Django: se les pasa la URL de Redis aquí
+        from django.conf import settings
+        from .modulos import dnscache, motor_dorks
+        dnscache.configurar(settings.SCANNER_DNSCACHE_URL)
+        motor_dorks.configurar(settings.SCANNER_DORKS_URL)
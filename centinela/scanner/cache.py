@@ -0,0 +1,92 @@
+# Caché de resultados por (módulo, objetivo), compartida entre usuarios y escaneos
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import registry
+
+
+def _cache():
+    return caches[getattr(settings, 'SCANNER_CACHE_ALIAS', 'default')]
+
+
+def _ttl_config(modulo: str) -> int:
+    """TTL configurado (segundos) para el módulo. 0 = no se cachea."""
+    return int(getattr(settings, 'SCANNER_CACHE_TTL', {}).get(modulo, 0))
+
+
+def clave(modulo: str, objetivo: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Clave de caché normalizada (el objetivo no distingue mayúsculas ni punto final).
+    Las opciones del módulo (p. ej. el perfil de puertos de nmap) son parte de la clave;
+    sin opciones la clave es la de siempre. Los módulos con clave_cache comparten la
+    entrada entre objetivos (whois: todos los subdominios de un dominio registrado).
+    """
+    objetivo = registry.objetivo_compartido(modulo, objetivo.strip().lower().rstrip('.'))
+    if opciones:
+        objetivo += '|' + json.dumps(opciones, sort_keys=True)
+    digest = hashlib.sha1(objetivo.encode('utf-8')).hexdigest()
+    return f"resultado:{modulo}:{digest}"
+
+
+def ttl_para(modulo: str, resultado: Any) -> int:
+    """
+    TTL con el que se guarda un resultado. Para DNS se respeta el menor TTL de los
+    registros resueltos, acotado por el máximo configurado. Whois no se guarda más
+    allá de la expiración del dominio (ahí cambia lo que responde el registro), y un
+    dominio ya vencido no se guarda: puede estar por liberarse o renovarse en cualquier momento.
+    """
+    ttl = _ttl_config(modulo)
+    if modulo == 'dns' and isinstance(resultado, dict):
+        ttls = [t for t in resultado.get('meta', {}).get('ttl', {}).values() if t]
+        if ttls:
+            ttl = min(ttl, min(ttls))
+    if modulo == 'whois' and isinstance(resultado, dict):
+        restante = _segundos_hasta(resultado.get('expiration_date'))
+        if restante is not None:
+            ttl = min(ttl, max(restante, 0))
+    return ttl
+
+
+def _segundos_hasta(fechas: Any) -> Optional[int]:
+    """Segundos hasta la primera fecha ISO (o lista de fechas) que se pueda leer; None si no hay."""
+    ahora = datetime.now(timezone.utc)
+    restantes = []
+    for fecha in fechas if isinstance(fechas, list) else [fechas]:
+        try:
+            f = datetime.fromisoformat(fecha)
+        except (TypeError, ValueError):
+            continue
+        f = f if f.tzinfo else f.replace(tzinfo=timezone.utc)
+        restantes.append(int((f - ahora).total_seconds()))
+    return min(restantes) if restantes else None
+
+
+def obtener_varios(ternas: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """
+    Busca en una sola ida a la caché los resultados de varios (modulo, objetivo, opciones).
+    Devuelve {clave(modulo, objetivo, opciones): resultado} solo con los encontrados.
+    """
+    claves = [clave(m, o, opc) for m, o, opc in ternas if _ttl_config(m) > 0]
+    if not claves:
+        return {}
+    return _cache().get_many(claves)
+
+
+def guardar(modulo: str, objetivo: str, resultado: Any, opciones: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    Guarda un resultado exitoso. Los resultados con error o incompletos (p. ej. dorks
+    sin cuota para todas las plantillas) no se cachean.
+    Devuelve el TTL usado o None si no se guardó.
+    """
+    if isinstance(resultado, dict) and ('error' in resultado or resultado.get('incomplete')):
+        return None
+    ttl = ttl_para(modulo, resultado)
+    if ttl <= 0:
+        return None
+    _cache().set(clave(modulo, objetivo, opciones), resultado, timeout=ttl)
+    return ttl
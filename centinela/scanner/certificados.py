@@ -0,0 +1,68 @@
+# Almacén de certificados TLS compartido entre resultados
+#
+# Los módulos con MODULO["certificados"] devuelven cada certificado completo (huella
+# sha256, campos parseados y raw_pem). Antes de guardar el resultado, extraer() manda
+# esos datos a la tabla Certificado (una fila por huella, se inserta solo si no estaba)
+# y en el resultado deja {"certificado": <sha256>, ...} con lo propio del escaneo
+# (vigencia, protocolo, cadena). Al leer, hidratar() vuelve a armar la forma original
+# con una sola consulta para todas las filas.
+from typing import Any, Dict, Iterable, Iterator
+
+from .models import Certificado
+from .modulos.scan_ssl import CAMPOS_CERTIFICADO
+
+REFERENCIA = "certificado"
+
+
+def _recorrer(valor: Any) -> Iterator[Dict[str, Any]]:
+    """Todos los dicts anidados en un resultado (dicts y listas), el propio incluido."""
+    if isinstance(valor, dict):
+        yield valor
+        for v in valor.values():
+            yield from _recorrer(v)
+    elif isinstance(valor, list):
+        for v in valor:
+            yield from _recorrer(v)
+
+
+def extraer(resultado: Any) -> Any:
+    """
+    Mueve los certificados completos del resultado al almacén y los reemplaza por su
+    huella. Modifica el resultado en el lugar y lo devuelve. Es idempotente: lo que ya
+    es una referencia no se toca.
+    """
+    nuevos = {}
+    for d in list(_recorrer(resultado)):
+        if "sha256" not in d or "raw_pem" not in d:
+            continue
+        sha256 = d.pop("sha256")
+        pem = d.pop("raw_pem")
+        datos = {campo: d.pop(campo) for campo in CAMPOS_CERTIFICADO if campo in d}
+        nuevos.setdefault(sha256, Certificado(sha256=sha256, pem=pem, datos=datos))
+        d[REFERENCIA] = sha256
+    if nuevos:
+        Certificado.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+    return resultado
+
+
+def hidratar(resultados: Iterable[Any], pem: bool = False) -> None:
+    """
+    Inverso de extraer() para varios resultados a la vez (una consulta en total):
+    cada referencia vuelve a traer sha256 y los campos del certificado, y raw_pem si pem=True.
+    """
+    referencias = [d for r in resultados for d in _recorrer(r) if isinstance(d.get(REFERENCIA), str)]
+    if not referencias:
+        return
+    campos = ["sha256", "datos", "pem"] if pem else ["sha256", "datos"]
+    almacen = {
+        c.sha256: c
+        for c in Certificado.objects.filter(sha256__in={d[REFERENCIA] for d in referencias}).only(*campos)
+    }
+    for d in referencias:
+        cert = almacen.get(d[REFERENCIA])
+        if cert is None:
+            continue
+        d.update(cert.datos)
+        d["sha256"] = cert.sha256
+        if pem:
+            d["raw_pem"] = cert.pem
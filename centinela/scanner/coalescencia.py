@@ -0,0 +1,76 @@
+# Coalescencia de ejecuciones idénticas en vuelo
+#
+# Si llega un (módulo, objetivo, opciones) que ya se está ejecutando, la nueva
+# fila de resultadoModulo no lanza otra ejecución: se suscribe a la que está en
+# curso y se llena con su resultado cuando termina. A diferencia de la caché de
+# resultados, esto cubre la ventana en que todavía no existe ningún resultado.
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from typing import List
+
+import redis
+from django.conf import settings
+
+from . import registry
+
+logger = logging.getLogger(__name__)
+
+# Toma la ejecución (si nadie la tiene o ya era nuestra) o suscribe la fila a la que está en curso.
+# KEYS: [clave del dueño, set de suscriptores]. ARGV: [resultado_id, ttl]. Devuelve 1 = dueño, 0 = suscrito.
+_TOMAR_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return 1
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 0
+"""
+
+# Libera la ejecución y devuelve los suscriptores, todo atómico: una fila que se
+# suscribe después de esto ya no encuentra dueño y pasa a ser la nueva dueña.
+_CERRAR_LUA = """
+local suscriptores = redis.call('SMEMBERS', KEYS[2])
+redis.call('DEL', KEYS[1], KEYS[2])
+return suscriptores
+"""
+
+
+@lru_cache(maxsize=None)
+def _scripts():
+    cliente = redis.Redis.from_url(settings.SCANNER_COALESCENCIA_URL)
+    return cliente.register_script(_TOMAR_LUA), cliente.register_script(_CERRAR_LUA)
+
+
+def _claves(modulo, objetivo, opciones=None):
+    objetivo = registry.objetivo_compartido(modulo, objetivo.strip().lower().rstrip('.'))
+    firma = json.dumps([objetivo, opciones or {}], sort_keys=True)
+    base = f"envuelo:{modulo}:{hashlib.sha1(firma.encode('utf-8')).hexdigest()}"
+    return [base, f"{base}:subs"]
+
+
+def tomar_o_suscribir(modulo, objetivo, resultado_id, ttl, opciones=None) -> bool:
+    """
+    True si esta fila debe ejecutar el módulo (es la dueña); False si quedó suscrita
+    a una ejecución idéntica en curso. Si Redis no responde, cada fila ejecuta lo suyo.
+    """
+    try:
+        tomar, _ = _scripts()
+        return bool(tomar(keys=_claves(modulo, objetivo, opciones), args=[resultado_id, ttl]))
+    except redis.RedisError as e:
+        logger.warning("Coalescencia no disponible, se ejecuta sin coalescer: %s", e)
+        return True
+
+
+def cerrar(modulo, objetivo, opciones=None) -> List[int]:
+    """Libera la ejecución y devuelve los ids de resultadoModulo suscritos a ella."""
+    try:
+        _, cerrar_lua = _scripts()
+        return [int(x) for x in cerrar_lua(keys=_claves(modulo, objetivo, opciones))]
+    except redis.RedisError as e:
+        logger.warning("Coalescencia no disponible: %s", e)
+        return []
@@ -4,10 +4,16 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
 #-----------librerias para el validador-----------
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_ipv4_address, validate_ipv6_address
+import csv
+import io
 import re
 
+from . import registry
+from .modulos import barrido, motor_dorks, redes, scan_nmap
+
 
 #-----------formulario personalizado para el registro de usuarios-----------
 class CustomUserCreationForm(UserCreationForm):
@@ -41,6 +47,16 @@ def validate_ip_or_domain(value):
         return
     except ValidationError:
         pass
+
+    # Intentar validar como red (CIDR o rango), con tope de hosts
+    try:
+        hosts = redes.cantidad_hosts(value)
+    except ValueError:
+        pass
+    else:
+        if hosts > settings.SCANNER_RED_MAX_HOSTS:
+            raise ValidationError(f'La red tiene {hosts} hosts; el máximo es {settings.SCANNER_RED_MAX_HOSTS}')
+        return
     
     # Validar como dominio
     domain_pattern = r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
@@ -48,25 +64,145 @@ def validate_ip_or_domain(value):
         return
     
     # Si no es ninguno, error
-    raise ValidationError('Ingresa una IP válida (IPv4/IPv6) o un dominio válido')
+    raise ValidationError('Ingresa una IP válida (IPv4/IPv6), una red (CIDR o rango) o un dominio válido')
 
 
-MODULE_CHOICES = [
-    ('dns','DNS'),
-    ('dorks', 'Dorks'),
-    ('headers', 'Headers HTTP'),
-    ('nmap', 'Nmap'),
-    ('ssl', 'SSL'),
-    ('whois', 'Whois'),
-    
-]
+def tipo_objetivo(value):
+    """Clasifica un objetivo ya validado como 'ip', 'red' o 'dominio' (tipos del registro de módulos)."""
+    try:
+        validate_ipv4_address(value)
+        return 'ip'
+    except ValidationError:
+        pass
+    try:
+        validate_ipv6_address(value)
+        return 'ip'
+    except ValidationError:
+        pass
+    return 'red' if redes.es_red(value) else 'dominio'
+
+
+# Las opciones salen del registro de módulos (cada scan_*.py declara su MODULO)
+MODULE_CHOICES = registry.choices()
+
+# Perfiles de puertos de nmap (scanner/modulos/scan_nmap.py) más "custom" con lista propia
+PERFIL_CHOICES = [(p, p) for p in scan_nmap.PERFILES] + [('custom', 'custom')]
+
+# Conjuntos de plantillas de dorks (scanner/modulos/plantillas_dorks/ y los de DORKS_PLANTILLAS)
+DORKS_CHOICES = [(c, c) for c in motor_dorks.conjuntos()]
+
+
+def validar_perfil_puertos(cleaned_data):
+    """El perfil custom exige una lista de puertos válida (estilo nmap: 22,80,8000-8100)."""
+    if cleaned_data.get('perfil') != 'custom':
+        return
+    puertos = cleaned_data.get('puertos')
+    if not puertos:
+        raise ValidationError('El perfil custom necesita una lista de puertos')
+    try:
+        barrido.parsear_puertos(puertos)
+    except ValueError:
+        raise ValidationError('Lista de puertos inválida (ejemplo: 22,80,8000-8100)')
+
+
+def opciones_modulos(cleaned_data):
+    """
+    Opciones por módulo que se guardan en Escaneo.opciones. El perfil por defecto no
+    se guarda, así esos escaneos comparten caché con los de siempre.
+    """
+    opciones = {}
+    perfil = cleaned_data.get('perfil') or scan_nmap.PERFIL_DEFECTO
+    if 'nmap' in (cleaned_data.get('modules') or []) and perfil != scan_nmap.PERFIL_DEFECTO:
+        opciones['nmap'] = {'perfil': perfil}
+        if perfil == 'custom':
+            opciones['nmap']['puertos'] = cleaned_data['puertos']
+    if 'ssl' in (cleaned_data.get('modules') or []):
+        ssl = {clave: True for clave in ('extendido', 'barrido') if cleaned_data.get(f'ssl_{clave}')}
+        if ssl:
+            opciones['ssl'] = ssl
+    if 'dorks' in (cleaned_data.get('modules') or []):
+        dorks = {}
+        conjunto = cleaned_data.get('dorks_plantillas') or motor_dorks.CONJUNTO_DEFECTO
+        if conjunto != motor_dorks.CONJUNTO_DEFECTO:
+            dorks['plantillas'] = conjunto
+        if cleaned_data.get('dorks_resultados'):
+            # pedir más resultados por dork deja sin efecto el tope global de 5
+            dorks.update(results_per_dork=cleaned_data['dorks_resultados'], max_total_results=None)
+        if dorks:
+            opciones['dorks'] = dorks
+    return opciones
+
 
 class ScanForm(forms.Form):
-    target = forms.CharField(label="Dominio o IP", max_length=100, validators=[validate_ip_or_domain])
+    target = forms.CharField(label="Dominio, IP o red", max_length=100, validators=[validate_ip_or_domain])
     modules = forms.MultipleChoiceField(
         choices=MODULE_CHOICES,
         widget=forms.CheckboxSelectMultiple,
         required=True,  # Cambiar a True
         error_messages={'required': 'Debes seleccionar al menos un módulo'}
 
-    )
\ No newline at end of file
+    )
+    forzar = forms.BooleanField(label="Forzar escaneo nuevo (ignorar caché)", required=False)
+    perfil = forms.ChoiceField(label="Perfil de puertos (Nmap)", choices=PERFIL_CHOICES, required=False)
+    puertos = forms.CharField(label="Puertos (perfil custom)", max_length=500, required=False)
+    ssl_extendido = forms.BooleanField(label="SSL extendido (cadena, protocolos y cifrados)", required=False)
+    ssl_barrido = forms.BooleanField(label="SSL barrido (puertos TLS x nombres SAN)", required=False)
+    dorks_plantillas = forms.ChoiceField(label="Plantillas de dorks", choices=DORKS_CHOICES, required=False)
+    dorks_resultados = forms.IntegerField(label="Resultados por dork", min_value=1, max_value=motor_dorks.RESULTADOS_MAX, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        validar_perfil_puertos(cleaned_data)
+        target = cleaned_data.get('target')
+        modules = cleaned_data.get('modules') or []
+        if target:
+            tipo = tipo_objetivo(target)
+            no_aplican = [m for m in modules if not registry.obtener(m).acepta(tipo)]
+            if no_aplican:
+                raise ValidationError(f'Los módulos {", ".join(no_aplican)} no aceptan objetivos de tipo {tipo}')
+        return cleaned_data
+
+
+#-----------formulario para escaneos masivos (lotes)-----------
+
+def iterar_objetivos(texto='', archivo=None):
+    """
+    Recorre los objetivos de un lote sin cargarlos todos en memoria: uno por línea
+    en `texto` y la primera columna de cada fila del CSV `archivo`.
+    """
+    for linea in (texto or '').splitlines():
+        if linea.strip():
+            yield linea.strip()
+    if archivo is not None:
+        archivo.seek(0)
+        for fila in csv.reader(io.TextIOWrapper(archivo, encoding='utf-8-sig', errors='replace')):
+            if fila and fila[0].strip():
+                yield fila[0].strip()
+
+
+class BulkScanForm(forms.Form):
+    objetivos = forms.CharField(label="Objetivos (uno por línea)", widget=forms.Textarea, required=False)
+    archivo = forms.FileField(label="o archivo CSV (objetivo en la primera columna)", required=False)
+    modules = forms.MultipleChoiceField(
+        choices=MODULE_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        required=True,
+        error_messages={'required': 'Debes seleccionar al menos un módulo'}
+    )
+    forzar = forms.BooleanField(label="Forzar escaneo nuevo (ignorar caché)", required=False)
+    perfil = forms.ChoiceField(label="Perfil de puertos (Nmap)", choices=PERFIL_CHOICES, required=False)
+    puertos = forms.CharField(label="Puertos (perfil custom)", max_length=500, required=False)
+    ssl_extendido = forms.BooleanField(label="SSL extendido (cadena, protocolos y cifrados)", required=False)
+    ssl_barrido = forms.BooleanField(label="SSL barrido (puertos TLS x nombres SAN)", required=False)
+    dorks_plantillas = forms.ChoiceField(label="Plantillas de dorks", choices=DORKS_CHOICES, required=False)
+    dorks_resultados = forms.IntegerField(label="Resultados por dork", min_value=1, max_value=motor_dorks.RESULTADOS_MAX, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        validar_perfil_puertos(cleaned_data)
+        if not cleaned_data.get('objetivos') and not cleaned_data.get('archivo'):
+            raise ValidationError('Debes ingresar objetivos o subir un archivo CSV')
+        return cleaned_data
+
+    def iterar_objetivos(self):
+        return iterar_objetivos(self.cleaned_data.get('objetivos'), self.cleaned_data.get('archivo'))
@@ -0,0 +1,60 @@
+# Creación de escaneos masivos (lotes)
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import tipo_objetivo, validate_ip_or_domain
+from .models import Escaneo, LoteEscaneo
+from .tasks import start_lote
+
+
+def crear_lote(user, objetivos, modulos, sin_cache=False, opciones=None):
+    """
+    Crea un LoteEscaneo y sus Escaneo en tandas de SCANNER_LOTE_CHUNK filas
+    (bulk_create), consumiendo `objetivos` como iterador para no tenerlos todos
+    en memoria. Los objetivos inválidos se cuentan como rechazados. `opciones` (por
+    módulo, ver forms.opciones_modulos) se aplica a todos los escaneos del lote.
+    Devuelve el lote ya creado; el despacho lo hace la tarea start_lote.
+    """
+    lote = LoteEscaneo.objects.create(user=user, modulos=list(modulos))
+    total = rechazados = 0
+    objetivos = islice(objetivos, settings.SCANNER_LOTE_MAX)
+
+    with transaction.atomic():
+        tanda = []
+        for objetivo in objetivos:
+            try:
+                if len(objetivo) > Escaneo._meta.get_field('objetivo').max_length:
+                    raise ValidationError('Objetivo demasiado largo')
+                validate_ip_or_domain(objetivo)
+            except ValidationError:
+                rechazados += 1
+                continue
+            tanda.append(Escaneo(
+                user=user,
+                lote=lote,
+                objetivo=objetivo,
+                tipo_objetivo=tipo_objetivo(objetivo),
+                estado='pendiente',
+                carril='masivo',
+                sin_cache=sin_cache,
+                opciones=opciones or {},
+            ))
+            if len(tanda) >= settings.SCANNER_LOTE_CHUNK:
+                Escaneo.objects.bulk_create(tanda)
+                total += len(tanda)
+                tanda = []
+        if tanda:
+            Escaneo.objects.bulk_create(tanda)
+            total += len(tanda)
+
+        lote.total_objetivos = total
+        lote.rechazados = rechazados
+        lote.save(update_fields=['total_objetivos', 'rechazados'])
+
+    if total:
+        # Encolar después del commit, si no el worker podría no ver las filas
+        transaction.on_commit(lambda: start_lote.delay(lote.id))
+    return lote
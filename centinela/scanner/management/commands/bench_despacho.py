@@ -0,0 +1,68 @@
+# Benchmark de la latencia de la vista de escaneo según la cantidad de módulos
+#
+# Hace POST al index con 1..N módulos y mide cuánto tarda en responder la vista, y
+# aparte cuánto tarda start_scan (bulk_create + fan-out) con esos mismos módulos. La
+# vista solo crea el Escaneo y encola start_scan: su latencia no debería crecer con
+# la cantidad de módulos; lo que crece se paga en el worker, no en la petición.
+#
+#   python manage.py bench_despacho                      # 50 repeticiones por cantidad de módulos
+#   python manage.py bench_despacho --repeticiones 200 --objetivo ejemplo.cl
+#
+# Todo corre en una transacción que se revierte al final (no deja filas). Los mensajes
+# van al broker configurado: conviene correrlo sin workers escuchando la cola default,
+# así se mide encolar y no ejecutar.
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from scanner import registry
+from scanner.models import Escaneo
+from scanner.tasks import start_scan
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de la vista de escaneo y de start_scan según la cantidad de módulos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=50, help="peticiones por cantidad de módulos")
+        parser.add_argument("--objetivo", default="ejemplo.cl")
+
+    def handle(self, *args, **opciones):
+        if start_scan.app.conf.task_always_eager:
+            raise CommandError("Con CELERY_TASK_ALWAYS_EAGER la vista ejecutaría los módulos: se mediría el escaneo, no el despacho")
+        modulos = [spec.nombre for spec in registry.todos() if spec.acepta("dominio")]
+
+        self.stdout.write(f"{'módulos':>8} {'vista p50':>10} {'vista p95':>10} {'start_scan p50':>15}")
+        # el Client habla como 'testserver'
+        with override_settings(ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            usuario = User.objects.create_user(username=f"bench-despacho-{time.time_ns()}")
+            cliente = Client()
+            cliente.force_login(usuario)
+            for n in range(1, len(modulos) + 1):
+                vista, orquestador = [], []
+                for _ in range(opciones["repeticiones"]):
+                    inicio = time.perf_counter()
+                    respuesta = cliente.post(reverse("index_view"), {"target": opciones["objetivo"], "modules": modulos[:n], "forzar": "on"})
+                    vista.append(time.perf_counter() - inicio)
+                    if respuesta.status_code != 302:
+                        raise CommandError(f"La vista respondió {respuesta.status_code}: revisar el formulario")
+
+                    # lo que la vista ya no hace: crear y despachar los módulos (ahora en el worker)
+                    escaneo = Escaneo.objects.filter(user=usuario).order_by("-id").first()
+                    inicio = time.perf_counter()
+                    start_scan(escaneo.id, modulos[:n])
+                    orquestador.append(time.perf_counter() - inicio)
+                self.stdout.write(f"{n:>8} {self._ms(vista, 50):>10} {self._ms(vista, 95):>10} {self._ms(orquestador, 50):>15}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _ms(tiempos, percentil):
+        if len(tiempos) < 2:
+            return f"{tiempos[0] * 1000:.2f}ms"
+        return f"{statistics.quantiles(tiempos, n=100)[percentil - 1] * 1000:.2f}ms"
@@ -0,0 +1,138 @@
+# Simulación de la latencia de cola (p50/p95/p99) de los escaneos interactivos, con y sin fair-share
+#
+# Un usuario lanza un lote masivo de --lote tareas y, mientras se procesa, otros usuarios
+# lanzan escaneos interactivos de --modulos tareas cada --intervalo segundos. Con --workers
+# procesos se mide cuánto tarda cada escaneo interactivo en terminar (desde que se lanza
+# hasta su última tarea):
+#   - fifo: todo va directo al broker, como antes del planificador
+#   - fair-share: despacha scanner/scheduler.py real (scripts Lua, carriles, round-robin y
+#     SCANNER_FAIRSHARE_CUPO) sobre el Redis de --redis; el broker respeta la prioridad del carril
+# El tiempo es simulado (eventos discretos): simula horas de cola en segundos.
+#
+#   python manage.py bench_fairshare
+#   python manage.py bench_fairshare --lote 5000 --workers 8 --redis redis://redis_broker:6379/15
+#
+# Usa las claves fs:* de la base de --redis y las borra al terminar: se niega a correr si ya hay.
+import heapq
+import itertools
+import random
+import statistics
+
+import redis
+from celery import signature
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from scanner import scheduler
+
+
+class Simulacion:
+    """Workers y broker simulados: el broker entrega primero la prioridad más alta y, dentro de ella, en orden de llegada."""
+
+    def __init__(self, workers, duracion, semilla, fair_share):
+        self.libres = workers
+        self.duracion = duracion
+        self.azar = random.Random(semilla)
+        self.fair_share = fair_share
+        self.ahora = 0.0
+        self.secuencia = itertools.count()
+        self.eventos = []     # (tiempo, orden, tipo, dato)
+        self.broker = []      # (prioridad, orden, tarea)
+        self.tareas = {}      # tarea -> (usuario, escaneo)
+        self.faltan = {}      # escaneo -> tareas sin terminar
+        self.inicio = {}      # escaneo -> tiempo en que se lanzó
+        self.latencias = {}   # escaneo -> segundos hasta su última tarea
+
+    def aplicar(self, firma, carril):
+        prioridad = settings.SCANNER_PRIORIDAD_CARRIL[carril] if self.fair_share else 0
+        heapq.heappush(self.broker, (prioridad, next(self.secuencia), firma.args[0]))
+
+    def lanzar(self, tiempo, usuario, escaneo, carril, tareas):
+        heapq.heappush(self.eventos, (tiempo, next(self.secuencia), "lanza", (usuario, escaneo, carril, tareas)))
+
+    def correr(self):
+        while self.eventos:
+            self.ahora, _, tipo, dato = heapq.heappop(self.eventos)
+            if tipo == "lanza":
+                usuario, escaneo, carril, tareas = dato
+                self.inicio[escaneo] = self.ahora
+                self.faltan[escaneo] = len(tareas)
+                for tarea in tareas:
+                    self.tareas[tarea] = (usuario, escaneo)
+                firmas = [signature("scanner.tasks.run_modulo_task", args=[tarea]) for tarea in tareas]
+                if self.fair_share:
+                    scheduler.encolar(usuario, carril, firmas)
+                else:
+                    for firma in firmas:
+                        self.aplicar(firma, carril)
+            else:
+                self.libres += 1
+                usuario, escaneo = self.tareas.pop(dato)
+                self.faltan[escaneo] -= 1
+                if not self.faltan[escaneo]:
+                    self.latencias[escaneo] = self.ahora - self.inicio[escaneo]
+                if self.fair_share:
+                    scheduler.liberar(usuario)
+            while self.libres and self.broker:
+                self.libres -= 1
+                tarea = heapq.heappop(self.broker)[2]
+                heapq.heappush(self.eventos, (self.ahora + self.azar.expovariate(1 / self.duracion),
+                                              next(self.secuencia), "termina", tarea))
+
+
+class Command(BaseCommand):
+    help = "Simula la latencia de los escaneos interactivos detrás de un lote masivo, con y sin fair-share"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=2000, help="tareas del lote masivo")
+        parser.add_argument("--interactivos", type=int, default=200, help="escaneos interactivos lanzados durante el lote")
+        parser.add_argument("--usuarios", type=int, default=10, help="usuarios que lanzan los interactivos")
+        parser.add_argument("--modulos", type=int, default=4, help="tareas por escaneo interactivo")
+        parser.add_argument("--intervalo", type=float, default=5.0, help="segundos entre escaneos interactivos")
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--duracion", type=float, default=2.0, help="duración media de una tarea (exponencial)")
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--redis", default="redis://redis_broker:6379/15", help="base de Redis solo para la simulación")
+
+    def handle(self, *args, **opciones):
+        # sin Redis el planificador despacharía directo y la simulación fair-share sería otra fifo
+        try:
+            ocupada = next(redis.Redis.from_url(opciones["redis"]).scan_iter("fs:*", count=1000), None) is not None
+        except redis.RedisError as e:
+            raise CommandError(f"No se pudo usar {opciones['redis']}: {e}")
+        if ocupada:
+            raise CommandError(f"{opciones['redis']} ya tiene claves fs:*: usar una base de Redis libre")
+
+        self.stdout.write(f"lote de {opciones['lote']} tareas, {opciones['interactivos']} escaneos interactivos de "
+                          f"{opciones['modulos']} tareas, {opciones['workers']} workers, cupo {settings.SCANNER_FAIRSHARE_CUPO}")
+        self.stdout.write(f"{'':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'lote':>10}")
+        for nombre, fair_share in (("fifo", False), ("fair-share", True)):
+            latencias, lote = self._simular(opciones, fair_share)
+            p = statistics.quantiles(latencias, n=100)
+            self.stdout.write(f"{nombre:<12} {p[49]:>8.1f}s {p[94]:>8.1f}s {p[98]:>8.1f}s {lote:>9.0f}s")
+
+    def _simular(self, opciones, fair_share):
+        sim = Simulacion(opciones["workers"], opciones["duracion"], opciones["semilla"], fair_share)
+        tareas = itertools.count()
+        sim.lanzar(0.0, 0, "lote", "masivo", [next(tareas) for _ in range(opciones["lote"])])
+        for i in range(opciones["interactivos"]):
+            sim.lanzar((i + 1) * opciones["intervalo"], 1 + i % opciones["usuarios"], i, "interactivo",
+                       [next(tareas) for _ in range(opciones["modulos"])])
+
+        # el planificador real contra la base de la simulación; _aplicar entrega al broker simulado
+        aplicar = scheduler._aplicar
+        with override_settings(SCANNER_FAIRSHARE_URL=opciones["redis"]):
+            scheduler._cliente.cache_clear()
+            scheduler._scripts.cache_clear()
+            scheduler._aplicar = sim.aplicar
+            try:
+                sim.correr()
+            finally:
+                scheduler._aplicar = aplicar
+                cliente = scheduler._cliente()
+                for clave in list(cliente.scan_iter("fs:*", count=1000)):
+                    cliente.delete(clave)
+                scheduler._cliente.cache_clear()
+                scheduler._scripts.cache_clear()
+        return [sim.latencias[i] for i in range(opciones["interactivos"])], sim.latencias["lote"]
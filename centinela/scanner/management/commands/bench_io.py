@@ -0,0 +1,96 @@
+# Benchmark de rendimiento por worker de los módulos de I/O
+#
+# Un proceso prefork de Celery atiende una tarea a la vez. Con una tarea por módulo
+# (run_modulo_task) el proceso pasa la latencia de red de cada módulo esperando; en
+# modo asyncio (run_modulos_io_task) los módulos de I/O de un escaneo esperan juntos.
+# Se mide cuántos módulos por segundo saca un solo proceso de cada forma, con las
+# tareas reales (ORM, caché, coalescencia, cupos) y módulos sintéticos que reemplazan
+# la red por una espera de --latencia segundos.
+#
+#   python manage.py bench_io                            # 20 escaneos, 0.2s por módulo
+#   python manage.py bench_io --escaneos 100 --latencia 0.5
+#
+# Crea un usuario y sus escaneos de prueba y los borra al terminar.
+import asyncio
+import dataclasses
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from scanner import registry
+from scanner.models import Escaneo, resultadoModulo
+from scanner.tasks import run_modulo_task, run_modulos_io_task
+
+
+def _sintetico(spec, latencia):
+    """La misma spec (cola, timeouts, cupo) con la red reemplazada por una espera fija."""
+    def funcion(objetivo, **kwargs):
+        time.sleep(latencia)
+        return {"bench": spec.nombre}
+
+    async def funcion_async(objetivo, **kwargs):
+        await asyncio.sleep(latencia)
+        return {"bench": spec.nombre}
+
+    # sin limitador ni caché compartida: se mide la ejecución, no esperas de tokens
+    return dataclasses.replace(spec, funcion=funcion, funcion_async=funcion_async if spec.funcion_async else None,
+                               limites={}, parciales=False, incremental=False, clave_cache=None,
+                               certificados=False, textos=())
+
+
+class Command(BaseCommand):
+    help = "Compara módulos por segundo de un proceso: una tarea por módulo vs. modo asyncio"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escaneos", type=int, default=20)
+        parser.add_argument("--latencia", type=float, default=0.2, help="segundos de I/O simulada por módulo")
+
+    def handle(self, *args, **opciones):
+        specs = {s.nombre: _sintetico(s, opciones["latencia"]) for s in registry.todos() if s.costo == "io" and s.acepta("dominio")}
+        registro = registry._registro()
+        originales = {nombre: registro[nombre] for nombre in specs}
+        usuario = User.objects.create_user(username=f"bench-io-{time.time_ns()}")
+        try:
+            registro.update(specs)  # solo en este proceso
+            self.stdout.write(f"{len(specs)} módulos de I/O por escaneo ({', '.join(specs)}), "
+                              f"{opciones['escaneos']} escaneos, {opciones['latencia']}s de latencia")
+            por_modulo = self._medir(usuario, specs, opciones["escaneos"], self._una_tarea_por_modulo)
+            agrupado = self._medir(usuario, specs, opciones["escaneos"], self._tarea_io)
+            self.stdout.write(f"{'una tarea por módulo':<26} {por_modulo:>8.1f} módulos/s")
+            self.stdout.write(f"{'asyncio (una por escaneo)':<26} {agrupado:>8.1f} módulos/s  (x{agrupado / por_modulo:.1f})")
+        finally:
+            registro.update(originales)
+            usuario.delete()  # cascada: escaneos y resultados
+
+    @staticmethod
+    def _una_tarea_por_modulo(ids):
+        for resultado_id in ids:
+            run_modulo_task.apply(args=[resultado_id])
+
+    @staticmethod
+    def _tarea_io(ids):
+        run_modulos_io_task.apply(args=[ids])
+
+    def _medir(self, usuario, specs, escaneos, ejecutar):
+        lotes = []
+        for i in range(escaneos):
+            # objetivos distintos: sin coalescencia entre escaneos
+            escaneo = Escaneo.objects.create(user=usuario, objetivo=f"bench{i}.ejemplo.cl", tipo_objetivo="dominio", sin_cache=True,
+                                             estado="en_proceso", modulos_total=len(specs), modulos_pendientes=len(specs))
+            filas = resultadoModulo.objects.bulk_create(
+                [resultadoModulo(escaneo=escaneo, nombre_modulo=m, estado="pendiente", resultado={}) for m in specs])
+            lotes.append([f.id for f in filas] if filas[0].id else
+                         list(escaneo.resultados.values_list("id", flat=True)))  # MySQL no devuelve ids
+
+        inicio = time.monotonic()
+        for ids in lotes:
+            ejecutar(ids)
+        duracion = time.monotonic() - inicio
+
+        completados = resultadoModulo.objects.filter(escaneo__user=usuario, estado="completado").count()
+        resultadoModulo.objects.filter(escaneo__user=usuario).delete()
+        Escaneo.objects.filter(user=usuario).delete()
+        if completados != escaneos * len(specs):
+            self.stderr.write(f"solo {completados} de {escaneos * len(specs)} módulos terminaron completados")
+        return completados / duracion
@@ -0,0 +1,69 @@
+# Vuelve a calificar los resultados guardados del módulo headers con las reglas actuales
+#
+#   python manage.py recalificar_headers                  # solo los calificados con otra versión de reglas
+#   python manage.py recalificar_headers --todos --dry-run
+#   python manage.py recalificar_headers --reglas /ruta/reglas.json --lote 5000
+#
+# No re-escanea: usa los headers guardados en cada resultado. Los resultados que siguen
+# en la caché (Redis) conservan la calificación anterior hasta que vence su TTL.
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from scanner.models import resultadoModulo
+from scanner.modulos import reglas_headers, scan_headerhttp
+
+
+class Command(BaseCommand):
+    help = "Recalifica los resultados guardados del módulo headers con las reglas actuales (sin re-escanear)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reglas", default=reglas_headers.REGLAS, help="archivo JSON de reglas")
+        parser.add_argument("--lote", type=int, default=1000, help="resultados por lectura y por UPDATE")
+        parser.add_argument("--todos", action="store_true", help="incluir los ya calificados con esta versión")
+        parser.add_argument("--dry-run", action="store_true", help="calcular sin guardar")
+
+    def handle(self, *args, **opciones):
+        try:
+            motor = reglas_headers.Motor(reglas_headers.cargar(opciones["reglas"]))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudieron cargar las reglas: {e}")
+
+        filas = (resultadoModulo.objects.filter(nombre_modulo="headers", estado="completado")
+                 .exclude(resultado__has_key="error").only("id", "resultado"))
+        if not opciones["todos"]:
+            # sin la clave, "distinto de la versión" da NULL en SQL: hay que pedirlas aparte
+            filas = filas.filter(~Q(resultado__rules_version=motor.version) | ~Q(resultado__has_key="rules_version"))
+
+        inicio = time.monotonic()
+        revisados = cambiados = 0
+        tanda = []
+        for fila in filas.iterator(chunk_size=opciones["lote"]):
+            tanda.append(fila)
+            if len(tanda) >= opciones["lote"]:
+                cambiados += self._calificar(tanda, motor, opciones["dry_run"])
+                revisados += len(tanda)
+                tanda = []
+        if tanda:
+            cambiados += self._calificar(tanda, motor, opciones["dry_run"])
+            revisados += len(tanda)
+
+        duracion = time.monotonic() - inicio
+        accion = "cambiarían" if opciones["dry_run"] else "actualizados"
+        self.stdout.write(self.style.SUCCESS(
+            f"Reglas {motor.version} ({len(motor)} reglas): {revisados} revisados, {cambiados} {accion} "
+            f"en {duracion:.1f}s ({revisados / duracion if duracion else 0:.0f} resultados/s)"))
+
+    def _calificar(self, filas, motor, dry_run):
+        """Califica una tanda en una pasada del motor y guarda solo las filas cuyo resultado cambió."""
+        validas = [f for f in filas if isinstance(f.resultado, dict) and "headers" in f.resultado]
+        antes = [(f.resultado.get("findings"), f.resultado.get("rules_version")) for f in validas]
+        scan_headerhttp.calificar_varios([f.resultado for f in validas], motor)
+        cambiadas = [f for f, previo in zip(validas, antes)
+                     if previo != (f.resultado["findings"], f.resultado["rules_version"])]
+        if cambiadas and not dry_run:
+            with transaction.atomic():
+                resultadoModulo.objects.bulk_update(cambiadas, ["resultado"])
+        return len(cambiadas)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escaneo',
+            name='modulos_fallidos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='escaneo',
+            name='modulos_pendientes',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='escaneo',
+            name='modulos_total',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='escaneo',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('error', 'Error'), ('parcial', 'Parcial')], default='pendiente', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0002_estado_contadores_escaneo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escaneo',
+            name='sin_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
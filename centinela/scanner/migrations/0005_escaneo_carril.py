@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0004_lote_escaneo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escaneo',
+            name='carril',
+            field=models.CharField(choices=[('interactivo', 'Interactivo'), ('programado', 'Programado'), ('masivo', 'Masivo')], default='interactivo', max_length=12),
+        ),
+    ]
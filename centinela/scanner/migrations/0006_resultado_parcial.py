@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0005_escaneo_carril'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultadomodulo',
+            name='resultado_parcial',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0006_resultado_parcial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultadomodulo',
+            name='fragmentos_pendientes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resultadomodulo',
+            name='fragmentos_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='FragmentoResultado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indice', models.PositiveIntegerField()),
+                ('objetivo', models.TextField()),
+                ('hosts', models.PositiveIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('datos', models.JSONField(blank=True, default=list)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('resultado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fragmentos', to='scanner.resultadomodulo')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de Resultado',
+                'verbose_name_plural': 'Fragmentos de Resultados',
+                'ordering': ['resultado', 'indice'],
+                'unique_together': {('resultado', 'indice')},
+            },
+        ),
+    ]
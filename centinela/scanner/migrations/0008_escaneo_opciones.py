@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0007_fragmentos_red'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escaneo',
+            name='opciones',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
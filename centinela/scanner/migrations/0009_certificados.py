@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0008_escaneo_opciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Certificado',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('pem', models.TextField()),
+                ('datos', models.JSONField()),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Certificado',
+                'verbose_name_plural': 'Certificados',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0009_certificados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextoCrudo',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('comprimido', models.BinaryField()),
+                ('tamano', models.PositiveIntegerField()),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Texto crudo',
+                'verbose_name_plural': 'Textos crudos',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanner', '0010_whois_textos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='escaneo',
+            index=models.Index(fields=['user', '-fecha_inicio'], name='escaneo_user_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='escaneo',
+            index=models.Index(fields=['objetivo', '-fecha_inicio'], name='escaneo_objetivo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='escaneo',
+            index=models.Index(fields=['lote', 'estado'], name='escaneo_lote_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loteescaneo',
+            index=models.Index(fields=['user', '-fecha_creacion'], name='lote_user_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resultadomodulo',
+            index=models.Index(fields=['escaneo', 'nombre_modulo'], name='resultado_escaneo_modulo_idx'),
+        ),
+    ]
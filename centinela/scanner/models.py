@@ -1,45 +1,321 @@
-from django.db import models
+import zlib
+
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
+# Estados posibles de un escaneo y de cada módulo
+ESTADOS_MODULO = [
+    ('pendiente', 'Pendiente'),
+    ('en_proceso', 'En Proceso'),
+    ('completado', 'Completado'),
+    ('error', 'Error')
+]
+
+ESTADOS_ESCANEO = ESTADOS_MODULO + [
+    ('parcial', 'Parcial'),  # terminó, pero algún módulo falló
+]
+
+EN_CURSO = ('pendiente', 'en_proceso')
+
+
+class LoteEscaneoQuerySet(models.QuerySet):
+    def con_progreso(self):
+        """
+        Anota el progreso de cada lote (ver LoteEscaneo.progreso) en la misma consulta:
+        GET /lotes/ no hace una consulta agregada por lote.
+        """
+        modulo = 'escaneos__resultados'
+        return self.annotate(
+            progreso_objetivos_en_curso=Count('escaneos', distinct=True, filter=Q(escaneos__estado__in=EN_CURSO)),
+            progreso_modulos_total=Count(modulo),
+            progreso_completados=Count(modulo, filter=Q(escaneos__resultados__estado='completado')),
+            progreso_fallidos=Count(modulo, filter=Q(escaneos__resultados__estado='error')),
+            progreso_pendientes=Count(modulo, filter=Q(escaneos__resultados__estado__in=EN_CURSO)),
+        )
+
+
+class LoteEscaneo(models.Model):
+    """Escaneo masivo: muchos objetivos con el mismo set de módulos."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lotes')
+    modulos = models.JSONField()                                                      # ["dns", "ssl", ...]
+    total_objetivos = models.PositiveIntegerField(default=0)
+    rechazados = models.PositiveIntegerField(default=0)                               # objetivos inválidos que no se crearon
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    objects = LoteEscaneoQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Lote {self.id} by {self.user.username} ({self.total_objetivos} objetivos)"
+
+    def progreso(self):
+        """
+        Conteo de módulos del lote por estado y objetivos que todavía no terminan, en una
+        sola consulta agregada (o ninguna si el lote ya viene de con_progreso()).
+        start_lote crea los módulos de a chunks: el lote termina cuando no queda ningún
+        objetivo en curso (objetivos_en_curso), no cuando no quedan módulos pendientes.
+        """
+        if not hasattr(self, 'progreso_modulos_total'):
+            anotado = LoteEscaneo.objects.con_progreso().filter(pk=self.pk).values(
+                'progreso_objetivos_en_curso', 'progreso_modulos_total', 'progreso_completados',
+                'progreso_fallidos', 'progreso_pendientes',
+            ).get()
+            for campo, valor in anotado.items():
+                setattr(self, campo, valor)
+        return {
+            'objetivos': self.total_objetivos,
+            'objetivos_en_curso': self.progreso_objetivos_en_curso,
+            'modulos_total': self.progreso_modulos_total,
+            'completados': self.progreso_completados,
+            'fallidos': self.progreso_fallidos,
+            'pendientes': self.progreso_pendientes,
+        }
+
+    class Meta:
+        verbose_name = 'Lote de Escaneos'
+        verbose_name_plural = 'Lotes de Escaneos'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # GET /lotes/ de un usuario, en el orden por defecto (sin ordenar aparte)
+            models.Index(fields=['user', '-fecha_creacion'], name='lote_user_fecha_idx'),
+        ]
+
 class Escaneo(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='escaneos') #foranea a usuario predefinido por django
     objetivo = models.CharField(max_length=100)                                       #educativa.ipchile.cl o 192.168.1.1
-    tipo_objetivo = models.CharField(max_length=7)                                    #dominio/ip
+    tipo_objetivo = models.CharField(max_length=7)                                    #dominio/ip/red
     fecha_inicio = models.DateTimeField(auto_now_add=True)
     fecha_fin = models.DateTimeField(auto_now=True)
-    estado = models.CharField(max_length=20, choices=[
-        ('pendiente', 'Pendiente'),
-        ('en_proceso', 'En Proceso'),
-        ('completado', 'Completado'),
-        ('error', 'Error')
-    ], default='pendiente')
+    estado = models.CharField(max_length=20, choices=ESTADOS_ESCANEO, default='pendiente')
+    lote = models.ForeignKey(LoteEscaneo, on_delete=models.CASCADE, related_name='escaneos', null=True, blank=True) # solo en escaneos masivos
+    carril = models.CharField(max_length=12, choices=[
+        ('interactivo', 'Interactivo'),
+        ('programado', 'Programado'),
+        ('masivo', 'Masivo')
+    ], default='interactivo')                                                         # carril de prioridad (scanner/scheduler.py)
+    sin_cache = models.BooleanField(default=False)                                    # forzar ejecución sin usar la caché de resultados
+    opciones = models.JSONField(default=dict, blank=True)                             # por módulo: {"nmap": {"perfil": "web"}}
+    modulos_total = models.PositiveSmallIntegerField(default=0)                      # cuántos módulos se despacharon
+    modulos_pendientes = models.PositiveSmallIntegerField(default=0)                 # contador atómico, llega a 0 al terminar
+    modulos_fallidos = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return f"Escaneo by {self.user.username} on {self.fecha_inicio.strftime('%Y-%m-%d %H:%M:%S')}"
 
+    def modulo_terminado(self, fallido=False):
+        """
+        Descuenta un módulo del contador de pendientes con un UPDATE atómico (F()).
+        La fila queda bloqueada hasta el commit, así que solo el worker que deja el
+        contador en 0 cierra el escaneo, aunque varios módulos terminen a la vez.
+        """
+        with transaction.atomic():
+            Escaneo.objects.filter(id=self.id).update(
+                modulos_pendientes=F('modulos_pendientes') - 1,
+                modulos_fallidos=F('modulos_fallidos') + (1 if fallido else 0),
+            )
+            pendientes, fallidos, total = Escaneo.objects.filter(id=self.id).values_list(
+                'modulos_pendientes', 'modulos_fallidos', 'modulos_total').get()
+
+            if pendientes == 0:
+                if fallidos == 0:
+                    final = 'completado'
+                elif fallidos == total:
+                    final = 'error'
+                else:
+                    final = 'parcial'
+                self.transicion(['en_proceso'], final, fecha_fin=timezone.now())
+
+    def transicion(self, desde, hacia, **campos):
+        """
+        Cambia el estado solo si el actual está en `desde` (UPDATE condicional).
+        Devuelve True si la transición se aplicó.
+        """
+        return bool(Escaneo.objects.filter(id=self.id, estado__in=desde).update(estado=hacia, **campos))
+
+    def opciones_de(self, modulo):
+        """Opciones elegidas para un módulo (kwargs de su función), {} si no hay."""
+        return (self.opciones or {}).get(modulo, {})
+
     class Meta:
         verbose_name = 'Escaneo'
         verbose_name_plural = 'Escaneos'
         ordering = ['-fecha_inicio']  # Order by start date descending
+        # Cada índice sigue una consulta caliente (scanner/tests.py revisa sus planes)
+        indexes = [
+            # escaneos de un usuario, en el orden por defecto
+            models.Index(fields=['user', '-fecha_inicio'], name='escaneo_user_fecha_idx'),
+            # historial de un objetivo (re-escaneo incremental: tasks._previo)
+            models.Index(fields=['objetivo', '-fecha_inicio'], name='escaneo_objetivo_fecha_idx'),
+            # start_lote: próximo chunk de pendientes del lote por id (el id va implícito en el índice)
+            models.Index(fields=['lote', 'estado'], name='escaneo_lote_estado_idx'),
+        ]
 
 class resultadoModulo(models.Model):
     escaneo = models.ForeignKey(Escaneo, on_delete=models.CASCADE, related_name='resultados') #foranea, 1 resultado pertenece a 1 escaneo
     nombre_modulo = models.CharField(max_length=12)                                           # nmap, dorks, etc
-    estado = models.CharField(max_length=20, choices=[
-        ('pendiente', 'Pendiente'),
-        ('en_proceso', 'En Proceso'),
-        ('completado', 'Completado'),
-        ('error', 'Error')
-    ], default='pendiente')
+    estado = models.CharField(max_length=20, choices=ESTADOS_MODULO, default='pendiente')
     resultado = models.JSONField()  # JSON del resultado
+    resultado_parcial = models.JSONField(default=list, blank=True)  # trozos emitidos mientras corre (se vacía al finalizar)
+    fragmentos_total = models.PositiveIntegerField(default=0)       # objetivos de red: en cuántos fragmentos se repartió
+    fragmentos_pendientes = models.PositiveIntegerField(default=0)  # contador atómico, llega a 0 con el último fragmento
     fecha_ejecucion = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Resultado for {self.nombre_modulo} in Escaneo {self.escaneo.id}"
 
+    # Transiciones permitidas: pendiente -> en_proceso -> completado | error
+
+    def iniciar(self):
+        """pendiente -> en_proceso. False si otra ejecución ya tomó este módulo."""
+        return bool(resultadoModulo.objects.filter(id=self.id, estado='pendiente').update(estado='en_proceso'))
+
+    def finalizar(self, estado, resultado, desde=('en_proceso',)):
+        """
+        en_proceso -> completado | error, escribiendo solo estado y resultado.
+        Si la transición se aplica, descuenta el módulo del escaneo.
+        Las filas suscritas a otra ejecución (coalescencia) pueden cerrarse también desde pendiente.
+        """
+        actualizadas = resultadoModulo.objects.filter(id=self.id, estado__in=desde).update(
+            estado=estado, resultado=resultado, resultado_parcial=[])
+        if actualizadas:
+            self.estado = estado
+            self.resultado = resultado
+            self.escaneo.modulo_terminado(fallido=(estado == 'error'))
+        return bool(actualizadas)
+
+    def agregar_parcial(self, trozos):
+        """Reescribe los trozos parciales mientras la fila siga en_proceso (después ya no importan)."""
+        return bool(resultadoModulo.objects.filter(id=self.id, estado='en_proceso').update(resultado_parcial=trozos))
+
+    def fragmento_terminado(self):
+        """
+        Descuenta un fragmento con un UPDATE atómico (F()), igual que Escaneo.modulo_terminado.
+        Devuelve True solo para el worker que deja el contador en 0: ese une los resultados.
+        """
+        with transaction.atomic():
+            resultadoModulo.objects.filter(id=self.id).update(fragmentos_pendientes=F('fragmentos_pendientes') - 1)
+            pendientes = resultadoModulo.objects.filter(id=self.id).values_list('fragmentos_pendientes', flat=True).get()
+        return pendientes == 0
+
+    def resumen_fragmentos(self):
+        """
+        Avance y rendimiento de un módulo repartido en fragmentos, en una sola consulta
+        agregada: hosts/minuto de punta a punta y cuántos workers distintos participaron.
+        """
+        agg = self.fragmentos.aggregate(
+            completados=Count('id', filter=Q(estado='completado')),
+            fallidos=Count('id', filter=Q(estado='error')),
+            hosts=Sum('hosts', filter=Q(estado='completado')),
+            reintentos=Sum('intentos'),
+            workers=Count('worker', distinct=True, filter=~Q(worker='')),
+            inicio=Min('fecha_inicio'),
+            fin=Max('fecha_fin'),
+        )
+        segundos = (agg['fin'] - agg['inicio']).total_seconds() if agg['inicio'] and agg['fin'] else 0
+        hosts = agg['hosts'] or 0
+        return {
+            'total': self.fragmentos_total,
+            'completados': agg['completados'],
+            'fallidos': agg['fallidos'],
+            'reintentos': agg['reintentos'] or 0,
+            'hosts': hosts,
+            'workers': agg['workers'],
+            'duracion': round(segundos, 1),
+            'hosts_por_minuto': round(hosts * 60 / segundos, 1) if segundos else None,
+        }
+
     class Meta:
         verbose_name = 'Resultado de Módulo'
         verbose_name_plural = 'Resultados de Módulos'
-        ordering = ['escaneo', 'nombre_modulo']  # Order by escaneo and then by module name
\ No newline at end of file
+        ordering = ['escaneo', 'nombre_modulo']  # Order by escaneo and then by module name
+        indexes = [
+            # resultados de un escaneo (API, informe, despacho) ya en el orden por defecto
+            models.Index(fields=['escaneo', 'nombre_modulo'], name='resultado_escaneo_modulo_idx'),
+        ]
+
+
+class FragmentoResultado(models.Model):
+    """
+    Un pedazo de un módulo sobre una red (CIDR o rango): cada fragmento corre como
+    tarea propia en cualquier worker de la cola del módulo y se reintenta por separado.
+    """
+    resultado = models.ForeignKey(resultadoModulo, on_delete=models.CASCADE, related_name='fragmentos')
+    indice = models.PositiveIntegerField()                                               # orden dentro de la red
+    objetivo = models.TextField()                                                        # bloques CIDR separados por espacio
+    hosts = models.PositiveIntegerField(default=0)                                       # direcciones que cubre
+    estado = models.CharField(max_length=20, choices=ESTADOS_MODULO, default='pendiente')
+    datos = models.JSONField(default=list, blank=True)                                   # resultado del módulo para este fragmento
+    intentos = models.PositiveSmallIntegerField(default=0)                               # reintentos ya usados
+    worker = models.CharField(max_length=100, blank=True)                                # hostname del worker que lo ejecutó
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Fragmento {self.indice} de {self.resultado}"
+
+    # Transiciones: pendiente -> en_proceso -> completado | error, y en_proceso -> pendiente al reintentar
+
+    def iniciar(self, worker):
+        """pendiente -> en_proceso, anotando el worker. False si ya lo tomó otra ejecución."""
+        return bool(FragmentoResultado.objects.filter(id=self.id, estado='pendiente').update(
+            estado='en_proceso', worker=worker[:100], fecha_inicio=timezone.now()))
+
+    def reintentar(self):
+        """en_proceso -> pendiente, gastando un intento."""
+        return bool(FragmentoResultado.objects.filter(id=self.id, estado='en_proceso').update(
+            estado='pendiente', intentos=F('intentos') + 1))
+
+    def finalizar(self, estado, datos):
+        """en_proceso -> completado | error. True si la transición se aplicó."""
+        return bool(FragmentoResultado.objects.filter(id=self.id, estado='en_proceso').update(
+            estado=estado, datos=datos, fecha_fin=timezone.now()))
+
+    class Meta:
+        verbose_name = 'Fragmento de Resultado'
+        verbose_name_plural = 'Fragmentos de Resultados'
+        ordering = ['resultado', 'indice']
+        unique_together = [('resultado', 'indice')]
+
+
+class Certificado(models.Model):
+    """
+    Almacén de certificados direccionado por contenido: uno por huella SHA-256 del DER,
+    compartido por todos los resultados que lo vieron (CDNs, wildcards, SANs largos).
+    Los resultados guardan solo la huella (ver scanner/certificados.py).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)                          # huella del DER en hex
+    pem = models.TextField()
+    datos = models.JSONField()                                                           # campos parseados (scan_ssl.CAMPOS_CERTIFICADO)
+    fecha_registro = models.DateTimeField(auto_now_add=True)                            # primera vez que se vio
+
+    def __str__(self):
+        return f"Certificado {self.sha256[:16]}"
+
+    class Meta:
+        verbose_name = 'Certificado'
+        verbose_name_plural = 'Certificados'
+
+
+class TextoCrudo(models.Model):
+    """
+    Textos crudos de los módulos (la respuesta completa de whois) guardados aparte y
+    comprimidos, uno por huella SHA-256 del texto. El resultado guarda solo la referencia
+    y el texto se descomprime cuando alguien lo abre (ver scanner/textos.py).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)                          # huella del texto en UTF-8
+    comprimido = models.BinaryField()                                                    # zlib
+    tamano = models.PositiveIntegerField()                                               # bytes sin comprimir
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    def texto(self) -> str:
+        return zlib.decompress(bytes(self.comprimido)).decode('utf-8')
+
+    def __str__(self):
+        return f"Texto {self.sha256[:16]} ({self.tamano} bytes)"
+
+    class Meta:
+        verbose_name = 'Texto crudo'
+        verbose_name_plural = 'Textos crudos'
@@ -0,0 +1,80 @@
+# Barrido TCP connect en Python puro (asyncio)
+#
+# Primera fase del escaneo de puertos: intenta conectar a cada (host, puerto) con un
+# timeout corto y un número fijo de conexiones en vuelo. Es mucho más rápido que la
+# detección de servicios de nmap (-sV), que después corre solo sobre lo que quedó abierto.
+# No depende de Django, igual que los scan_*.py.
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+CONCURRENCIA = 500   # conexiones en vuelo como máximo (muy por debajo del ulimit de descriptores)
+TIMEOUT = 1.0        # segundos por intento de conexión; sin respuesta = filtrado
+
+
+def parsear_puertos(puertos: str) -> List[int]:
+    """ "22,80,8000-8010" -> [22, 80, 8000, ..., 8010], sin repetidos y en orden."""
+    resultado = set()
+    for parte in puertos.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if "-" in parte:
+            desde, hasta = (int(x) for x in parte.split("-", 1))
+            resultado.update(range(desde, hasta + 1))
+        else:
+            resultado.add(int(parte))
+    if not resultado or min(resultado) < 1 or max(resultado) > 65535:
+        raise ValueError(f"Lista de puertos inválida: {puertos}")
+    return sorted(resultado)
+
+
+async def sondear(host: str, puerto: int, timeout: float = TIMEOUT) -> str:
+    """Estado de un puerto según el connect: open, closed (RST) o filtered (timeout / inalcanzable)."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, puerto), timeout=timeout)
+    except ConnectionRefusedError:
+        return "closed"
+    except (asyncio.TimeoutError, OSError):
+        return "filtered"
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "open"
+
+
+async def barrer(
+    hosts: Iterable[str],
+    puertos: List[int],
+    concurrencia: int = CONCURRENCIA,
+    timeout: float = TIMEOUT,
+    on_abierto: Optional[Callable[[str, int], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Prueba todos los (host, puerto). Un número fijo de trabajadores consume un mismo
+    iterador perezoso: nunca hay más de `concurrencia` conexiones ni tareas vivas.
+    Devuelve {"hosts": {host: {puerto: estado}}, "meta": {...}}.
+    """
+    pares = ((host, puerto) for host in hosts for puerto in puertos)
+    estados: Dict[str, Dict[int, str]] = {}
+    meta = {"probes": 0, "open": 0}
+    inicio = time.monotonic()
+
+    async def trabajador():
+        for host, puerto in pares:
+            meta["probes"] += 1
+            estado = await sondear(host, puerto, timeout)
+            estados.setdefault(host, {})[puerto] = estado
+            if estado == "open":
+                meta["open"] += 1
+                if on_abierto:
+                    await on_abierto(host, puerto)
+
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+
+    duracion = time.monotonic() - inicio
+    meta["duration"] = round(duracion, 3)
+    meta["probes_per_second"] = round(meta["probes"] / duracion, 1) if duracion else None
+    return {"hosts": estados, "meta": meta}
@@ -0,0 +1,91 @@
+# Benchmark del escaneo de puertos en dos fases contra listeners locales
+#
+# Abre N puertos TCP en 127.0.0.1 (en otro proceso, para no competir por la CPU) y
+# escanea un perfil de P puertos que los contiene. Compara:
+#   - barrido: solo la fase asyncio de scan_nmap (barrido.py)
+#   - dos fases: barrido + nmap -sV sobre los abiertos (run_nmap)
+#   - nmap -sV directo sobre todo el perfil (lo que hacía run_nmap antes)
+# Las dos últimas necesitan nmap en el PATH; si no está, solo se mide el barrido.
+#
+# Uso (desde scanner/modulos/):
+#   python bench_nmap.py                         # 8 listeners en un perfil de 1000 puertos
+#   python bench_nmap.py --listeners 20 --puertos 5000 --concurrencia 1000 --sin-nmap
+import argparse
+import asyncio
+import multiprocessing
+import shutil
+import subprocess
+import time
+
+import barrido
+from scan_nmap import run_nmap
+
+BASE = 20000  # primer puerto del perfil
+
+
+def escuchar(puertos, listos: "multiprocessing.Queue"):
+    """Proceso de los listeners: acepta y responde un banner HTTP mínimo (para que -sV tenga algo)."""
+    async def atender(reader, writer):
+        writer.write(b"HTTP/1.0 200 OK\r\nServer: bench\r\nContent-Length: 0\r\n\r\n")
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def principal():
+        abiertos = []
+        for puerto in puertos:
+            try:
+                await asyncio.start_server(atender, "127.0.0.1", puerto)
+                abiertos.append(puerto)
+            except OSError:
+                pass  # puerto ocupado en esta máquina: se omite
+        listos.put(abiertos)
+        await asyncio.Event().wait()  # hasta que el proceso principal lo termine
+
+    asyncio.run(principal())
+
+
+def medir(nombre, funcion):
+    inicio = time.monotonic()
+    salida = funcion()
+    print(f"{nombre:<14} {time.monotonic() - inicio:>8.2f}s")
+    return salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del escaneo de puertos en dos fases")
+    parser.add_argument("--listeners", type=int, default=8)
+    parser.add_argument("--puertos", type=int, default=1000, help="tamaño del perfil")
+    parser.add_argument("--concurrencia", type=int, default=barrido.CONCURRENCIA)
+    parser.add_argument("--sin-nmap", action="store_true", help="medir solo el barrido")
+    args = parser.parse_args()
+
+    paso = max(1, args.puertos // args.listeners)
+    candidatos = [BASE + i * paso for i in range(args.listeners)]
+    listos = multiprocessing.Queue()
+    servidor = multiprocessing.Process(target=escuchar, args=(candidatos, listos), daemon=True)
+    servidor.start()
+    try:
+        abiertos = listos.get(timeout=10)
+        perfil = f"{BASE}-{BASE + args.puertos - 1}"
+        print(f"perfil {perfil} ({args.puertos} puertos), {len(abiertos)} listeners en 127.0.0.1")
+
+        resultado = medir("barrido", lambda: asyncio.run(
+            barrido.barrer(["127.0.0.1"], barrido.parsear_puertos(perfil), concurrencia=args.concurrencia)))
+        encontrados = sorted(p for p, e in resultado["hosts"]["127.0.0.1"].items() if e == "open")
+        print(f"{'':<14} {resultado['meta']['probes_per_second']} sondas/s, abiertos={encontrados == abiertos}")
+
+        if args.sin_nmap or not shutil.which("nmap"):
+            print("nmap no disponible: se omiten las fases con -sV")
+            return
+        medir("dos fases", lambda: run_nmap("127.0.0.1", perfil="custom", puertos=perfil))
+        medir("nmap -sV", lambda: subprocess.run(
+            ["nmap", "-sV", "-n", "-Pn", "-T4", "-p", perfil, "127.0.0.1", "-oX", "-"],
+            stdout=subprocess.DEVNULL, check=True))
+    finally:
+        servidor.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Benchmark del módulo de subdominios contra un DNS local de mentira
+#
+# Levanta un servidor DNS UDP en 127.0.0.1 (en otro proceso) que responde A para
+# un subconjunto de nombres y NXDOMAIN para el resto, y enumera wordlists sintéticas
+# de distinto tamaño. Lo que interesa es que las consultas/seg y el pico de memoria
+# se mantengan planos al crecer la wordlist.
+#
+# Uso (desde scanner/modulos/):
+#   python bench_subdomains.py                       # 10k y 100k palabras
+#   python bench_subdomains.py 1000 50000 --en-vuelo 200 --latencia 0.01 --comodin
+import argparse
+import asyncio
+import multiprocessing
+import resource
+
+import dns.message
+import dns.rcode
+import dns.rrset
+
+from scan_subdomains import SubdomainEnumerator
+
+DOMINIO = "bench.test"
+
+
+class DNSFalso(asyncio.DatagramProtocol):
+    """Responde A 10.x.x.x a los nombres wNNN con NNN múltiplo de `cada`; NXDOMAIN al resto."""
+
+    def __init__(self, cada: int, latencia: float, comodin: bool):
+        self.cada = cada
+        self.latencia = latencia
+        self.comodin = comodin
+        self.consultas = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.consultas += 1
+        consulta = dns.message.from_wire(data)
+        respuesta = dns.message.make_response(consulta)
+        pregunta = consulta.question[0]
+        etiqueta = pregunta.name.labels[0].decode()
+        existe = etiqueta.startswith("w") and etiqueta[1:].isdigit() and int(etiqueta[1:]) % self.cada == 0
+        if existe:
+            n = int(etiqueta[1:])
+            ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+            respuesta.answer.append(dns.rrset.from_text(pregunta.name, 60, "IN", "A", ip))
+        elif self.comodin:
+            respuesta.answer.append(dns.rrset.from_text(pregunta.name, 60, "IN", "A", "192.0.2.1"))
+        else:
+            respuesta.set_rcode(dns.rcode.NXDOMAIN)
+        wire = respuesta.to_wire()
+        if self.latencia:
+            asyncio.get_running_loop().call_later(self.latencia, self.transport.sendto, wire, addr)
+        else:
+            self.transport.sendto(wire, addr)
+
+
+def servir(cada: int, latencia: float, comodin: bool, puertos: "multiprocessing.Queue"):
+    """Proceso del DNS falso: así no compite por la CPU con el enumerador que se mide."""
+    async def principal():
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: DNSFalso(cada, latencia, comodin), local_addr=("127.0.0.1", 0)
+        )
+        puertos.put(transport.get_extra_info("sockname")[1])
+        await asyncio.Event().wait()  # hasta que el proceso principal lo termine
+
+    asyncio.run(principal())
+
+
+def wordlist_sintetica(n: int):
+    # generador: la lista nunca está entera en memoria, igual que leer_wordlist
+    for i in range(n):
+        yield f"w{i}"
+
+
+async def medir(n: int, puerto: int, en_vuelo: int):
+    enumerador = SubdomainEnumerator(
+        DOMINIO, wordlist=wordlist_sintetica(n), en_vuelo=en_vuelo,
+        nameservers=["127.0.0.1"], port=puerto, timeout=2.0,
+    )
+    resultado = await enumerador.enumerar()
+    # pico de RSS del proceso (Linux: KiB); si la memoria es plana no crece entre tamaños
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    meta = resultado["meta"]
+    print(f"{n:>8} palabras  {meta['qps']:>9} qps  {meta['duration']:>8}s  "
+          f"encontrados={meta['found']:<6} fallidas={meta['failed']:<4} comodín={bool(resultado['wildcard'])!s:<5} "
+          f"pico_rss={pico / 1024:.1f} MiB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de scan_subdomains contra un DNS local")
+    parser.add_argument("tamanos", nargs="*", type=int, default=[10_000, 100_000])
+    parser.add_argument("--en-vuelo", type=int, default=500)
+    parser.add_argument("--cada", type=int, default=1000, help="1 de cada N nombres existe")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de demora por respuesta")
+    parser.add_argument("--comodin", action="store_true", help="el servidor responde *.dominio")
+    args = parser.parse_args()
+
+    puertos = multiprocessing.Queue()
+    servidor = multiprocessing.Process(
+        target=servir, args=(args.cada, args.latencia, args.comodin, puertos), daemon=True
+    )
+    servidor.start()
+    try:
+        puerto = puertos.get(timeout=10)
+        for n in args.tamanos:
+            await medir(n, puerto, args.en_vuelo)
+    finally:
+        servidor.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,294 @@
+# Caché de respuestas DNS compartida por todos los workers
+#
+# Dos niveles: una LRU en memoria del proceso (sin ida a la red) y Redis, compartido
+# entre procesos y máquinas. Respeta el TTL de cada RRset (acotado por TTL_MAX) y
+# guarda también las respuestas negativas (NXDOMAIN / sin registros) con su propio tope.
+# Como los scan_*.py, no depende de Django: la URL de Redis sale de DNS_CACHE_URL o de
+# configurar() (scanner/apps.py la llama con settings.SCANNER_DNSCACHE_URL).
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import dns.rdatatype
+import dns.resolver
+
+logger = logging.getLogger(__name__)
+
+TTL_MAX = 3600          # tope para TTLs positivos largos
+NEGATIVO_MAX = 300      # tope para NXDOMAIN / NoAnswer (RFC 2308 usa el mínimo del SOA)
+LRU_MAX = 4096          # entradas en memoria por proceso
+CONTADORES_CADA = 100   # cada cuántos eventos se suman los contadores del proceso en Redis
+CLAVE_CONTADORES = "dnscache:contadores"
+
+_config = {"url": os.getenv("DNS_CACHE_URL")}
+_lru: "OrderedDict[str, Tuple[float, List[str], Optional[str]]]" = OrderedDict()
+_candado = threading.Lock()
+_contadores: Counter = Counter()
+_pendientes: Counter = Counter()
+_cliente = None
+
+
+class RespuestaNegativa(Exception):
+    """NXDOMAIN / NoAnswer servido desde la caché (el texto es el del error original)."""
+
+
+class Respuesta:
+    """Respuesta positiva: los registros en texto y el TTL que le queda."""
+
+    def __init__(self, textos: List[str], ttl: int):
+        self.textos = textos
+        self.ttl = ttl
+
+
+def configurar(url: Optional[str]) -> None:
+    """Cambia la URL de Redis (None = solo la LRU del proceso)."""
+    global _cliente
+    _config["url"] = url
+    _cliente = None
+
+
+def _redis():
+    global _cliente
+    if _cliente is None and _config["url"]:
+        import redis
+        _cliente = redis.Redis.from_url(_config["url"], socket_timeout=0.5)
+    return _cliente
+
+
+def _clave(nombre: str, tipo: str) -> str:
+    return f"dns:{tipo.upper()}:{nombre.strip().lower().rstrip('.')}"
+
+
+# ---------------- Contadores ----------------
+
+def _contar(evento: str) -> None:
+    with _candado:
+        _contadores[evento] += 1
+        _pendientes[evento] += 1
+        if sum(_pendientes.values()) < CONTADORES_CADA:
+            return
+        lote = dict(_pendientes)
+        _pendientes.clear()
+    _volcar(lote)
+
+
+def _volcar(lote: Dict[str, int]) -> None:
+    cliente = _redis()
+    if not cliente or not lote:
+        return
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        for evento, n in lote.items():
+            pipe.hincrby(CLAVE_CONTADORES, evento, n)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("No se pudieron guardar los contadores de la caché DNS: %s", e)
+
+
+def estadisticas() -> Dict[str, Dict[str, int]]:
+    """
+    Contadores de la caché: los de este proceso y los globales (suma de todos los
+    workers en Redis). Eventos: hit_local, hit_redis, miss, negativo.
+    """
+    with _candado:
+        proceso = dict(_contadores)
+        lote = dict(_pendientes)
+        _pendientes.clear()
+    _volcar(lote)
+    globales: Dict[str, int] = {}
+    cliente = _redis()
+    if cliente:
+        try:
+            globales = {k.decode(): int(v) for k, v in cliente.hgetall(CLAVE_CONTADORES).items()}
+        except Exception as e:
+            logger.warning("Caché DNS compartida no disponible: %s", e)
+    return {"proceso": proceso, "global": globales, "lru_entradas": len(_lru)}
+
+
+# ---------------- Almacenamiento ----------------
+
+def _desde_entrada(expira: float, textos: List[str], error: Optional[str]):
+    if error is not None:
+        raise RespuestaNegativa(error)
+    return Respuesta(textos, max(1, int(expira - time.time())))
+
+
+def _leer_lru(clave: str):
+    with _candado:
+        entrada = _lru.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.time():
+            del _lru[clave]
+            return None
+        _lru.move_to_end(clave)
+    return entrada
+
+
+def _guardar_lru(clave: str, entrada) -> None:
+    with _candado:
+        _lru[clave] = entrada
+        _lru.move_to_end(clave)
+        while len(_lru) > LRU_MAX:
+            _lru.popitem(last=False)
+
+
+def _leer_redis(clave: str):
+    cliente = _redis()
+    if not cliente:
+        return None
+    try:
+        crudo = cliente.get(clave)
+    except Exception as e:
+        logger.warning("Caché DNS compartida no disponible: %s", e)
+        return None
+    if crudo is None:
+        return None
+    try:
+        datos = json.loads(crudo)
+        return float(datos["x"]), list(datos["t"]), datos["e"]
+    except (ValueError, KeyError, TypeError) as e:
+        # entrada ilegible (escrita a medias, otra versión): cuenta como miss y la consulta la pisa
+        logger.warning("Entrada corrupta en la caché DNS, se ignora: %s (%s)", clave, e)
+        return None
+
+
+def _guardar_redis(clave: str, entrada, ttl: int) -> None:
+    cliente = _redis()
+    if not cliente:
+        return
+    expira, textos, error = entrada
+    try:
+        cliente.set(clave, json.dumps({"x": expira, "t": textos, "e": error}), ex=ttl)
+    except Exception as e:
+        logger.warning("Caché DNS compartida no disponible: %s", e)
+
+
+def _buscar(clave: str):
+    """Entrada vigente en la LRU o en Redis (que además calienta la LRU), o None."""
+    entrada = _leer_lru(clave)
+    if entrada is not None:
+        _contar("hit_local")
+        return entrada
+    entrada = _leer_redis(clave)
+    if entrada is not None and entrada[0] > time.time():
+        _contar("hit_redis")
+        _guardar_lru(clave, entrada)
+        return entrada
+    _contar("miss")
+    return None
+
+
+def _ttl_negativo(e: Exception) -> int:
+    """TTL negativo según el SOA de la respuesta (mínimo entre su TTL y MINIMUM), acotado."""
+    respuestas = [e.kwargs.get("response")] + list((e.kwargs.get("responses") or {}).values())
+    for respuesta in respuestas:
+        for rrset in getattr(respuesta, "authority", []) or []:
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                return max(1, min(rrset.ttl, rrset[0].minimum, NEGATIVO_MAX))
+    return NEGATIVO_MAX
+
+
+def _registrar(clave: str, answers=None, error: Optional[Exception] = None):
+    """Guarda lo que devolvió el resolver y lo devuelve como Respuesta (o relanza el error)."""
+    if error is not None:
+        if not isinstance(error, (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)):
+            raise error  # timeouts y fallas de servidor no se cachean
+        _contar("negativo")
+        ttl = _ttl_negativo(error)
+        entrada = (time.time() + ttl, [], str(error))
+    else:
+        ttl = min(answers.rrset.ttl, TTL_MAX)
+        entrada = (time.time() + ttl, [r.to_text() for r in answers], None)
+        if ttl <= 0:
+            return Respuesta(entrada[1], 0)
+    _guardar_lru(clave, entrada)
+    _guardar_redis(clave, entrada, ttl)
+    if error is not None:
+        raise error
+    return Respuesta(entrada[1], ttl)
+
+
+# ---------------- Consultas ----------------
+
+def consultar(resolver: dns.resolver.Resolver, nombre: str, tipo: str) -> Respuesta:
+    """
+    resolver.resolve(nombre, tipo) pasando por la caché. Devuelve una Respuesta o
+    lanza la excepción de la consulta (RespuestaNegativa si el negativo vino de la caché).
+    """
+    clave = _clave(nombre, tipo)
+    entrada = _buscar(clave)
+    if entrada is not None:
+        return _desde_entrada(*entrada)
+    try:
+        answers = resolver.resolve(nombre, tipo)
+    except Exception as e:
+        return _registrar(clave, error=e)
+    return _registrar(clave, answers)
+
+
+async def consultar_async(resolver, nombre: str, tipo: str) -> Respuesta:
+    """Igual que consultar, con un dns.asyncresolver.Resolver; Redis se usa desde un hilo."""
+    clave = _clave(nombre, tipo)
+    entrada = _leer_lru(clave)
+    if entrada is not None:
+        _contar("hit_local")
+    else:
+        entrada = await asyncio.to_thread(_buscar, clave)
+    if entrada is not None:
+        return _desde_entrada(*entrada)
+    try:
+        answers = await resolver.resolve(nombre, tipo)
+    except Exception as e:
+        return await asyncio.to_thread(_registrar, clave, None, e)
+    return await asyncio.to_thread(_registrar, clave, answers)
+
+
+def _es_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def resolver_host(host: str, timeout: float = 5.0) -> str:
+    """
+    Dirección a la que conectar para un host (A, o AAAA si no tiene A), vía la caché.
+    Si es una IP o no se puede resolver, devuelve el host tal cual y que el socket decida.
+    """
+    if _es_ip(host):
+        return host
+    resolver = dns.resolver.Resolver()
+    resolver.lifetime = resolver.timeout = timeout
+    for tipo in ("A", "AAAA"):
+        try:
+            textos = consultar(resolver, host, tipo).textos
+        except Exception:
+            continue
+        if textos:
+            return textos[0]
+    return host
+
+
+async def resolver_host_async(host: str, timeout: float = 5.0) -> str:
+    """Versión asíncrona de resolver_host."""
+    if _es_ip(host):
+        return host
+    import dns.asyncresolver
+    resolver = dns.asyncresolver.Resolver()
+    resolver.lifetime = resolver.timeout = timeout
+    for tipo in ("A", "AAAA"):
+        try:
+            textos = (await consultar_async(resolver, host, tipo)).textos
+        except Exception:
+            continue
+        if textos:
+            return textos[0]
+    return host
@@ -0,0 +1,315 @@
+# Motor de dorks sobre Google Custom Search
+#
+# Las plantillas son datos: cada conjunto es un JSON (plantillas_dorks/<nombre>.json, o
+# los del directorio de DORKS_PLANTILLAS, que pisan a los de igual nombre) con una lista
+# de {"consulta": "site:{domain} ...", "descripcion": "..."}.
+# Las plantillas de un escaneo corren concurrentes sobre una Session compartida; cada
+# página de resultados se pide completa (10, lo mismo cuesta de cuota) y se guarda en
+# caché por consulta con un TTL: dos escaneos o conjuntos con la misma consulta la pagan
+# una vez. La cuota diaria se lleva aquí (libro de cuota): cada petición real a Google
+# reserva una unidad antes de salir y, si el presupuesto del día se acabó, no sale.
+# Como dnscache, no depende de Django: caché y libro viven en Redis (DORKS_CACHE_URL o
+# configurar(), que llama scanner/apps.py) y, sin Redis, en memoria del proceso.
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# URL de la API; se puede apuntar a un servidor falso local para probar el motor sin cuota
+CSE_URL = os.getenv("GOOGLE_CSE_URL", "https://www.googleapis.com/customsearch/v1")
+PLANTILLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantillas_dorks")
+PLANTILLAS_USUARIO = os.getenv("DORKS_PLANTILLAS")  # directorio con conjuntos propios (*.json)
+CONJUNTO_DEFECTO = "comunes"
+_NOMBRE_CONJUNTO = re.compile(r"^[\w-]+$")
+
+CACHE_TTL = int(os.getenv("DORKS_CACHE_TTL", 6 * 60 * 60))        # vigencia de una página en caché
+CUOTA_DIARIA = int(os.getenv("GOOGLE_CSE_CUOTA_DIARIA", 100))     # consultas por día (100 en el plan gratuito)
+ZONA_CUOTA = ZoneInfo("America/Los_Angeles")                      # Google reinicia la cuota a medianoche del Pacífico
+POR_PAGINA = 10         # máximo de resultados por petición
+RESULTADOS_MAX = 100    # CSE no entrega más allá del resultado 100
+CONSULTAS_SIMULTANEAS = 4
+LRU_MAX = 512           # páginas en memoria por proceso
+
+_config = {"url": os.getenv("DORKS_CACHE_URL")}
+_lru: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_cuota_local: Counter = Counter()
+_candado = threading.Lock()
+_cliente = None
+_sesion: Optional[requests.Session] = None
+
+
+class CuotaAgotada(Exception):
+    """El presupuesto diario de consultas ya se usó completo."""
+
+
+def configurar(url: Optional[str]) -> None:
+    """Cambia la URL de Redis (None = caché y libro de cuota solo en el proceso)."""
+    global _cliente
+    _config["url"] = url
+    _cliente = None
+
+
+def _redis():
+    global _cliente
+    if _cliente is None and _config["url"]:
+        import redis
+        _cliente = redis.Redis.from_url(_config["url"], socket_timeout=0.5)
+    return _cliente
+
+
+@lru_cache(maxsize=1)
+def credenciales() -> Optional[Dict[str, str]]:
+    """API key y motor (cx) de Google CSE, leídos del entorno / .env una sola vez por proceso."""
+    load_dotenv()
+    api_key = os.getenv("API_KEY_SEARCH_GOOGLE")
+    cx = os.getenv("SEARCH_ENGINE_ID")
+    if not api_key or not cx:
+        logger.error("Falta API_KEY_SEARCH_GOOGLE o SEARCH_ENGINE_ID en .env")
+        return None
+    return {"api_key": api_key, "cx": cx}
+
+
+def sesion() -> requests.Session:
+    """Session compartida por el proceso: las consultas concurrentes reutilizan sus conexiones."""
+    global _sesion
+    with _candado:
+        if _sesion is None:
+            s = requests.Session()
+            s.mount("https://", HTTPAdapter(pool_maxsize=CONSULTAS_SIMULTANEAS))
+            s.mount("http://", HTTPAdapter(pool_maxsize=CONSULTAS_SIMULTANEAS))
+            _sesion = s
+        return _sesion
+
+
+# ---------------- Plantillas ----------------
+
+def _directorios() -> List[str]:
+    return [d for d in (PLANTILLAS, PLANTILLAS_USUARIO) if d and os.path.isdir(d)]
+
+
+def conjuntos() -> List[str]:
+    """Nombres de los conjuntos de plantillas disponibles (los propios incluidos)."""
+    nombres = {f[:-5] for d in _directorios() for f in os.listdir(d) if f.endswith(".json")}
+    return sorted(nombres, key=lambda n: (n != CONJUNTO_DEFECTO, n))
+
+
+@lru_cache(maxsize=16)
+def plantillas(conjunto: str = CONJUNTO_DEFECTO) -> Tuple[Tuple[str, str], ...]:
+    """(consulta, descripcion) de un conjunto, leído una sola vez por proceso."""
+    ruta = None
+    for d in _directorios() if _NOMBRE_CONJUNTO.match(conjunto) else []:  # el del usuario va último y gana
+        candidata = os.path.join(d, f"{conjunto}.json")
+        if os.path.isfile(candidata):
+            ruta = candidata
+    if ruta is None:
+        raise ValueError(f"Conjunto de dorks desconocido: {conjunto}")
+    with open(ruta, encoding="utf-8") as f:
+        try:
+            return tuple((p["consulta"], p.get("descripcion", p["consulta"])) for p in json.load(f))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Conjunto de dorks inválido {conjunto}: {e}") from e
+
+
+# ---------------- Libro de cuota ----------------
+
+def _dia() -> str:
+    return datetime.now(ZONA_CUOTA).date().isoformat()
+
+
+def _clave_cuota(dia: str) -> str:
+    return f"dorks:cuota:{dia}"
+
+
+def _reservar() -> None:
+    """Toma una unidad de la cuota del día o lanza CuotaAgotada."""
+    dia = _dia()
+    cliente = _redis()
+    if cliente:
+        try:
+            pipe = cliente.pipeline()
+            pipe.incr(_clave_cuota(dia))
+            pipe.expire(_clave_cuota(dia), 2 * 24 * 60 * 60)
+            usadas = pipe.execute()[0]
+            if usadas > CUOTA_DIARIA:
+                cliente.decr(_clave_cuota(dia))
+                raise CuotaAgotada(f"Cuota diaria de Google CSE agotada ({CUOTA_DIARIA} consultas)")
+            return
+        except CuotaAgotada:
+            raise
+        except Exception as e:
+            logger.warning("Libro de cuota compartido no disponible, se lleva en el proceso: %s", e)
+    with _candado:
+        if _cuota_local[dia] >= CUOTA_DIARIA:
+            raise CuotaAgotada(f"Cuota diaria de Google CSE agotada ({CUOTA_DIARIA} consultas)")
+        _cuota_local[dia] += 1
+
+
+def _agotar() -> None:
+    """Google respondió 429: el resto del día se da por usado, aunque el libro no lo supiera."""
+    dia = _dia()
+    cliente = _redis()
+    if cliente:
+        try:
+            cliente.set(_clave_cuota(dia), CUOTA_DIARIA, ex=2 * 24 * 60 * 60)
+            return
+        except Exception as e:
+            logger.warning("Libro de cuota compartido no disponible: %s", e)
+    with _candado:
+        _cuota_local[dia] = CUOTA_DIARIA
+
+
+def cuota() -> Dict[str, Any]:
+    """Uso del día según el libro: {day, used, budget, remaining}."""
+    dia = _dia()
+    usadas = None
+    cliente = _redis()
+    if cliente:
+        try:
+            usadas = int(cliente.get(_clave_cuota(dia)) or 0)
+        except Exception as e:
+            logger.warning("Libro de cuota compartido no disponible: %s", e)
+    if usadas is None:
+        with _candado:
+            usadas = _cuota_local[dia]
+    usadas = min(usadas, CUOTA_DIARIA)
+    return {"day": dia, "used": usadas, "budget": CUOTA_DIARIA, "remaining": CUOTA_DIARIA - usadas}
+
+
+# ---------------- Caché de respuestas ----------------
+
+def _clave(cx: str, consulta: str, inicio: int) -> str:
+    firma = json.dumps([cx, consulta, inicio])
+    return f"dorks:resp:{hashlib.sha1(firma.encode('utf-8')).hexdigest()}"
+
+
+def _leer(clave: str) -> Optional[Dict[str, Any]]:
+    with _candado:
+        entrada = _lru.get(clave)
+        if entrada is not None and entrada[0] > time.time():
+            _lru.move_to_end(clave)
+            return entrada[1]
+        _lru.pop(clave, None)
+    cliente = _redis()
+    if not cliente:
+        return None
+    try:
+        crudo = cliente.get(clave)
+    except Exception as e:
+        logger.warning("Caché de dorks compartida no disponible: %s", e)
+        return None
+    if crudo is None:
+        return None
+    try:
+        pagina = json.loads(crudo)
+    except ValueError:
+        pagina = None
+    if not isinstance(pagina, dict) or not isinstance(pagina.get("items"), list):
+        # entrada ilegible (escrita a medias, otra versión): se pide de nuevo y _guardar la pisa
+        logger.warning("Entrada corrupta en la caché de dorks, se ignora: %s", clave)
+        return None
+    _guardar_lru(clave, pagina, CACHE_TTL)
+    return pagina
+
+
+def _guardar_lru(clave: str, pagina: Dict[str, Any], ttl: int) -> None:
+    with _candado:
+        _lru[clave] = (time.time() + ttl, pagina)
+        _lru.move_to_end(clave)
+        while len(_lru) > LRU_MAX:
+            _lru.popitem(last=False)
+
+
+def _guardar(clave: str, pagina: Dict[str, Any]) -> None:
+    _guardar_lru(clave, pagina, CACHE_TTL)
+    cliente = _redis()
+    if cliente:
+        try:
+            cliente.set(clave, json.dumps(pagina), ex=CACHE_TTL)
+        except Exception as e:
+            logger.warning("Caché de dorks compartida no disponible: %s", e)
+
+
+# ---------------- Consultas ----------------
+
+def pagina(cred: Dict[str, str], consulta: str, inicio: int = 1, timeout: float = 10) -> Tuple[Dict[str, Any], bool]:
+    """
+    Una página de resultados (POR_PAGINA desde `inicio`) de la consulta: ({items, total}, desde_cache).
+    Lanza CuotaAgotada o requests.RequestException si no se pudo obtener.
+    """
+    clave = _clave(cred["cx"], consulta, inicio)
+    encontrada = _leer(clave)
+    if encontrada is not None:
+        return encontrada, True
+    _reservar()
+    params = {"key": cred["api_key"], "cx": cred["cx"], "q": consulta, "start": inicio, "num": POR_PAGINA}
+    resp = sesion().get(CSE_URL, params=params, timeout=timeout)
+    if resp.status_code == 429:
+        _agotar()
+    resp.raise_for_status()
+    datos = resp.json()
+    resultado = {
+        "items": [
+            {"title": it.get("title"), "snippet": it.get("snippet"), "link": it.get("link")}
+            for it in datos.get("items", []) or []
+        ],
+        "total": int((datos.get("searchInformation") or {}).get("totalResults") or RESULTADOS_MAX),
+    }
+    _guardar(clave, resultado)
+    return resultado, False
+
+
+def dork(cred: Dict[str, str], consulta: str, cantidad: int, timeout: float = 10) -> Dict[str, Any]:
+    """
+    Hasta `cantidad` resultados de una consulta, paginando de a POR_PAGINA. Deja de pedir
+    páginas cuando Google no tiene más. Si una página falla devuelve lo que ya tenía más "error".
+    """
+    cantidad = max(1, min(RESULTADOS_MAX, int(cantidad)))
+    salida: Dict[str, Any] = {"query": consulta, "results": [], "requests": 0, "cache_hits": 0}
+    inicio = 1
+    while len(salida["results"]) < cantidad:
+        try:
+            datos, desde_cache = pagina(cred, consulta, inicio, timeout)
+        except CuotaAgotada as e:
+            salida["error"] = str(e)
+            break
+        except requests.HTTPError as e:
+            # sin str(e): el mensaje de requests trae la URL, y en ella la API key
+            salida["error"] = f"Google CSE respondió HTTP {e.response.status_code}"
+            logger.error("Error en Google CSE (%s): %s", consulta, salida["error"])
+            break
+        except requests.RequestException as e:
+            salida["error"] = f"Google CSE no respondió ({type(e).__name__})"
+            logger.error("Error en Google CSE (%s): %s", consulta, salida["error"])
+            break
+        except ValueError:  # JSON o totalResults ilegibles
+            salida["error"] = "Google CSE: respuesta inválida"
+            break
+        salida["cache_hits" if desde_cache else "requests"] += 1
+        salida["results"].extend(datos["items"][: cantidad - len(salida["results"])])
+        inicio += POR_PAGINA
+        if len(datos["items"]) < POR_PAGINA or inicio > min(datos["total"], RESULTADOS_MAX):
+            break
+    return salida
+
+
+def ejecutar(cred: Dict[str, str], consultas: List[str], cantidad: int, timeout: float = 10) -> List[Dict[str, Any]]:
+    """dork() de varias consultas a la vez (CONSULTAS_SIMULTANEAS), en el orden recibido."""
+    if not consultas:
+        return []
+    with ThreadPoolExecutor(max_workers=min(CONSULTAS_SIMULTANEAS, len(consultas))) as hilos:
+        return list(hilos.map(lambda q: dork(cred, q, cantidad, timeout), consultas))
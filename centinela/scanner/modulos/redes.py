@@ -0,0 +1,87 @@
+# Objetivos de red: CIDR (10.0.0.0/24) y rangos (10.0.0.1-10.0.0.50 o 10.0.0.1-50)
+#
+# Nunca se arma la lista de hosts: un objetivo se reduce a (primera, última) dirección
+# y los fragmentos se calculan con aritmética sobre esos enteros. Cada fragmento se
+# expresa como bloques CIDR, que nmap acepta directamente como objetivos.
+import ipaddress
+from typing import Iterator, List, Tuple
+
+Direccion = ipaddress._BaseAddress
+
+
+def parsear(objetivo: str) -> Tuple[Direccion, Direccion]:
+    """
+    (primera, última) dirección de un CIDR o rango. ValueError si no es ninguno
+    de los dos (una IP suelta o un dominio no son redes).
+    """
+    objetivo = objetivo.strip()
+    if "/" in objetivo:
+        red = ipaddress.ip_network(objetivo, strict=False)
+        return red.network_address, red.broadcast_address
+    if "-" in objetivo:
+        inicio, fin = (parte.strip() for parte in objetivo.split("-", 1))
+        primera = ipaddress.ip_address(inicio)
+        if fin.isdigit() and primera.version == 4:
+            # forma corta: 10.0.0.1-50 cambia solo el último octeto
+            fin = inicio.rsplit(".", 1)[0] + "." + fin
+        ultima = ipaddress.ip_address(fin)
+        if ultima.version != primera.version or ultima < primera:
+            raise ValueError(f"Rango inválido: {objetivo}")
+        return primera, ultima
+    raise ValueError(f"No es un CIDR ni un rango: {objetivo}")
+
+
+def es_red(objetivo: str) -> bool:
+    try:
+        parsear(objetivo)
+        return True
+    except ValueError:
+        return False
+
+
+def cantidad_hosts(objetivo: str) -> int:
+    primera, ultima = parsear(objetivo)
+    return int(ultima) - int(primera) + 1
+
+
+def bloques(primera: Direccion, ultima: Direccion) -> List[str]:
+    """Menor lista de CIDR que cubre exactamente [primera, última]."""
+    return [str(red) for red in ipaddress.summarize_address_range(primera, ultima)]
+
+
+def fragmentos(objetivo: str, tamano: int) -> Iterator[str]:
+    """
+    Parte la red en fragmentos de a lo sumo `tamano` direcciones, de a uno y sin
+    materializar los hosts. Cada fragmento es un string de CIDRs separados por espacio.
+    """
+    primera, ultima = parsear(objetivo)
+    tipo = type(primera)
+    actual, fin = int(primera), int(ultima)
+    while actual <= fin:
+        hasta = min(actual + tamano - 1, fin)
+        yield " ".join(bloques(tipo(actual), tipo(hasta)))
+        actual = hasta + 1
+
+
+def direcciones(objetivos: str) -> Iterator[str]:
+    """
+    Recorre de a una las direcciones de objetivos separados por espacio (CIDR, rangos
+    o IPs sueltas), en orden y sin armar la lista.
+    """
+    for token in objetivos.split():
+        if not es_red(token):
+            yield token
+            continue
+        primera, ultima = parsear(token)
+        tipo = type(primera)
+        for n in range(int(primera), int(ultima) + 1):
+            yield str(tipo(n))
+
+
+def clave_orden(ip: str):
+    """Clave para ordenar direcciones numéricamente (IPv4 antes que IPv6; lo inválido al final)."""
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return (7, 0)
+    return (direccion.version, int(direccion))
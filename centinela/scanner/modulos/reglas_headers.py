@@ -0,0 +1,136 @@
+# Motor de reglas para los headers de seguridad HTTP
+#
+# Las reglas son datos (reglas/headers.json, o el archivo de HEADERS_REGLAS) y se compilan
+# una vez por proceso: cada una queda como una función sobre los headers con sus regex ya
+# compiladas. Tipos de regla:
+#   ausente    el header no está
+#   presente   el header está (p. ej. X-Powered-By)
+#   regex      el valor coincide con `patron` (sin distinguir mayúsculas)
+#   no_regex   el header está y su valor NO coincide con `patron`
+#   directiva  sobre el valor separado en directivas ("max-age=300; includeSubDomains",
+#              "script-src 'self' 'unsafe-inline'"). `directiva` es un nombre o una lista
+#              en orden de preferencia (script-src cae en default-src) y la condición es
+#              `falta`, `menor_que` (número) o `contiene` (token).
+# Las reglas de un header solo se evalúan si el header está, salvo "ausente".
+# No depende de Django, igual que los scan_*.py.
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+REGLAS = os.getenv(
+    "HEADERS_REGLAS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas", "headers.json"),
+)
+SEVERIDADES = ("alta", "media", "baja", "info")
+# "max-age=300" o "script-src 'self' https://cdn.example/?v=1": nombre y el resto como valor
+_DIRECTIVA = re.compile(r"\s*([^\s=]+)\s*=?\s*(.*)", re.DOTALL)
+
+
+class _Headers:
+    """Headers de una respuesta sin distinguir mayúsculas; cada valor se parte en directivas una sola vez."""
+
+    def __init__(self, headers: Dict[str, str]):
+        self._valores = {k.lower(): v for k, v in (headers or {}).items()}
+        self._directivas: Dict[str, Dict[str, str]] = {}
+
+    def valor(self, nombre: str) -> Optional[str]:
+        return self._valores.get(nombre)
+
+    def directivas(self, nombre: str) -> Dict[str, str]:
+        if nombre not in self._directivas:
+            partes = {}
+            for parte in (self._valores.get(nombre) or "").split(";"):
+                encontrada = _DIRECTIVA.match(parte)
+                if encontrada:
+                    partes.setdefault(encontrada.group(1).lower(), encontrada.group(2).strip().strip('"'))
+            self._directivas[nombre] = partes
+        return self._directivas[nombre]
+
+
+def _condicion_directiva(regla: Dict[str, Any]) -> Callable[[_Headers, str], bool]:
+    nombres = regla["directiva"]
+    nombres = [n.lower() for n in ([nombres] if isinstance(nombres, str) else nombres)]
+
+    def elegida(h: _Headers, header: str) -> Optional[str]:
+        directivas = h.directivas(header)
+        return next((directivas[n] for n in nombres if n in directivas), None)
+
+    if regla.get("falta"):
+        return lambda h, header: elegida(h, header) is None
+    if "menor_que" in regla:
+        minimo = int(regla["menor_que"])
+
+        def menor(h, header):
+            valor = elegida(h, header)
+            return not (valor or "").isdigit() or int(valor) < minimo
+        return menor
+    if "contiene" in regla:
+        token = regla["contiene"].lower()
+
+        def contiene(h, header):
+            valor = elegida(h, header)
+            return valor is not None and token in valor.lower().split()
+        return contiene
+    raise ValueError("la regla directiva necesita falta, menor_que o contiene")
+
+
+def _compilar_regla(regla: Dict[str, Any]) -> Callable[[_Headers], bool]:
+    """La regla como función headers -> dispara (True) o no."""
+    header = regla["header"].lower()
+    tipo = regla["tipo"]
+    if tipo == "ausente":
+        return lambda h: h.valor(header) is None
+    if tipo == "presente":
+        return lambda h: h.valor(header) is not None
+    if tipo in ("regex", "no_regex"):
+        patron = re.compile(regla["patron"], re.IGNORECASE)
+        esperado = tipo == "regex"
+        return lambda h: h.valor(header) is not None and bool(patron.search(h.valor(header))) == esperado
+    if tipo == "directiva":
+        condicion = _condicion_directiva(regla)
+        return lambda h: h.valor(header) is not None and condicion(h, header)
+    raise ValueError(f"tipo de regla desconocido: {tipo}")
+
+
+class Motor:
+    """Reglas compiladas. `version` identifica el conjunto de reglas (cambia si cambia cualquiera)."""
+
+    def __init__(self, reglas: List[Dict[str, Any]]):
+        self.version = hashlib.sha1(json.dumps(reglas, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self._reglas = []
+        for regla in reglas:
+            try:
+                evaluar = _compilar_regla(regla)
+                hallazgo = {"id": regla["id"], "severity": regla.get("severidad", "media"), "message": regla["mensaje"]}
+            except (KeyError, ValueError, re.error) as e:
+                raise ValueError(f"Regla inválida {regla.get('id', regla)}: {e}") from e
+            if hallazgo["severity"] not in SEVERIDADES:
+                raise ValueError(f"Regla inválida {hallazgo['id']}: severidad {hallazgo['severity']}")
+            self._reglas.append((evaluar, hallazgo))
+
+    def __len__(self) -> int:
+        return len(self._reglas)
+
+    def evaluar(self, headers: Dict[str, str]) -> List[Dict[str, str]]:
+        """Hallazgos ({id, severity, message}) de un conjunto de headers, en el orden de las reglas."""
+        h = _Headers(headers)
+        return [dict(hallazgo) for evaluar, hallazgo in self._reglas if evaluar(h)]
+
+    def evaluar_varios(self, conjuntos: Iterable[Dict[str, str]]) -> Iterator[List[Dict[str, str]]]:
+        """evaluar() sobre muchos conjuntos de headers en una pasada, de a uno (sin armar listas)."""
+        for headers in conjuntos:
+            yield self.evaluar(headers)
+
+
+def cargar(ruta: str = REGLAS) -> List[Dict[str, Any]]:
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=8)
+def motor(ruta: str = REGLAS) -> Motor:
+    """El motor de un archivo de reglas, compilado una sola vez por proceso."""
+    return Motor(cargar(ruta))
@@ -1,9 +1,35 @@
 # dns_resolver_json.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import dns.asyncresolver
 import dns.resolver
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 import json
 
+try:
+    from . import dnscache
+except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+    import dnscache
+
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "dns",
+    "etiqueta": "DNS",
+    "funcion": "run_dns",
+    "funcion_async": "run_dns_async",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 60,
+    "hard_timeout": 90,
+    "concurrencia": 8,
+    "objetivos": ("dominio",),
+    "parciales": True,
+}
+
+# Máximo de consultas simultáneas en la versión síncrona (un hilo por consulta)
+MAX_CONSULTAS = 8
+
 class DNSResolver:
     def __init__(self, domain: str, record_types: Optional[List[str]] = None, timeout: float = 5.0):
         self.domain = domain
@@ -11,25 +37,33 @@ class DNSResolver:
         self.resolver = dns.resolver.Resolver()
         self.resolver.lifetime = timeout
         self.resolver.timeout = timeout
+        self.timeout = timeout
         self.records: Dict[str, List[str]] = {}
         self.meta: Dict[str, Any] = {}
 
-    def resolve_all(self) -> Dict[str, List[str]]:
+    def resolve_all(self, on_parcial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, List[str]]:
         """
-        Realiza resoluciones DNS por cada tipo en self.record_types.
+        Realiza resoluciones DNS por cada tipo en self.record_types, todas a la vez
+        (pool de hilos acotado), así tarda lo que la consulta más lenta y no la suma.
         Guarda resultados en self.records y retorna el dict.
+        Si se pasa on_parcial, se llama con cada tipo apenas se resuelve.
         """
-        self.records = {}
-        for record_type in self.record_types:
-            try:
-                answers = self.resolver.resolve(self.domain, record_type)
-                # para registros MX/SOA puede convenir formatear, aquí convertimos a string simple
-                self.records[record_type] = [r.to_text() for r in answers]
-            except Exception as e:
-                # en caso de error devolvemos lista vacía pero almacenamos el error en meta si es útil
-                self.records[record_type] = []
-                # opcional: almacenar error corto (no sensible) por tipo
-                self.meta.setdefault("errors", {})[record_type] = str(e)
+        # las claves se crean en el orden de self.record_types, lleguen como lleguen las respuestas
+        self.records = {record_type: [] for record_type in self.record_types}
+        with ThreadPoolExecutor(max_workers=min(MAX_CONSULTAS, len(self.record_types) or 1)) as pool:
+            futuros = {
+                pool.submit(dnscache.consultar, self.resolver, self.domain, record_type): record_type
+                for record_type in self.record_types
+            }
+            # los resultados se guardan desde este hilo, los workers solo consultan
+            for futuro in as_completed(futuros):
+                record_type = futuros[futuro]
+                try:
+                    self._guardar_respuesta(record_type, futuro.result())
+                except Exception as e:
+                    self._guardar_error(record_type, e)
+                if on_parcial:
+                    on_parcial(self._parcial(record_type))
         # guardar timestamp de la resolución
         self.meta["resolved_at"] = datetime.utcnow().isoformat() + "Z"
         return self.records
@@ -46,23 +80,108 @@ class DNSResolver:
         # IPs A del dominio
         ips.extend(self.records.get("A", []))
 
-        # Resolver NS -> A
-        ns_records = self.records.get("NS", [])
-        for ns in ns_records:
-            # ns puede venir con un punto final; dns.resolver acepta ambos, pero lo normalizamos
-            ns_hostname = ns.rstrip(".")
-            try:
-                ns_answers = self.resolver.resolve(ns_hostname, "A")
-                ips.extend([a.to_text() for a in ns_answers])
-            except Exception as e:
-                # seguir si falla resolver un NS concreto
-                self.meta.setdefault("ns_resolution_errors", {})[ns_hostname] = str(e)
-                continue
+        # Resolver NS -> A, todos en paralelo
+        # ns puede venir con un punto final; dns.resolver acepta ambos, pero lo normalizamos
+        ns_hostnames = [ns.rstrip(".") for ns in self.records.get("NS", [])]
+        if ns_hostnames:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONSULTAS, len(ns_hostnames))) as pool:
+                futuros = [pool.submit(dnscache.consultar, self.resolver, ns_hostname, "A") for ns_hostname in ns_hostnames]
+                # se recorren en el orden de los NS para que ns_ips salga igual que antes
+                for ns_hostname, futuro in zip(ns_hostnames, futuros):
+                    try:
+                        ips.extend(futuro.result().textos)
+                    except Exception as e:
+                        # seguir si falla resolver un NS concreto
+                        self.meta.setdefault("ns_resolution_errors", {})[ns_hostname] = str(e)
 
         # quitar duplicados y retornar
         unique_ips = list(dict.fromkeys(ips))
         return unique_ips
 
+    def _guardar_respuesta(self, record_type: str, respuesta: "dnscache.Respuesta") -> None:
+        # para registros MX/SOA puede convenir formatear, aquí guardamos el texto simple
+        self.records[record_type] = respuesta.textos
+        # TTL restante del RRset, lo usa la caché de resultados para no servir datos vencidos
+        self.meta.setdefault("ttl", {})[record_type] = respuesta.ttl
+
+    def _parcial(self, record_type: str) -> Dict[str, Any]:
+        # trozo de resultado parcial: un tipo de registro ya resuelto (o su error)
+        trozo = {"type": record_type, "records": self.records[record_type]}
+        error = self.meta.get("errors", {}).get(record_type)
+        if error:
+            trozo["error"] = error
+        return trozo
+
+    def _guardar_error(self, record_type: str, e: Exception) -> None:
+        # en caso de error devolvemos lista vacía pero almacenamos el error en meta si es útil
+        self.records[record_type] = []
+        # opcional: almacenar error corto (no sensible) por tipo
+        self.meta.setdefault("errors", {})[record_type] = str(e)
+
+    # ---------------- Versión asíncrona (dns.asyncresolver) ----------------
+
+    def _async_resolver(self) -> dns.asyncresolver.Resolver:
+        resolver = dns.asyncresolver.Resolver()
+        resolver.lifetime = self.timeout
+        resolver.timeout = self.timeout
+        return resolver
+
+    async def resolve_all_async(
+        self, on_parcial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Igual que resolve_all, pero lanza todas las consultas a la vez sobre el event loop.
+        El orden de self.records se mantiene igual al de self.record_types.
+        on_parcial (si se pasa) es una coroutine y se espera con cada tipo en el orden en que llegan.
+        """
+        resolver = self._async_resolver()
+        self.records = {record_type: [] for record_type in self.record_types}
+
+        async def resolver_tipo(record_type):
+            try:
+                self._guardar_respuesta(record_type, await dnscache.consultar_async(resolver, self.domain, record_type))
+            except Exception as e:
+                self._guardar_error(record_type, e)
+            if on_parcial:
+                await on_parcial(self._parcial(record_type))
+
+        await asyncio.gather(*(resolver_tipo(record_type) for record_type in self.record_types))
+        self.meta["resolved_at"] = datetime.utcnow().isoformat() + "Z"
+        return self.records
+
+    async def resolve_ns_ips_async(self) -> List[str]:
+        """Igual que resolve_ns_ips, resolviendo todos los NS en paralelo."""
+        if not self.records:
+            await self.resolve_all_async()
+
+        ips = list(self.records.get("A", []))
+        ns_hostnames = [ns.rstrip(".") for ns in self.records.get("NS", [])]
+        resolver = self._async_resolver()
+        respuestas = await asyncio.gather(
+            *(dnscache.consultar_async(resolver, ns, "A") for ns in ns_hostnames),
+            return_exceptions=True,
+        )
+        for ns_hostname, ns_answers in zip(ns_hostnames, respuestas):
+            if isinstance(ns_answers, Exception):
+                self.meta.setdefault("ns_resolution_errors", {})[ns_hostname] = str(ns_answers)
+                continue
+            ips.extend(ns_answers.textos)
+
+        return list(dict.fromkeys(ips))
+
+    async def to_dict_async(self) -> Dict[str, Any]:
+        """Versión asíncrona de to_dict, con la misma forma de salida."""
+        if not self.records:
+            await self.resolve_all_async()
+
+        ns_ips = await self.resolve_ns_ips_async()
+        return {
+            "domain": self.domain,
+            "records": self.records,
+            "ns_ips": ns_ips,
+            "meta": self.meta
+        }
+
     def to_dict(self) -> Dict[str, Any]:
         """
         Devuelve un dict serializable con registros, IPs de NS y metadatos.
@@ -85,12 +204,22 @@ class DNSResolver:
         """
         return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
     
-def run_dns(domain: str, record_types: Optional[List[str]] = None, timeout: float = 5.0) -> Dict[str, Any]:
+def run_dns(domain: str, record_types: Optional[List[str]] = None, timeout: float = 5.0,
+            on_parcial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
     """
     Función helper para uso rápido sin instanciar la clase.
     Realiza la resolución y devuelve el dict resultado.
     """
     resolver = DNSResolver(domain=domain, record_types=record_types, timeout=timeout)
-    resolver.resolve_all()
+    resolver.resolve_all(on_parcial=on_parcial)
     return resolver.to_dict()
 
+
+async def run_dns_async(domain: str, record_types: Optional[List[str]] = None, timeout: float = 5.0,
+                        on_parcial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
+    """
+    Versión asíncrona de run_dns para ejecutar junto a otros módulos en un mismo event loop.
+    """
+    resolver = DNSResolver(domain=domain, record_types=record_types, timeout=timeout)
+    await resolver.resolve_all_async(on_parcial=on_parcial)
+    return await resolver.to_dict_async()
@@ -1,104 +1,95 @@
 # dorks_runner.py
-import os
 import logging
-import requests
-from typing import List, Dict, Optional
-from dotenv import load_dotenv
+import time
+from typing import Any, Dict, Optional
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
-# ---------------- ENV ----------------
-def _load_env() -> Optional[Dict[str, str]]:
-    load_dotenv()
-    api_key = os.getenv("API_KEY_SEARCH_GOOGLE")
-    cx = os.getenv("SEARCH_ENGINE_ID")
-    if not api_key or not cx:
-        logging.error("Falta API_KEY_SEARCH_GOOGLE o SEARCH_ENGINE_ID en .env")
-        return None
-    return {"api_key": api_key, "cx": cx}
+try:
+    from . import motor_dorks
+except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+    import motor_dorks
 
-# ---------------- Google CSE helper ----------------
-def _perform_google_search(api_key: str, cx: str, query: str, start: int = 1, num: int = 10, timeout: int = 10) -> List[Dict]:
-    """
-    Ejecuta una búsqueda usando Google Custom Search API y devuelve la lista 'items' (puede ser vacía).
-    """
-    base = "https://www.googleapis.com/customsearch/v1"
-    params = {
-        "key": api_key,
-        "cx": cx,
-        "q": query,
-        "start": max(1, int(start)),
-        "num": max(1, min(10, int(num)))
-    }
-    try:
-        resp = requests.get(base, params=params, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("items", []) or []
-    except requests.HTTPError as e:
-        logging.error("HTTP error en Google CSE: %s - %s", e, getattr(e.response, "text", ""))
-    except requests.Timeout:
-        logging.error("Timeout en Google CSE")
-    except requests.RequestException as e:
-        logging.error("Error request Google CSE: %s", e)
-    except ValueError:
-        logging.error("Error parseando JSON de la respuesta")
-    return []
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# ---------------- Dorks comunes ----------------
-COMMON_DORKS = [
-    # Archivos de bases de datos / dumps
-    ['site:{domain} filetype:sql', "Archivos SQL"],
-    # Archivos de configuración / credenciales
-    ['site:{domain} (filetype:env OR filetype:cfg OR filetype:conf OR filetype:ini)', "Archivos de configuración"],
-    # Backups e índices públicos
-    ['site:{domain} intitle:"index of" (backup OR .bak)', "Backups e índices públicos"],
-    # Archivos Office / pdf con posible información sensible
-    ['site:{domain} (filetype:doc OR filetype:docx OR filetype:pdf)', "Archivos DOC/PDF con posible información sensible"],
-    # URLs expuestas, archivos de logs o config
-    ['site:{domain} inurl:(admin OR dashboard OR config OR configs OR log OR logs OR "error.log" OR "access.log" OR "wp-config.php") -site:github.com -site:gitlab.com -site:stackoverflow.com', "URLs expuestas, archivos de logs o config"]
-]
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "dorks",
+    "etiqueta": "Dorks",
+    "funcion": "run_dorks",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 90,
+    "hard_timeout": 120,
+    "concurrencia": 2,
+    "objetivos": ("dominio",),
+    "limites": {"google_cse": 5},  # una consulta por plantilla de dork (las respuestas en caché no gastan cuota)
+}
 
 # ---------------- Runner público ----------------
-def run_dorks(domain: str, max_dorks: int = 5, results_per_dork: int = 1, max_total_results: int = 5) -> List[Dict]:
+def run_dorks(domain: str, max_dorks: Optional[int] = None, results_per_dork: int = 1, max_total_results: Optional[int] = 5,
+              plantillas: str = motor_dorks.CONJUNTO_DEFECTO) -> Dict[str, Any]:
     """
-    Ejecuta hasta `max_dorks` dorks sobre `domain` usando Google Custom Search API.
-    Devuelve una lista de diccionarios con la forma:
-      [{"query": "...", "results": [{"title":..., "snippet":..., "link":...}, ...]}, ...]
-    - max_dorks: número de plantillas a ejecutar (máx 5, por defecto 5)
-    - results_per_dork: resultados por petición (1..10)
-    - max_total_results: opcional, tope global de resultados agregados (None = sin tope)
+    Ejecuta las plantillas del conjunto `plantillas` sobre `domain` usando Google Custom Search API
+    (concurrentes, con caché por consulta y libro de cuota diaria: ver motor_dorks.py).
+    Devuelve un diccionario con la forma:
+      {"results": [{"description": "...", "query": "...", "results": [{"title":..., "snippet":..., "link":...}, ...]}, ...],
+       "template_set": "...", "quota": {...}, "meta": {...}}
+    - max_dorks: número de plantillas a ejecutar (None = todas las del conjunto)
+    - results_per_dork: resultados por dork (1..100; más de 10 pagina)
+    - max_total_results: opcional, tope global de resultados agregados (None = sin tope);
+      las plantillas que quedan después del tope no se consultan ni aparecen en "results"
     """
-    env = _load_env()
-    if not env:
+    cred = motor_dorks.credenciales()
+    if not cred:
         raise RuntimeError("Faltan credenciales en .env: API_KEY_SEARCH_GOOGLE y/o SEARCH_ENGINE_ID")
 
-    api_key = env["api_key"]
-    cx = env["cx"]
+    templates = motor_dorks.plantillas(plantillas)
+    if max_dorks is not None:
+        templates = templates[: max(1, int(max_dorks))]
 
-    templates = COMMON_DORKS[: max(1, min(5, int(max_dorks)))] # minimo 1, máximo 5
-    aggregated: List[Dict] = []
-    total_count = 0
-
-    for tpl in templates:
-        q = tpl[0].format(domain=domain)
-        logging.info("Ejecutando dork: %s", q)
-        items = _perform_google_search(api_key, cx, q, start=1, num=results_per_dork)
+    inicio = time.monotonic()
+    consultas = [tpl[0].format(domain=domain) for tpl in templates]
+    logging.info("Ejecutando %d dorks (%s) sobre %s", len(consultas), plantillas, domain)
 
-        results = []
-        for it in items:
-            results.append({
-                "title": it.get("title"),
-                "snippet": it.get("snippet"),
-                "link": it.get("link")
-            })
-            total_count += 1
+    # Con tope global las plantillas corren por tandas, en orden, y cada tanda lanza solo las
+    # que todavía pueden hacer falta (a lo sumo CONSULTAS_SIMULTANEAS): alcanzado el tope no
+    # sale ninguna petición más. Si una plantilla trae menos resultados de los esperados la
+    # tanda siguiente completa; lo que trajo de más la última tanda queda en caché.
+    por_dork = max(1, int(results_per_dork))
+    aggregated, ejecutados = [], []
+    total_count = 0
+    siguiente = 0
+    while siguiente < len(templates) and (max_total_results is None or total_count < max_total_results):
+        tanda = len(templates) - siguiente
+        if max_total_results is not None:
+            tanda = min(tanda, motor_dorks.CONSULTAS_SIMULTANEAS, -(-(max_total_results - total_count) // por_dork))
+        resultados = motor_dorks.ejecutar(cred, consultas[siguiente: siguiente + tanda], results_per_dork)
+        ejecutados += resultados
+        for tpl, ejecutado in zip(templates[siguiente: siguiente + tanda], resultados):
+            # el tope global se aplica en el orden de las plantillas, igual que cuando corrían de a una
+            restantes = None if max_total_results is None else max_total_results - total_count
+            results = ejecutado["results"][:restantes]
+            total_count += len(results)
+            dork = {"description": tpl[1], "query": ejecutado["query"], "results": results}
+            if "error" in ejecutado:
+                dork["error"] = ejecutado["error"]
+            aggregated.append(dork)
             if max_total_results is not None and total_count >= max_total_results:
                 break
+        siguiente += tanda
 
-        aggregated.append({"description": tpl[1], "query": q, "results": results})
-
-        if max_total_results is not None and total_count >= max_total_results:
-            break
-
-    return aggregated
+    salida: Dict[str, Any] = {
+        "results": aggregated,
+        "template_set": plantillas,
+        "quota": motor_dorks.cuota(),
+        "meta": {
+            "requests": sum(e["requests"] for e in ejecutados),
+            "cache_hits": sum(e["cache_hits"] for e in ejecutados),
+            "duration": round(time.monotonic() - inicio, 3),
+        },
+    }
+    fallidos = [d for d in aggregated if "error" in d]
+    if fallidos and len(fallidos) == len(aggregated):
+        salida["error"] = fallidos[0]["error"]
+    elif fallidos:
+        salida["incomplete"] = True  # no se cachea: mañana (o con cuota) puede completarse
+    return salida
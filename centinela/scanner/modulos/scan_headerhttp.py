@@ -1,47 +1,196 @@
 import requests
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional
+from urllib.parse import urljoin
 import json
 
+try:
+    from . import reglas_headers
+except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+    import reglas_headers
+
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "headers",
+    "etiqueta": "Headers HTTP",
+    "funcion": "run_headerhttp",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 30,
+    "hard_timeout": 60,
+    "concurrencia": 8,
+    "objetivos": ("dominio", "ip"),
+    "limites": {"host": 1},
+}
+
+POOL_HOSTS = 64          # hosts con conexiones keep-alive guardadas en el pool (por proceso)
+POOL_CONEXIONES = 4      # conexiones guardadas por host
+MAX_REDIRECCIONES = 5
+DRENAR_MAX = 64 * 1024   # cuerpos declarados hasta este tamaño se descartan leyendo: la conexión vuelve al pool
+
+_sesion: Optional[requests.Session] = None
+_candado = threading.Lock()
+
+
+def sesion() -> requests.Session:
+    """
+    Session compartida por el proceso (se crea al primer uso, después del fork del worker):
+    los escaneos seguidos al mismo host, como los de un lote, reutilizan sus conexiones.
+    No guarda cookies, para que nada pase de un objetivo (o usuario) a otro.
+    """
+    global _sesion
+    with _candado:
+        if _sesion is None:
+            s = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_CONEXIONES)
+            s.mount("http://", adaptador)
+            s.mount("https://", adaptador)
+            s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            _sesion = s
+        return _sesion
+
+
+def _liberar(resp: requests.Response) -> None:
+    """
+    Cierra la respuesta sin descargar el cuerpo. Si es chico y de largo conocido (típico
+    de las redirecciones) se descarta leyéndolo, así la conexión queda viva en el pool;
+    si no, se cierra la conexión, que es más barato que bajar una página pesada.
+    """
+    largo = resp.headers.get("Content-Length", "")
+    if largo.isdigit() and int(largo) <= DRENAR_MAX:
+        try:
+            resp.raw.drain_conn()
+        except Exception:
+            pass
+    resp.close()
+
+
+class _Peticiones:
+    """
+    Las peticiones de un escaneo, una por URL: si la cadena de http redirige a una URL
+    que la de https ya pidió (o está pidiendo), espera ese resultado en vez de repetirla.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._resultados: Dict[str, Any] = {}
+        self._en_curso: Dict[str, threading.Event] = {}
+        self._candado = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resultados)
+
+    def pedir(self, url: str) -> Dict[str, Any]:
+        with self._candado:
+            evento = self._en_curso.get(url)
+            propia = evento is None
+            if propia:
+                evento = self._en_curso[url] = threading.Event()
+        if not propia:
+            evento.wait()
+        else:
+            try:
+                # verify va en cada petición: requests ignora Session.verify si hay REQUESTS_CA_BUNDLE en el entorno
+                resp = sesion().get(url, timeout=self.timeout, stream=True, allow_redirects=False, verify=False)
+                try:
+                    self._resultados[url] = {
+                        "status": resp.status_code,
+                        "headers": dict(resp.headers),
+                        "location": resp.headers.get("Location") if resp.is_redirect else None,
+                    }
+                finally:
+                    _liberar(resp)
+            except requests.exceptions.RequestException as e:
+                self._resultados[url] = {"error": str(e)}
+            except Exception as e:
+                self._resultados[url] = {"error": f"{type(e).__name__}: {e}"}
+            finally:
+                # aunque la petición se corte con algo que no es Exception, quien espera esta URL no queda sin resultado
+                self._resultados.setdefault(url, {"error": "Petición interrumpida"})
+                evento.set()
+        return self._resultados[url]
+
+    def cadena(self, url: str) -> Dict[str, Any]:
+        """Sigue las redirecciones desde `url` hasta una respuesta final (o un error)."""
+        saltos: List[Dict[str, Any]] = []
+        for _ in range(MAX_REDIRECCIONES + 1):
+            resp = self.pedir(url)
+            if "error" in resp:
+                return {"url": url, "error": resp["error"], "chain": saltos}
+            if not resp["location"]:
+                return {"url": url, "status": resp["status"], "headers": resp["headers"], "chain": saltos}
+            saltos.append({"url": url, "status": resp["status"], "location": resp["location"]})
+            url = urljoin(url, resp["location"])
+        return {"url": url, "error": f"Más de {MAX_REDIRECCIONES} redirecciones", "chain": saltos}
+
+
 def run_headerhttp(domain: str, timeout: float = 5.0) -> Dict[str, Any]:
     """
     Escanea los headers HTTP(S) de un dominio y detecta configuraciones básicas de seguridad.
-    
+    Sin esquema prueba https:// y http:// a la vez (con sus redirecciones); los headers
+    y las revisiones son los de la respuesta final de https, o de http si https falla.
+    Nunca descarga el cuerpo de las páginas.
+
     :param domain: dominio o URL (ej: 'example.com' o 'https://example.com')
     :param timeout: tiempo máximo de espera para la conexión
     :return: diccionario con headers y posibles alertas de seguridad
     """
-    # Normalizar la URL agregando esquema si falta
-    if not domain.startswith(("http://", "https://")):
-        url = "https://" + domain  # por defecto HTTPS
+    # Normalizar: con esquema se prueba esa URL; sin esquema, HTTPS y HTTP
+    if domain.startswith(("http://", "https://")):
+        urls = {domain.split(":", 1)[0]: domain}
     else:
-        url = domain
-
-    result: Dict[str, Any] = {"url": url, "headers": {}, "security_issues": []}
+        urls = {"https": "https://" + domain, "http": "http://" + domain}
 
-    try:
-        # Enviar petición HTTP GET
-        resp = requests.get(url, timeout=timeout, verify=False)
-        headers = dict(resp.headers)
-        result["headers"] = headers
+    inicio = time.monotonic()
+    peticiones = _Peticiones(timeout)
+    with ThreadPoolExecutor(max_workers=len(urls)) as hilos:
+        sondas = dict(zip(urls, hilos.map(peticiones.cadena, urls.values())))
 
-        # ---------------- Revisiones básicas de seguridad ----------------
-        if "Strict-Transport-Security" not in headers:
-            result["security_issues"].append("HSTS no configurado (Strict-Transport-Security)")
+    principal = next((sondas[e] for e in ("https", "http") if e in sondas and "error" not in sondas[e]), None)
+    result: Dict[str, Any] = {
+        "url": principal["url"] if principal else next(iter(urls.values())),
+        "headers": {},
+        "security_issues": [],
+        "probes": {esquema: {k: v for k, v in sonda.items() if k != "headers"} for esquema, sonda in sondas.items()},
+        "meta": {"requests": len(peticiones), "duration": round(time.monotonic() - inicio, 3)},
+    }
 
-        if "X-Frame-Options" not in headers:
-            result["security_issues"].append("Protección clickjacking ausente (X-Frame-Options)")
+    if principal is None:
+        result["error"] = "; ".join(f"{esquema}: {sonda['error']}" for esquema, sonda in sondas.items())
+        return result
 
-        if "X-Content-Type-Options" not in headers:
-            result["security_issues"].append("Protección MIME sniffing ausente (X-Content-Type-Options)")
+    result["headers"] = principal["headers"]
+    return calificar(result)
 
-        if "Content-Security-Policy" not in headers:
-            result["security_issues"].append("Política de seguridad de contenido ausente (Content-Security-Policy)")
 
-        if "Referrer-Policy" not in headers:
-            result["security_issues"].append("Política de referrer no definida (Referrer-Policy)")
+def _hallazgos_sondas(result: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Hallazgos que no salen de los headers sino de las sondas (http que no pasa a https)."""
+    probes = result.get("probes") or {}
+    https, http = probes.get("https"), probes.get("http")
+    if https and "error" not in https and http and "error" not in http and not http["url"].startswith("https://"):
+        return [{"id": "http-sin-redireccion", "severity": "media", "message": "HTTP no redirige a HTTPS"}]
+    return []
 
-    except requests.exceptions.RequestException as e:
-        result["error"] = str(e)
 
+def calificar(result: Dict[str, Any], motor: Optional["reglas_headers.Motor"] = None) -> Dict[str, Any]:
+    """
+    Aplica las reglas de seguridad (scanner/modulos/reglas/headers.json) a un resultado ya
+    obtenido: findings con el detalle, security_issues con los mensajes y rules_version
+    con la versión de las reglas usadas. Modifica el resultado y lo devuelve.
+    """
+    calificar_varios([result], motor)
     return result
 
+
+def calificar_varios(results: List[Dict[str, Any]], motor: Optional["reglas_headers.Motor"] = None) -> None:
+    """calificar() sobre muchos resultados guardados en una pasada del motor (sin volver a escanear)."""
+    motor = motor or reglas_headers.motor()
+    for result, hallazgos in zip(results, motor.evaluar_varios(r.get("headers") or {} for r in results)):
+        hallazgos += _hallazgos_sondas(result)
+        result["findings"] = hallazgos
+        result["security_issues"] = [h["message"] for h in hallazgos]
+        result["rules_version"] = motor.version
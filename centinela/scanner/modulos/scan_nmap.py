@@ -1,28 +1,197 @@
 # app/scan_nmap.py
+import asyncio
+import ctypes
+import os
+import re
+import signal
 import subprocess
+import sys
+import tempfile
+import time
 import xml.etree.ElementTree as ET
+from collections import Counter
 
-def run_nmap(ip, service_detection=True):
+try:
+    from . import barrido, dnscache, redes
+except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+    import barrido
+    import dnscache
+    import redes
+
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "nmap",
+    "etiqueta": "Nmap",
+    "funcion": "run_nmap",
+    "costo": "subprocess",
+    "cola": "heavy",
+    "soft_timeout": 10 * 60,
+    "hard_timeout": 15 * 60,
+    "concurrencia": 2,
+    "objetivos": ("dominio", "ip", "red"),
+    "limites": {"host": 1},
+    "parciales": True,
+    "fragmentar": "fragmentos_red",
+    "unir": "unir_fragmentos",
+    "incremental": True,
+}
+
+# Línea de la salida normal (-v) con la que nmap avisa cada puerto abierto apenas lo encuentra
+PUERTO_DESCUBIERTO = re.compile(r"Discovered open port (\d+)/(\w+) on (\S+)")
+# Cada cuánto nmap informa el avance (<taskprogress> en el XML y una línea "Stats:" en stdout)
+STATS_CADA = "5s"
+# Segundos que se le dan a nmap para salir tras SIGTERM antes de matarlo
+ESPERA_TERMINAR = 5
+
+# Los 1000 puertos TCP más frecuentes según nmap (los mismos de su escaneo por defecto)
+TOP_1000 = (
+    "1,3-4,6-7,9,13,17,19-26,30,32-33,37,42-43,49,53,70,79-85,88-90,99-100,106,109-111,113,"
+    "119,125,135,139,143-144,146,161,163,179,199,211-212,222,254-256,259,264,280,301,306,311,"
+    "340,366,389,406-407,416-417,425,427,443-445,458,464-465,481,497,500,512-515,524,541,"
+    "543-545,548,554-555,563,587,593,616-617,625,631,636,646,648,666-668,683,687,691,700,705,"
+    "711,714,720,722,726,749,765,777,783,787,800-801,808,843,873,880,888,898,900-903,911-912,"
+    "981,987,990,992-993,995,999-1002,1007,1009-1011,1021-1100,1102,1104-1108,1110-1114,1117,"
+    "1119,1121-1124,1126,1130-1132,1137-1138,1141,1145,1147-1149,1151-1152,1154,1163-1166,"
+    "1169,1174-1175,1183,1185-1187,1192,1198-1199,1201,1213,1216-1218,1233-1234,1236,1244,"
+    "1247-1248,1259,1271-1272,1277,1287,1296,1300-1301,1309-1311,1322,1328,1334,1352,1417,"
+    "1433-1434,1443,1455,1461,1494,1500-1501,1503,1521,1524,1533,1556,1580,1583,1594,1600,"
+    "1641,1658,1666,1687-1688,1700,1717-1721,1723,1755,1761,1782-1783,1801,1805,1812,"
+    "1839-1840,1862-1864,1875,1900,1914,1935,1947,1971-1972,1974,1984,1998-2010,2013,"
+    "2020-2022,2030,2033-2035,2038,2040-2043,2045-2049,2065,2068,2099-2100,2103,2105-2107,"
+    "2111,2119,2121,2126,2135,2144,2160-2161,2170,2179,2190-2191,2196,2200,2222,2251,2260,"
+    "2288,2301,2323,2366,2381-2383,2393-2394,2399,2401,2492,2500,2522,2525,2557,2601-2602,"
+    "2604-2605,2607-2608,2638,2701-2702,2710,2717-2718,2725,2800,2809,2811,2869,2875,"
+    "2909-2910,2920,2967-2968,2998,3000-3001,3003,3005-3007,3011,3013,3017,3030-3031,3052,"
+    "3071,3077,3128,3168,3211,3221,3260-3261,3268-3269,3283,3300-3301,3306,3322-3325,3333,"
+    "3351,3367,3369-3372,3389-3390,3404,3476,3493,3517,3527,3546,3551,3580,3659,3689-3690,"
+    "3703,3737,3766,3784,3800-3801,3809,3814,3826-3828,3851,3869,3871,3878,3880,3889,3905,"
+    "3914,3918,3920,3945,3971,3986,3995,3998,4000-4006,4045,4111,4125-4126,4129,4224,4242,"
+    "4279,4321,4343,4443-4446,4449,4550,4567,4662,4848,4899-4900,4998,5000-5004,5009,5030,"
+    "5033,5050-5051,5054,5060-5061,5080,5087,5100-5102,5120,5190,5200,5214,5221-5222,"
+    "5225-5226,5269,5280,5298,5357,5405,5414,5431-5432,5440,5500,5510,5544,5550,5555,5560,"
+    "5566,5631,5633,5666,5678-5679,5718,5730,5800-5802,5810-5811,5815,5822,5825,5850,5859,"
+    "5862,5877,5900-5904,5906-5907,5910-5911,5915,5922,5925,5950,5952,5959-5963,5987-5989,"
+    "5998-6007,6009,6025,6059,6100-6101,6106,6112,6123,6129,6156,6346,6389,6502,6510,6543,"
+    "6547,6565-6567,6580,6646,6666-6669,6689,6692,6699,6779,6788-6789,6792,6839,6881,6901,"
+    "6969,7000-7002,7004,7007,7019,7025,7070,7100,7103,7106,7200-7201,7402,7435,7443,7496,"
+    "7512,7625,7627,7676,7741,7777-7778,7800,7911,7920-7921,7937-7938,7999-8002,8007-8011,"
+    "8021-8022,8031,8042,8045,8080-8090,8093,8099-8100,8180-8181,8192-8194,8200,8222,8254,"
+    "8290-8292,8300,8333,8383,8400,8402,8443,8500,8600,8649,8651-8652,8654,8701,8800,8873,"
+    "8888,8899,8994,9000-9003,9009-9011,9040,9050,9071,9080-9081,9090-9091,9099-9103,"
+    "9110-9111,9200,9207,9220,9290,9415,9418,9485,9500,9502-9503,9535,9575,9593-9595,9618,"
+    "9666,9876-9878,9898,9900,9917,9929,9943-9944,9968,9998-10004,10009-10010,10012,"
+    "10024-10025,10082,10180,10215,10243,10566,10616-10617,10621,10626,10628-10629,10778,"
+    "11110-11111,11967,12000,12174,12265,12345,13456,13722,13782-13783,14000,14238,"
+    "14441-14442,15000,15002-15004,15660,15742,16000-16001,16012,16016,16018,16080,16113,"
+    "16992-16993,17877,17988,18040,18101,18988,19101,19283,19315,19350,19780,19801,19842,"
+    "20000,20005,20031,20221-20222,20828,21571,22939,23502,24444,24800,25734-25735,26214,"
+    "27000,27352-27353,27355-27356,27715,28201,30000,30718,30951,31038,31337,32768-32785,"
+    "33354,33899,34571-34573,35500,38292,40193,40911,41511,42510,44176,44442-44443,44501,"
+    "45100,48080,49152-49161,49163,49165,49167,49175-49176,49400,49999-50003,50006,50300,"
+    "50389,50500,50636,50800,51103,51493,52673,52822,52848,52869,54045,54328,55055-55056,"
+    "55555,55600,56737-56738,57294,57797,58080,60020,60443,61532,61900,62078,63331,64623,"
+    "64680,65000,65129,65389"
+)
+
+# Perfiles de puertos seleccionables; "custom" usa la lista que se pase en `puertos`
+PERFILES = {
+    "quick": "22,80,443,3306",
+    "web": "80,81,443,591,3000,5000,8000,8008,8080,8081,8443,8888,9000,9443",
+    "db": "1433,1521,3306,5432,5984,6379,7474,8529,9042,9200,11211,27017,28015",
+    "top-1000": TOP_1000,
+}
+PERFIL_DEFECTO = "quick"
+# Con listas más largas los puertos no abiertos se resumen por estado en "extraports" (como hace nmap)
+DETALLE_MAX = 32
+# Re-escaneo incremental: cuánto sigue valiendo lo medido en un escaneo anterior del mismo host
+REPOSO_TTL = 6 * 60 * 60      # puertos cerrados / filtrados: no se vuelven a sondear antes de esto
+SERVICIO_TTL = 24 * 60 * 60   # servicio (-sV) de un puerto que sigue abierto: no se vuelve a detectar
+
+
+def puertos_de_perfil(perfil=PERFIL_DEFECTO, puertos=None):
+    """Lista de puertos (estilo nmap) de un perfil; el perfil "custom" usa `puertos`."""
+    if perfil == "custom":
+        if not puertos:
+            raise ValueError("El perfil custom necesita una lista de puertos")
+        return puertos
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de puertos desconocido: {perfil}")
+    return PERFILES[perfil]
+
+
+def run_nmap(ip, service_detection=True, on_parcial=None, perfil=PERFIL_DEFECTO, puertos=None, previo=None):
     """
-    Ejecuta Nmap sobre un host con puertos comunes y devuelve JSON.
+    Escanea un host (o una red) en dos fases y devuelve JSON:
+      1. barrido TCP connect en asyncio sobre todos los puertos (scanner/modulos/barrido.py)
+      2. nmap -sV solo sobre los puertos que quedaron abiertos (si no hay ninguno, no se lanza)
+    Con `previo` (re-escaneo incremental de un host) solo se vuelven a sondear los puertos
+    que estaban abiertos, y el resto se reutiliza mientras no pase REPOSO_TTL; el -sV se
+    repite solo en puertos recién abiertos o con el servicio más viejo que SERVICIO_TTL.
     
-    :param ip: IP o dominio del host
-    :param service_detection: si True, hace -sV para detección de servicios
+    :param ip: IP o dominio del host, o bloques CIDR / rango separados por espacio
+    :param service_detection: si True, hace -sV sobre los puertos abiertos
+    :param on_parcial: callback opcional, recibe cada puerto abierto, cada host terminado y el avance;
+        los puertos abiertos se avisan desde el event loop del barrido, así que no debe bloquear
+    :param perfil: perfil de puertos (quick, web, db, top-1000 o custom)
+    :param puertos: lista de puertos al estilo nmap ("22,80,8000-8100") para el perfil custom
+    :param previo: resultado de un escaneo anterior del mismo objetivo
     :return: lista de hosts con info de puertos (JSON serializable)
     """
     result = []
 
-    # Lista de puertos comunes para escaneo intermedio
-    # puertos = "21,22,23,25,53,80,110,143,443,3306,3389"
-    puertos = "22,80,443,3306"
-
     try:
-        cmd = ["nmap", "-Pn", "-T4", "-p", puertos, "-oX", "-"]  # XML directo a stdout
-        if service_detection:
-            cmd.insert(1, "-sV")  # añade detección de servicios
+        perfil_puertos = puertos_de_perfil(perfil, puertos)
+        lista = barrido.parsear_puertos(perfil_puertos)
+        objetivos = ip.split()
+        es_red = len(objetivos) > 1 or redes.es_red(ip)
+        if not es_red:
+            objetivos = [dnscache.resolver_host(ip)]
+        ahora = time.time()
+
+        anterior = None if es_red else _host_previo(previo, objetivos[0], perfil_puertos, ahora)
+        a_sondear = lista
+        if anterior:
+            a_sondear = sorted({int(p["port"]) for p in anterior["ports"] if p["state"] == "open"} & set(lista))
+
+        estados = asyncio.run(barrido.barrer(
+            redes.direcciones(" ".join(objetivos)), a_sondear, on_abierto=_avisar_abierto(on_parcial),
+        ))["hosts"]
+        if anterior:
+            # lo no abierto del escaneo anterior sigue vigente: se copia tal cual
+            estados.setdefault(objetivos[0], {}).update(
+                {int(p["port"]): p["state"] for p in anterior["ports"] if p["state"] != "open"})
+
+        abiertos = {
+            host: sorted(p for p, estado in puertos_host.items() if estado == "open")
+            for host, puertos_host in estados.items()
+        }
+        abiertos = {host: lista_host for host, lista_host in abiertos.items() if lista_host}
 
-        proc = subprocess.run(cmd + [ip], capture_output=True, text=True, check=True)
-        result = parse_nmap(proc.stdout)
+        servicios = {}
+        if service_detection and abiertos:
+            # solo hay escaneo anterior con un único host, así que `vigentes` es de ese host
+            vigentes = _servicios_vigentes(anterior, ahora) if anterior else {}
+            faltan = {host: [p for p in lista_host if str(p) not in vigentes] for host, lista_host in abiertos.items()}
+            faltan = {host: lista_host for host, lista_host in faltan.items() if lista_host}
+            nuevos = detectar_servicios(faltan, on_parcial) if faltan else {}
+            servicios = {
+                host: {**vigentes, **{puerto: (servicio, ahora) for puerto, servicio in nuevos.get(host, {}).items()}}
+                for host in abiertos
+            }
+
+        for host in sorted(estados, key=redes.clave_orden):
+            # En una red solo se listan los hosts con algún puerto abierto
+            if es_red and host not in abiertos:
+                continue
+            host_info = _host_desde_barrido(
+                host, estados[host], servicios.get(host, {}), len(lista),
+                anterior.get("extraports") if anterior else None,
+            )
+            host_info["profile"] = perfil_puertos
+            host_info["probed_at"] = anterior["probed_at"] if anterior else ahora
+            if anterior:
+                host_info["incremental"] = {"probed": len(a_sondear), "reused": len(lista) - len(a_sondear)}
+            result.append(host_info)
 
     except subprocess.CalledProcessError as e:
         result = {"error": str(e)}
@@ -30,38 +199,229 @@ def run_nmap(ip, service_detection=True):
     return result
 
 
+def _host_previo(previo, ip, perfil_puertos, ahora):
+    """
+    El host del escaneo anterior que se puede reutilizar: misma IP, mismo perfil de
+    puertos y barrido completo hace menos de REPOSO_TTL. None si no hay.
+    """
+    if not isinstance(previo, list):
+        return None
+    for host in previo:
+        if (isinstance(host, dict) and host.get("ip") == ip and host.get("profile") == perfil_puertos
+                and ahora - host.get("probed_at", 0) < REPOSO_TTL):
+            return host
+    return None
+
+
+def _servicios_vigentes(anterior, ahora):
+    """{puerto: (servicio, detectado_en)} de los puertos abiertos del host anterior con servicio fresco."""
+    return {
+        p["port"]: (p["service"], p["service_at"])
+        for p in anterior["ports"]
+        if p["state"] == "open" and p.get("service") and ahora - p.get("service_at", 0) < SERVICIO_TTL
+    }
+
+
+def _avisar_abierto(on_parcial):
+    """on_abierto del barrido: cada puerto abierto sale como trozo parcial apenas se encuentra."""
+    async def avisar(host, puerto):
+        # se llama dentro del loop: el callback solo encola (la escritura la hace el hilo de scanner/tasks.py)
+        on_parcial({"ip": host, "port": str(puerto), "protocol": "tcp", "state": "open"})
+
+    return avisar if on_parcial else None
+
+
+def detectar_servicios(abiertos, on_parcial=None):
+    """
+    nmap -sV sobre los hosts con puertos abiertos, solo en esos puertos.
+    Devuelve {ip: {puerto: servicio}}.
+    """
+    puertos = sorted({p for lista in abiertos.values() for p in lista})
+    cmd = ["nmap", "-sV", "-n", "-Pn", "-T4", "-p", ",".join(str(p) for p in puertos)]
+    if any(":" in h for h in abiertos):
+        cmd.append("-6")
+    def reenviar(trozo):
+        # los puertos abiertos ya se avisaron en el barrido: de nmap solo interesan hosts y avance
+        if "port" not in trozo:
+            on_parcial(trozo)
+
+    hosts = ejecutar_nmap(cmd + sorted(abiertos, key=redes.clave_orden), reenviar if on_parcial else None)
+    return {h["ip"]: {p["port"]: p["service"] for p in h["ports"]} for h in hosts}
+
+
+def _host_desde_barrido(ip, estados, servicios, total, extraports=None):
+    """
+    Un host del barrido al formato de _host_a_dict. `servicios` es {puerto: (servicio,
+    detectado_en)}; `extraports` son los conteos resumidos que vienen de un escaneo anterior.
+    """
+    host_info = {"ip": ip, "ports": []}
+    resumen = Counter(extraports or {})
+    for puerto, estado in sorted(estados.items()):
+        if estado != "open" and total > DETALLE_MAX:
+            resumen[estado] += 1
+            continue
+        port_info = {"port": str(puerto), "protocol": "tcp", "state": estado, "service": {}}
+        if estado == "open" and str(puerto) in servicios:
+            port_info["service"], port_info["service_at"] = servicios[str(puerto)]
+        host_info["ports"].append(port_info)
+    if resumen:
+        host_info["extraports"] = dict(resumen)
+    return host_info
+
+
+def fragmentos_red(red, tamano):
+    """Fragmentos de una red para repartir entre workers: bloques CIDR separados por espacio."""
+    return redes.fragmentos(red, tamano)
+
+
+def unir_fragmentos(resultados):
+    """Une las listas de hosts de cada fragmento en una sola, ordenada por IP."""
+    hosts = [host for lista in resultados for host in lista]
+    return sorted(hosts, key=lambda h: redes.clave_orden(h["ip"]))
+
+
+def _morir_con_el_padre():
+    # Linux: si el worker muere (revoke con terminate, hard timeout) nmap recibe SIGTERM
+    try:
+        ctypes.CDLL("libc.so.6", use_errno=True).prctl(1, signal.SIGTERM)  # PR_SET_PDEATHSIG
+    except Exception:
+        pass
+
+
+def _terminar(proc):
+    """SIGTERM a nmap y, si no sale a tiempo, SIGKILL."""
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=ESPERA_TERMINAR)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+class LectorXML:
+    """
+    Parsea el XML de nmap a medida que se escribe: cada <host> cerrado se convierte
+    con _host_a_dict y se saca del árbol, así la memoria no crece con la salida.
+    """
+
+    def __init__(self, ruta, on_parcial=None):
+        self.ruta = ruta
+        self.on_parcial = on_parcial
+        self.parser = ET.XMLPullParser(events=("start", "end"))
+        self.archivo = None
+        self.raiz = None
+        self.hosts = []
+
+    def leer(self):
+        """Procesa lo que nmap haya escrito desde la última llamada."""
+        if self.archivo is None:
+            if not os.path.exists(self.ruta):
+                return
+            self.archivo = open(self.ruta, "rb")
+        datos = self.archivo.read()
+        if not datos:
+            return
+        self.parser.feed(datos)
+        for evento, elem in self.parser.read_events():
+            if evento == "start":
+                if self.raiz is None:
+                    self.raiz = elem
+                continue
+            if elem.tag == "host":
+                host = _host_a_dict(elem)
+                self.hosts.append(host)
+                if self.on_parcial:
+                    abiertos = [p["port"] for p in host["ports"] if p["state"] == "open"]
+                    self.on_parcial({"host": host["ip"], "open_ports": abiertos})
+            elif elem.tag == "taskprogress" and self.on_parcial:
+                self.on_parcial({
+                    "task": elem.attrib.get("task", ""),
+                    "progress": float(elem.attrib.get("percent", 0)),
+                    "remaining": int(elem.attrib.get("remaining", 0) or 0),
+                })
+            # hijos directos de <nmaprun> ya procesados: fuera del árbol
+            if self.raiz is not None and elem.tag in ("host", "hosthint", "taskbegin", "taskprogress", "taskend"):
+                elem.clear()
+                try:
+                    self.raiz.remove(elem)
+                except ValueError:
+                    pass
+
+    def cerrar(self):
+        if self.archivo is not None:
+            self.archivo.close()
+
+
+def ejecutar_nmap(cmd, on_parcial=None):
+    """
+    Lanza nmap (Popen) con el XML a un archivo temporal que se parsea mientras crece.
+    stdout (salida normal -v) se lee línea a línea: trae los puertos abiertos apenas se
+    encuentran y, con --stats-every, una línea cada STATS_CADA que también sirve para
+    leer el XML nuevo. Si la tarea se corta (soft timeout, revoke) nmap se termina.
+    Devuelve la lista de hosts con el mismo formato que parse_nmap.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "nmap.xml")
+        lector = LectorXML(xml_path, on_parcial)
+        cmd = cmd[:1] + ["-v", "--stats-every", STATS_CADA, "-oX", xml_path] + cmd[1:]
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            preexec_fn=_morir_con_el_padre if sys.platform.startswith("linux") else None,
+        )
+        try:
+            for linea in proc.stdout:
+                m = PUERTO_DESCUBIERTO.search(linea)
+                if m and on_parcial:
+                    on_parcial({"ip": m.group(3), "port": m.group(1), "protocol": m.group(2), "state": "open"})
+                lector.leer()
+            proc.wait()
+            lector.leer()
+        except BaseException:
+            _terminar(proc)
+            raise
+        finally:
+            proc.stdout.close()
+            lector.cerrar()
+
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return lector.hosts
+
+
 def parse_nmap(xml_string):
     """
     Parsea el XML de Nmap (en string) y devuelve JSON.
     """
     root = ET.fromstring(xml_string)
-    hosts_data = []
-
-    for host in root.findall("host"):
-        host_info = {"ip": "", "ports": []}
-
-        addr = host.find("address")
-        if addr is not None:
-            host_info["ip"] = addr.attrib.get("addr", "")
-
-        ports = host.find("ports")
-        if ports is not None:
-            for port in ports.findall("port"):
-                port_info = {
-                    "port": port.attrib.get("portid", ""),
-                    "protocol": port.attrib.get("protocol", ""),
-                    "state": port.find("state").attrib.get("state", ""),
-                    "service": {}
+    return [_host_a_dict(host) for host in root.findall("host")]
+
+
+def _host_a_dict(host):
+    """Un elemento <host> del XML de nmap al dict que devuelve el módulo."""
+    host_info = {"ip": "", "ports": []}
+
+    addr = host.find("address")
+    if addr is not None:
+        host_info["ip"] = addr.attrib.get("addr", "")
+
+    ports = host.find("ports")
+    if ports is not None:
+        for port in ports.findall("port"):
+            port_info = {
+                "port": port.attrib.get("portid", ""),
+                "protocol": port.attrib.get("protocol", ""),
+                "state": port.find("state").attrib.get("state", ""),
+                "service": {}
+            }
+            service = port.find("service")
+            if service is not None:
+                port_info["service"] = {
+                    "name": service.attrib.get("name", ""),
+                    "product": service.attrib.get("product", ""),
+                    "version": service.attrib.get("version", "")
                 }
-                service = port.find("service")
-                if service is not None:
-                    port_info["service"] = {
-                        "name": service.attrib.get("name", ""),
-                        "product": service.attrib.get("product", ""),
-                        "version": service.attrib.get("version", "")
-                    }
-                host_info["ports"].append(port_info)
-
-        hosts_data.append(host_info)
-
-    return hosts_data
+            host_info["ports"].append(port_info)
+
+    return host_info
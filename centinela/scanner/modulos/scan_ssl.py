@@ -1,19 +1,80 @@
 # ssl_scanner.py
+import asyncio
+import hashlib
 import socket
 import ssl
 import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 
-# Intentamos usar cryptography para parseo completo (recomendado).
 try:
-    from cryptography import x509
-    from cryptography.hazmat.primitives import serialization
-    from cryptography.hazmat.primitives.asymmetric import rsa, ec
-    from cryptography.hazmat.backends import default_backend
-    CRYPTO_AVAILABLE = True
-except Exception:
-    CRYPTO_AVAILABLE = False
+    from . import dnscache
+except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+    import dnscache
+
+# cryptography (en requirements.txt) parsea los certificados: el DER del handshake y los de la cadena
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import rsa, ec
+from cryptography.hazmat.backends import default_backend
+
+
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "ssl",
+    "etiqueta": "SSL",
+    "funcion": "run_ssl",
+    "funcion_async": "run_ssl_async",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 30,
+    "hard_timeout": 60,
+    "concurrencia": 8,
+    "objetivos": ("dominio", "ip"),
+    "limites": {"host": 1},
+    "certificados": True,
+}
+
+# Campos que dependen solo del certificado (no del escaneo): se parsean una vez por huella
+# SHA-256 del DER y son los que scanner/certificados.py guarda aparte junto al PEM
+CAMPOS_CERTIFICADO = (
+    "subject", "issuer", "not_before", "not_after", "serial_number",
+    "signature_algorithm", "san", "public_key",
+)
+PARSEADOS_MAX = 1024    # certificados parseados en memoria por proceso (CDNs y wildcards se repiten mucho)
+_parseados: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_candado = threading.Lock()
+
+# Modo extendido: versiones de protocolo y grupos de cifrados (TLS <= 1.2, sintaxis OpenSSL)
+# que se prueban, cada uno con su propio handshake y todos a la vez
+PROTOCOLOS = {
+    "TLSv1": ssl.TLSVersion.TLSv1,
+    "TLSv1.1": ssl.TLSVersion.TLSv1_1,
+    "TLSv1.2": ssl.TLSVersion.TLSv1_2,
+    "TLSv1.3": ssl.TLSVersion.TLSv1_3,
+}
+GRUPOS_CIFRADOS = {
+    "ECDHE-AESGCM": "ECDHE+AESGCM",
+    "ECDHE-CHACHA20": "ECDHE+CHACHA20",
+    "ECDHE-CBC": "ECDHE+AES:!AESGCM",
+    "DHE": "DHE",
+    "RSA": "kRSA",      # sin forward secrecy
+    "3DES": "3DES",
+    "RC4": "RC4",
+    "NULL": "eNULL",
+}
+
+# Handshakes simultáneos contra un mismo host en modo extendido: alcanza para todas las
+# sondas a la vez (el costo es el de la más lenta) sin pasar de ese tope si se agregan más
+SONDAS_POR_HOST = 12
+
+# Modo barrido: puertos donde se suele hablar TLS directo (sin STARTTLS) y tope de
+# handshakes en vuelo contra el objetivo, sumando todos los puertos y nombres SNI
+PUERTOS_TLS = (443, 465, 636, 853, 989, 990, 993, 995, 5061, 8443)
+CONEXIONES_BARRIDO = 32
+NOMBRES_MAX = 32        # nombres SNI por barrido además del propio objetivo (SANs / subdominios)
 
 
 class SSLCertScanner:
@@ -25,45 +86,141 @@ class SSLCertScanner:
         self.cert_dict: Dict[str, Any] = {}
         self.meta: Dict[str, Any] = {}
 
-    def _get_peer_cert_der(self) -> Optional[bytes]:
-        """
-        Conecta al host:port y devuelve el certificado en formato DER (bytes).
-        """
+    def _contexto(self) -> ssl.SSLContext:
         context = ssl.create_default_context()
         # No verificamos hostname ni chain para el escaneo; solo obtener cert
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE
+        return context
+
+    @staticmethod
+    def _leer_handshake(ssl_object) -> Dict[str, Any]:
+        """
+        Todo lo que se necesita sale de un único handshake: el certificado (DER), la
+        cadena que presentó el servidor, la versión de protocolo y el cifrado negociados.
+        """
+        cifrado = ssl_object.cipher() or (None, None, None)
+        return {
+            "der": ssl_object.getpeercert(binary_form=True),
+            "cadena": _cadena_presentada(ssl_object),
+            "protocol": ssl_object.version(),
+            "cipher": cifrado[0],
+            "bits": cifrado[2],
+        }
+
+    def _handshake(self) -> Dict[str, Any]:
+        """
+        Conecta al host:port y hace el handshake TLS (una sola conexión).
+        """
+        context = self._contexto()
 
-        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+        # la IP sale de la caché DNS compartida; el SNI sigue siendo el host
+        direccion = dnscache.resolver_host(self.host, timeout=self.timeout)
+        with socket.create_connection((direccion, self.port), timeout=self.timeout) as sock:
             with context.wrap_socket(sock, server_hostname=self.host) as ssock:
-                der = ssock.getpeercert(binary_form=True)
-                return der
+                return self._leer_handshake(ssock)
 
-    def scan(self) -> Dict[str, Any]:
+    async def _handshake_async(self) -> Dict[str, Any]:
         """
-        Ejecuta el escaneo y devuelve el dict con la info del certificado.
+        Igual que _handshake, pero sobre el event loop (asyncio streams).
+        """
+        direccion = await dnscache.resolver_host_async(self.host, timeout=self.timeout)
+        return await self._handshake_en(direccion, self.port, self.host)
+
+    async def _handshake_en(self, direccion: str, port: int, sni: str) -> Dict[str, Any]:
+        """Un handshake contra direccion:port presentando `sni` (el barrido cambia puerto y nombre)."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(direccion, port, ssl=self._contexto(), server_hostname=sni),
+            timeout=self.timeout,
+        )
+        try:
+            return self._leer_handshake(writer.get_extra_info("ssl_object"))
+        finally:
+            writer.close()
+
+    async def _sondear(self, direccion: str, context: ssl.SSLContext) -> Dict[str, Any]:
+        """
+        Un handshake de prueba con un contexto restringido (una versión o un grupo de cifrados).
+        supported: True si el servidor aceptó, False si lo rechazó, None si no se pudo determinar.
         """
         try:
-            der = self._get_peer_cert_der()
-            if not der:
-                return {"error": "No se obtuvo certificado (respuesta vacía)"}
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(direccion, self.port, ssl=context, server_hostname=self.host),
+                timeout=self.timeout,
+            )
+        except (ssl.SSLError, ConnectionResetError):
+            # alerta TLS o corte en pleno handshake: el servidor no acepta esa combinación
+            return {"supported": False}
+        except (OSError, asyncio.TimeoutError) as e:
+            return {"supported": None, "error": str(e) or type(e).__name__}
+        cifrado = writer.get_extra_info("ssl_object").cipher() or (None,)
+        writer.close()
+        return {"supported": True, "cipher": cifrado[0]}
 
-            # Convertir a PEM para guardarlo/mostrarlo
-            pem = ssl.DER_cert_to_PEM_cert(der)
-            self.raw_pem = pem
+    async def _extendido(self) -> Dict[str, Any]:
+        """
+        Modo extendido: prueba cada versión de protocolo y cada grupo de cifrados con su
+        propio handshake, todos concurrentes (a lo sumo SONDAS_POR_HOST a la vez), así el
+        costo es el de la sonda más lenta y no la suma. Las combinaciones que el OpenSSL
+        local no puede ofrecer quedan como supported=None.
+        """
+        direccion = await dnscache.resolver_host_async(self.host, timeout=self.timeout)
+        semaforo = asyncio.Semaphore(SONDAS_POR_HOST)
 
-            if CRYPTO_AVAILABLE:
-                cert = x509.load_der_x509_certificate(der, backend=default_backend())
-                self.cert_dict = self._parse_with_cryptography(cert)
-            else:
-                # Fallback: usar ssl.getpeercert (no da DER aquí), pero podemos parsear mínimo
-                self.cert_dict = self._parse_with_ssl_fallback(der)
+        async def sonda(armar):
+            try:
+                context = armar()
+            except (ValueError, ssl.SSLError) as e:
+                return {"supported": None, "error": f"No disponible en el cliente: {e}"}
+            async with semaforo:
+                return await self._sondear(direccion, context)
 
-            # metadata
-            self.meta["scanned_at"] = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
-            self.cert_dict["raw_pem"] = self.raw_pem
-            self.cert_dict["meta"] = self.meta
-            return self.cert_dict
+        nombres = [("protocols", n) for n in PROTOCOLOS] + [("cipher_groups", n) for n in GRUPOS_CIFRADOS]
+        resultados = await asyncio.gather(
+            *(sonda(lambda v=PROTOCOLOS[n]: _contexto_sonda(v, v)) for n in PROTOCOLOS),
+            *(sonda(lambda g=GRUPOS_CIFRADOS[n]: _contexto_sonda(ssl.TLSVersion.TLSv1, ssl.TLSVersion.TLSv1_2, g))
+              for n in GRUPOS_CIFRADOS),
+        )
+        salida: Dict[str, Dict[str, Any]] = {"protocols": {}, "cipher_groups": {}}
+        for (seccion, nombre), resultado in zip(nombres, resultados):
+            salida[seccion][nombre] = resultado
+        return salida
+
+    def _procesar(self, handshake: Dict[str, Any], extendido: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Parsea el certificado obtenido y arma el dict de salida.
+        """
+        der = handshake.get("der")
+        if not der:
+            return {"error": "No se obtuvo certificado (respuesta vacía)"}
+
+        # Convertir a PEM para guardarlo/mostrarlo
+        pem = ssl.DER_cert_to_PEM_cert(der)
+        self.raw_pem = pem
+
+        sha256 = hashlib.sha256(der).hexdigest()
+        self.cert_dict = {"sha256": sha256, **self._parseado(der, sha256)}
+        self.cert_dict.update(_vigencia(self.cert_dict.get("not_after")))
+
+        self.cert_dict["tls"] = {k: handshake.get(k) for k in ("protocol", "cipher", "bits")}
+        if extendido is not None:
+            self.cert_dict["chain"] = [self._resumen(c) for c in handshake.get("cadena") or [der]]
+            self.cert_dict.update(extendido)
+
+        # metadata
+        self.meta["scanned_at"] = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
+        self.cert_dict["raw_pem"] = self.raw_pem
+        self.cert_dict["meta"] = self.meta
+        return self.cert_dict
+
+    def scan(self, extendido: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta el escaneo y devuelve el dict con la info del certificado.
+        Con extendido=True agrega la cadena presentada y las versiones/cifrados aceptados.
+        """
+        try:
+            handshake = self._handshake()
+            return self._procesar(handshake, asyncio.run(self._extendido()) if extendido else None)
 
         except (socket.timeout, ConnectionRefusedError) as e:
             return {"error": f"Conexión fallida: {str(e)}"}
@@ -72,6 +229,130 @@ class SSLCertScanner:
         except Exception as e:
             return {"error": f"Error inesperado: {str(e)}"}
 
+    async def scan_async(self, extendido: bool = False) -> Dict[str, Any]:
+        """
+        Versión asíncrona de scan, con la misma salida. En modo extendido el handshake
+        principal y las sondas corren a la vez.
+        """
+        try:
+            if extendido:
+                handshake, sondas = await asyncio.gather(self._handshake_async(), self._extendido())
+            else:
+                handshake, sondas = await self._handshake_async(), None
+            return self._procesar(handshake, sondas)
+
+        except (socket.timeout, asyncio.TimeoutError, ConnectionRefusedError) as e:
+            return {"error": f"Conexión fallida: {str(e)}"}
+        except ssl.SSLError as e:
+            return {"error": f"Error TLS/SSL: {str(e)}"}
+        except Exception as e:
+            return {"error": f"Error inesperado: {str(e)}"}
+
+    async def barrer(
+        self,
+        puertos: Optional[List[int]] = None,
+        nombres: Optional[List[str]] = None,
+        concurrencia: int = CONEXIONES_BARRIDO,
+    ) -> Dict[str, Any]:
+        """
+        Modo barrido: handshakes sobre puertos x nombres SNI contra la dirección del objetivo,
+        agrupados por certificado. Primero cada puerto con el objetivo como SNI; después,
+        solo en los puertos que hablaron TLS, cada nombre conocido (`nombres` más los SANs
+        vistos en la primera pasada). Todos los handshakes comparten un mismo semáforo.
+        """
+        inicio = time.monotonic()
+        direccion = await dnscache.resolver_host_async(self.host, timeout=self.timeout)
+        semaforo = asyncio.Semaphore(concurrencia)
+        certificados: Dict[str, Dict[str, Any]] = {}
+        estados: Dict[str, str] = {}
+        errores: List[Dict[str, Any]] = []
+        meta = {"handshakes": 0}
+
+        async def handshake(port: int, sni: str) -> Optional[Dict[str, Any]]:
+            async with semaforo:
+                meta["handshakes"] += 1
+                try:
+                    datos = await self._handshake_en(direccion, port, sni)
+                except socket.gaierror:
+                    raise   # el objetivo no resuelve: falla el barrido completo, no cada puerto
+                except ConnectionRefusedError:
+                    return {"estado": "closed"}
+                except (OSError, asyncio.TimeoutError, ssl.SSLError) as e:
+                    es_tls = isinstance(e, (ssl.SSLError, ConnectionResetError))
+                    return {"estado": "no-tls" if es_tls else "filtered", "error": str(e) or type(e).__name__}
+            if not datos.get("der"):
+                return {"estado": "no-tls", "error": "Sin certificado"}
+            return {"estado": "tls", **datos}
+
+        def anotar(port: int, sni: str, datos: Dict[str, Any]) -> None:
+            if datos["estado"] != "tls":
+                if "error" in datos:
+                    errores.append({"port": port, "sni": sni, "error": datos["error"]})
+                return
+            der = datos["der"]
+            sha256 = hashlib.sha256(der).hexdigest()
+            if sha256 not in certificados:
+                parsed = self._parseado(der, sha256)
+                certificados[sha256] = {
+                    "sha256": sha256, **parsed, **_vigencia(parsed.get("not_after")),
+                    "raw_pem": ssl.DER_cert_to_PEM_cert(der), "endpoints": [],
+                }
+            certificados[sha256]["endpoints"].append(
+                {"port": port, "sni": sni, **{k: datos.get(k) for k in ("protocol", "cipher")}})
+
+        puertos = sorted(set(puertos or PUERTOS_TLS))
+        for port, datos in zip(puertos, await asyncio.gather(*(handshake(p, self.host) for p in puertos))):
+            estados[str(port)] = datos["estado"]
+            anotar(port, self.host, datos)
+
+        vistos = [san for cert in certificados.values() for san in cert.get("san") or []]
+        extra = _nombres_sni(self.host, list(nombres or []) + vistos)
+        pares = [(p, n) for p in puertos if estados[str(p)] == "tls" for n in extra]
+        for (port, sni), datos in zip(pares, await asyncio.gather(*(handshake(p, n) for p, n in pares))):
+            anotar(port, sni, datos)
+
+        return {
+            "host": self.host,
+            "address": direccion,
+            "ports": estados,
+            "names": [self.host] + extra,
+            "certificates": sorted(certificados.values(), key=lambda c: -len(c["endpoints"])),
+            "errors": errores,
+            "meta": {
+                **meta,
+                "duration": round(time.monotonic() - inicio, 3),
+                "scanned_at": datetime.utcnow().replace(tzinfo=timezone.utc).isoformat(),
+            },
+        }
+
+    def _parseado(self, der: bytes, sha256: str) -> Dict[str, Any]:
+        """
+        Campos de CAMPOS_CERTIFICADO para el DER dado. Cada certificado se parsea una sola
+        vez por proceso: las siguientes apariciones de la misma huella salen de la LRU.
+        """
+        with _candado:
+            if sha256 in _parseados:
+                _parseados.move_to_end(sha256)
+                return _parseados[sha256]
+
+        cert = x509.load_der_x509_certificate(der, backend=default_backend())
+        parsed = self._parse_with_cryptography(cert)
+
+        with _candado:
+            _parseados[sha256] = parsed
+            if len(_parseados) > PARSEADOS_MAX:
+                _parseados.popitem(last=False)
+        return parsed
+
+    def _resumen(self, der: bytes) -> Dict[str, Any]:
+        """Resumen de un certificado de la cadena: huella SHA-256, sujeto, emisor y vencimiento."""
+        sha256 = hashlib.sha256(der).hexdigest()
+        try:
+            parsed = self._parseado(der, sha256)
+        except Exception as e:
+            return {"sha256": sha256, "error": str(e)}
+        return {"sha256": sha256, **{k: parsed.get(k) for k in ("subject", "issuer", "not_after")}}
+
     def _parse_with_cryptography(self, cert: "x509.Certificate") -> Dict[str, Any]:
         """
         Extrae datos relevantes usando cryptography.x509
@@ -94,11 +375,8 @@ class SSLCertScanner:
                 issuer.setdefault(key, []).append(str(attr.value))
 
         # Validity
-        not_before = cert.not_valid_before.replace(tzinfo=timezone.utc).isoformat()
-        not_after = cert.not_valid_after_utc.replace(tzinfo=timezone.utc).isoformat()
-        now = datetime.utcnow().replace(tzinfo=timezone.utc)
-        days_to_expire = (cert.not_valid_after_utc - now).days if cert.not_valid_after_utc > now else 0
-        expired = now > cert.not_valid_after_utc
+        not_before = cert.not_valid_before_utc.isoformat()
+        not_after = cert.not_valid_after_utc.isoformat()
 
         # SANs
         san_list: List[str] = []
@@ -129,8 +407,6 @@ class SSLCertScanner:
             "issuer": issuer,
             "not_before": not_before,
             "not_after": not_after,
-            "expired": expired,
-            "days_to_expire": days_to_expire,
             "serial_number": str(cert.serial_number),
             "signature_algorithm": sig_alg,
             "san": san_list,
@@ -138,67 +414,6 @@ class SSLCertScanner:
         }
         return parsed
 
-    def _parse_with_ssl_fallback(self, der_bytes: bytes) -> Dict[str, Any]:
-        """
-        Fallback simple si cryptography no está disponible.
-        Usamos ssl module para obtener info mínima usando getpeercert() by re-opening socket.
-        """
-        # abrimos socket otra vez para usar getpeercert() en formato dict
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
-            with context.wrap_socket(sock, server_hostname=self.host) as ssock:
-                cert_dict = ssock.getpeercert()
-
-        # cert_dict puede incluir 'subject', 'issuer', 'notAfter', 'notBefore', 'subjectAltName'...
-        subject = {}
-        for part in cert_dict.get("subject", ()):
-            for k, v in part:
-                subject.setdefault(k, []).append(v)
-
-        issuer = {}
-        for part in cert_dict.get("issuer", ()):
-            for k, v in part:
-                issuer.setdefault(k, []).append(v)
-
-        san = []
-        for typ, val in cert_dict.get("subjectAltName", ()):
-            if typ.lower() == "dns":
-                san.append(val)
-
-        not_before = cert_dict.get("notBefore")
-        not_after = cert_dict.get("notAfter")
-        # transformar fechas si vienen en string -- ssl devuelve formato como 'Jun  1 12:00:00 2025 GMT'
-        def _parse_ssl_date(dt_str):
-            try:
-                return datetime.strptime(dt_str, "%b %d %H:%M:%S %Y %Z").replace(tzinfo=timezone.utc).isoformat()
-            except Exception:
-                return dt_str
-
-        parsed = {
-            "subject": subject,
-            "issuer": issuer,
-            "not_before": _parse_ssl_date(not_before) if not_before else None,
-            "not_after": _parse_ssl_date(not_after) if not_after else None,
-            "expired": None,
-            "days_to_expire": None,
-            "serial_number": cert_dict.get("serialNumber"),
-            "signature_algorithm": None,
-            "san": san
-        }
-        # calcular expired/days cuando sea posible
-        try:
-            if parsed["not_after"]:
-                na = datetime.fromisoformat(parsed["not_after"])
-                now = datetime.utcnow().replace(tzinfo=timezone.utc)
-                parsed["expired"] = now > na
-                parsed["days_to_expire"] = (na - now).days
-        except Exception:
-            pass
-
-        return parsed
-
     def to_dict(self) -> Dict[str, Any]:
         """
         Devuelve dict listo para serializar (con raw_pem en cert_dict).
@@ -211,10 +426,105 @@ class SSLCertScanner:
         return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
 
 
+def _cadena_presentada(ssl_object) -> List[bytes]:
+    """
+    Certificados (DER) que envió el servidor, hoja primero, con get_unverified_chain()
+    (API pública desde Python 3.13, la versión de la imagen). Con un intérprete anterior
+    no hay forma pública de leerla y la cadena queda reducida a la hoja.
+    """
+    if not hasattr(ssl_object, "get_unverified_chain"):
+        return []
+    try:
+        return list(ssl_object.get_unverified_chain() or [])
+    except ssl.SSLError:
+        return []
+
+
+def _vigencia(not_after: Optional[str]) -> Dict[str, Any]:
+    """expired / days_to_expire al momento del escaneo (no se cachean con el certificado)."""
+    try:
+        na = datetime.fromisoformat(not_after)
+    except (TypeError, ValueError):
+        return {"expired": None, "days_to_expire": None}
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    return {"expired": now > na, "days_to_expire": (na - now).days if na > now else 0}
+
+
+def _nombres_sni(host: str, candidatos: List[str]) -> List[str]:
+    """
+    Nombres para SNI además del host: sin comodines ni repetidos, primero los del mismo
+    dominio que el objetivo y a lo sumo NOMBRES_MAX.
+    """
+    host = host.lower().rstrip(".")
+    dominio = host.split(".", 1)[1] if host.count(".") >= 2 else host
+    nombres = []
+    for nombre in candidatos:
+        nombre = nombre.strip().lower().rstrip(".")
+        if nombre and "*" not in nombre and nombre != host and nombre not in nombres:
+            nombres.append(nombre)
+    nombres.sort(key=lambda n: not (n == dominio or n.endswith("." + dominio)))
+    return nombres[:NOMBRES_MAX]
+
+
+def _contexto_sonda(minimo: ssl.TLSVersion, maximo: ssl.TLSVersion, cifrados: Optional[str] = None) -> ssl.SSLContext:
+    """
+    Contexto para una sonda del modo extendido: sin verificación y con SECLEVEL=0 para
+    que el cliente pueda ofrecer versiones y cifrados viejos (lo que se quiere detectar).
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_ciphers(f"{cifrados or 'ALL'}:@SECLEVEL=0")
+    context.minimum_version = minimo
+    context.maximum_version = maximo
+    return context
+
+
 # Helper público (función rápida)
-def run_ssl(host: str, port: int = 443, timeout: float = 5.0) -> Dict[str, Any]:
+def run_ssl(
+    host: str,
+    port: int = 443,
+    timeout: float = 5.0,
+    extendido: bool = False,
+    barrido: bool = False,
+    puertos: Optional[List[int]] = None,
+    nombres: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     """
     Helper para uso rápido: escanea el certificado TLS/SSL del host y devuelve un dict.
+    Con extendido=True también la cadena presentada y los protocolos / cifrados aceptados.
+    Con barrido=True recorre puertos x nombres SNI y agrupa por certificado (ver barrer);
+    en ese modo no se hacen las sondas de extendido.
     """
     scanner = SSLCertScanner(host, port=port, timeout=timeout)
-    return scanner.scan()
+    if barrido:
+        return asyncio.run(_barrer(scanner, puertos, nombres))
+    return scanner.scan(extendido=extendido)
+
+
+async def run_ssl_async(
+    host: str,
+    port: int = 443,
+    timeout: float = 5.0,
+    extendido: bool = False,
+    barrido: bool = False,
+    puertos: Optional[List[int]] = None,
+    nombres: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Versión asíncrona de run_ssl para ejecutar junto a otros módulos en un mismo event loop.
+    """
+    scanner = SSLCertScanner(host, port=port, timeout=timeout)
+    if barrido:
+        return await _barrer(scanner, puertos, nombres)
+    return await scanner.scan_async(extendido=extendido)
+
+
+async def _barrer(scanner: SSLCertScanner, puertos, nombres) -> Dict[str, Any]:
+    """barrer() con los mismos errores en forma de dict que scan()."""
+    try:
+        return await scanner.barrer(puertos, nombres)
+    except (OSError, asyncio.TimeoutError) as e:
+        return {"error": f"Conexión fallida: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Error inesperado: {str(e)}"}
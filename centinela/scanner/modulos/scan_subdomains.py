@@ -0,0 +1,218 @@
+# subdomains_enum.py
+import asyncio
+import os
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import dns.asyncresolver
+import dns.resolver
+
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "subdomains",
+    "etiqueta": "Subdominios",
+    "funcion": "run_subdomains",
+    "funcion_async": "run_subdomains_async",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 5 * 60,
+    "hard_timeout": 6 * 60,
+    "concurrencia": 2,
+    "objetivos": ("dominio",),
+    "parciales": True,
+}
+
+# Wordlist por defecto (una palabra por línea, # para comentarios); SUBDOMAINS_WORDLIST la reemplaza
+WORDLIST = os.getenv(
+    "SUBDOMAINS_WORDLIST",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists", "subdominios.txt"),
+)
+EN_VUELO = 500          # consultas simultáneas como máximo (memoria y sockets no crecen con la wordlist)
+SONDAS_COMODIN = 3      # etiquetas al azar para detectar DNS comodín (*.dominio)
+PARCIAL_CADA = 1.0      # segundos mínimos entre dos envíos de resultados parciales
+
+
+def leer_wordlist(ruta: str) -> Iterator[str]:
+    """Recorre la wordlist línea a línea, sin cargarla entera en memoria."""
+    with open(ruta, encoding="utf-8", errors="ignore") as f:
+        for linea in f:
+            palabra = linea.strip().lower()
+            if palabra and not palabra.startswith("#"):
+                yield palabra
+
+
+class SubdomainEnumerator:
+    def __init__(
+        self,
+        domain: str,
+        wordlist: Optional[Iterable[str]] = None,
+        en_vuelo: int = EN_VUELO,
+        timeout: float = 2.0,
+        nameservers: Optional[List[str]] = None,
+        port: int = 53,
+    ):
+        self.domain = domain.strip().lower().rstrip(".")
+        self.wordlist = wordlist if wordlist is not None else leer_wordlist(WORDLIST)
+        self.en_vuelo = en_vuelo
+        self.timeout = timeout
+        self.nameservers = nameservers
+        self.port = port
+        self.encontrados: Dict[str, List[str]] = {}
+        self.comodin: Set[str] = set()
+        self.meta: Dict[str, Any] = {"tested": 0, "failed": 0, "sources": {"wordlist": 0, "san": 0}}
+
+    def _resolver(self) -> dns.asyncresolver.Resolver:
+        resolver = dns.asyncresolver.Resolver(configure=not self.nameservers)
+        if self.nameservers:
+            resolver.nameservers = self.nameservers
+            resolver.port = self.port
+        resolver.lifetime = self.timeout
+        # con miles de consultas en vuelo se pierde algún UDP: se reintenta dentro del lifetime
+        resolver.timeout = self.timeout / 3
+        return resolver
+
+    async def _resolver_a(self, resolver, nombre: str) -> List[str]:
+        """IPs (A) de un nombre, lista vacía si no existe o la consulta falla."""
+        try:
+            answers = await resolver.resolve(nombre, "A")
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return []
+        except Exception:
+            self.meta["failed"] += 1  # timeout / SERVFAIL: el nombre quedó sin probar de verdad
+            return []
+        return sorted({r.to_text() for r in answers})
+
+    async def detectar_comodin(self, resolver) -> Set[str]:
+        """
+        Resuelve algunas etiquetas al azar: si responden, el dominio tiene DNS comodín
+        y esas IPs no prueban que un subdominio exista.
+        """
+        sondas = [f"{secrets.token_hex(8)}.{self.domain}" for _ in range(SONDAS_COMODIN)]
+        for ips in await asyncio.gather(*(self._resolver_a(resolver, s) for s in sondas)):
+            self.comodin.update(ips)
+        return self.comodin
+
+    def _candidatos(self, sans: List[str]) -> Iterator[str]:
+        # primero los nombres de los SAN (ya sabemos que existieron), después la wordlist
+        for nombre in sans:
+            self.meta["sources"]["san"] += 1
+            yield nombre
+        vistos = set(sans)
+        for palabra in self.wordlist:
+            nombre = f"{palabra}.{self.domain}"
+            if nombre not in vistos:
+                self.meta["sources"]["wordlist"] += 1
+                yield nombre
+
+    async def enumerar(
+        self,
+        sans: Optional[List[str]] = None,
+        on_parcial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Prueba cada candidato con a lo sumo self.en_vuelo consultas en vuelo: un número
+        fijo de trabajadores consume el mismo iterador, así nunca hay más tareas vivas
+        que trabajadores aunque la wordlist tenga cientos de miles de entradas.
+        """
+        resolver = self._resolver()
+        await self.detectar_comodin(resolver)
+        candidatos = self._candidatos(sans or [])
+        pendientes: List[str] = []
+        terminado = asyncio.Event()
+        inicio = time.monotonic()
+
+        async def trabajador():
+            for nombre in candidatos:
+                self.meta["tested"] += 1
+                ips = await self._resolver_a(resolver, nombre)
+                # descartar lo que solo responde por el comodín y los repetidos
+                if not ips or (self.comodin and set(ips) <= self.comodin) or nombre in self.encontrados:
+                    continue
+                self.encontrados[nombre] = ips
+                pendientes.append(nombre)
+
+        async def enviar_parciales():
+            # los hallazgos salen agrupados cada PARCIAL_CADA segundos, no uno por consulta
+            while not terminado.is_set():
+                try:
+                    await asyncio.wait_for(terminado.wait(), timeout=PARCIAL_CADA)
+                except asyncio.TimeoutError:
+                    pass
+                if pendientes:
+                    lote = pendientes[:]
+                    pendientes.clear()
+                    await on_parcial({"subdomains": lote})
+
+        envio = asyncio.create_task(enviar_parciales()) if on_parcial else None
+        try:
+            await asyncio.gather(*(trabajador() for _ in range(self.en_vuelo)))
+        finally:
+            terminado.set()
+            if envio:
+                await envio
+
+        duracion = time.monotonic() - inicio
+        self.meta["duration"] = round(duracion, 3)
+        self.meta["qps"] = round(self.meta["tested"] / duracion, 1) if duracion else None
+        return self.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.meta["found"] = len(self.encontrados)
+        return {
+            "domain": self.domain,
+            "subdomains": [{"name": n, "ips": ips} for n, ips in sorted(self.encontrados.items())],
+            "wildcard": sorted(self.comodin),
+            "meta": self.meta,
+        }
+
+
+async def cosechar_sans(domain: str) -> List[str]:
+    """
+    Nombres bajo el dominio que aparecen en los SAN del certificado TLS del dominio
+    (los comodines *.x se toman como x). Si no hay TLS devuelve lista vacía.
+    """
+    try:
+        from .scan_ssl import SSLCertScanner
+    except ImportError:  # ejecutado como script suelto desde scanner/modulos/
+        from scan_ssl import SSLCertScanner
+
+    domain = domain.strip().lower().rstrip(".")
+    datos = await SSLCertScanner(domain).scan_async()
+    nombres = []
+    for san in datos.get("san", []) if isinstance(datos, dict) else []:
+        nombre = san.lower().rstrip(".")
+        if nombre.startswith("*."):
+            nombre = nombre[2:]
+        if nombre.endswith("." + domain) and nombre not in nombres:
+            nombres.append(nombre)
+    return nombres
+
+
+async def run_subdomains_async(
+    domain: str,
+    wordlist: Optional[Iterable[str]] = None,
+    sans: bool = True,
+    en_vuelo: int = EN_VUELO,
+    on_parcial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Enumera subdominios por fuerza bruta (wordlist) y, si sans=True, también los
+    nombres del certificado TLS. Devuelve la lista deduplicada de los que resuelven.
+    """
+    enumerador = SubdomainEnumerator(domain, wordlist=wordlist, en_vuelo=en_vuelo, **kwargs)
+    nombres_san = await cosechar_sans(domain) if sans else []
+    return await enumerador.enumerar(sans=nombres_san, on_parcial=on_parcial)
+
+
+def run_subdomains(domain: str, on_parcial: Optional[Callable[[Dict[str, Any]], None]] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Versión síncrona: corre el enumerador en su propio event loop. on_parcial se llama
+    desde ese loop, así que no debe bloquear.
+    """
+    async def emitir(trozo):
+        # dentro del loop: el callback solo encola (la escritura la hace el hilo de scanner/tasks.py)
+        on_parcial(trozo)
+
+    return asyncio.run(run_subdomains_async(domain, on_parcial=emitir if on_parcial else None, **kwargs))
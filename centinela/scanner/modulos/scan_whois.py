@@ -1,8 +1,63 @@
 # whois_utils.py
+import re
 import whois
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
+# Metadatos para el registro de módulos (scanner/registry.py)
+MODULO = {
+    "nombre": "whois",
+    "etiqueta": "Whois",
+    "funcion": "run_whois",
+    "costo": "io",
+    "cola": "default",
+    "soft_timeout": 60,
+    "hard_timeout": 90,
+    "concurrencia": 4,
+    "objetivos": ("dominio",),
+    "limites": {"whois": 1},
+    "clave_cache": "dominio_registrado",  # los subdominios comparten la entrada de su dominio registrado
+    "textos": ("raw",),                   # el texto crudo va comprimido a scanner/textos.py
+}
+
+_REGISTRANTE = re.compile(r"^\s*Registrant\s+name:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_ORGANIZACION = re.compile(r"^\s*Registrant\s+organi[sz]ation:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+class _ClienteSinRed(whois.NICClient):
+    """NICClient que elige el servidor solo con su tabla: sin preguntarle a IANA por TLDs que no conoce."""
+
+    def findwhois_iana(self, tld: str) -> Optional[str]:
+        return None
+
+
+def dominio_registrado(objetivo: str) -> str:
+    """
+    Dominio registrado de un objetivo según la lista de sufijos públicos que trae
+    python-whois (sin red): 'www.bbc.co.uk' -> 'bbc.co.uk', 'a.b.minsal.gob.cl' -> 'minsal.gob.cl'.
+    """
+    objetivo = objetivo.strip().lower().rstrip(".")
+    try:
+        registrado = whois.extract_domain(objetivo)
+    except Exception:
+        return objetivo
+    # con un sufijo que la lista no conoce devuelve solo la última etiqueta
+    return registrado if registrado and "." in registrado else objetivo
+
+
+def servidor_whois(dominio: str) -> Optional[str]:
+    """
+    Servidor whois del registro al que se consulta el dominio (varios TLDs comparten
+    servidor, p. ej. los de whois.nic.google). Si python-whois no lo conoce de antemano
+    lo resolvería preguntando a IANA; aquí no se pregunta y se devuelve None.
+    """
+    dominio = dominio.strip().lower().rstrip(".")
+    try:
+        servidor = _ClienteSinRed().choose_server(dominio)
+    except Exception:
+        servidor = None
+    return servidor.lower() if servidor else None
+
 def _to_iso(val: Any) -> Optional[Union[str, List[str]]]:
     """
     Convierte datetime o lista de datetimes/strings a ISO strings.
@@ -35,12 +90,19 @@ def _ensure_list(val: Any) -> List[str]:
         return [str(x) for x in val]
     return [str(val)]
 
+def _primero(patron: "re.Pattern", texto: Optional[str]) -> Optional[str]:
+    encontrado = patron.search(texto or "")
+    return (encontrado.group(1).strip() or None) if encontrado else None
+
+
 def run_whois(domain: str) -> Dict[str, Any]:
     """
-    Ejecuta whois para el dominio y devuelve un dict JSON-serializable.
+    Ejecuta whois para el dominio registrado del objetivo (un subdominio consulta el
+    de su dominio) y devuelve un dict JSON-serializable.
     """
+    registrado = dominio_registrado(domain)
     try:
-        w = whois.whois(domain)
+        w = whois.whois(registrado)
     except Exception as e:
         # Devuelve un dict con error para que el caller lo maneje (no lanzar excepción)
         return {"error": f"whois lookup failed: {str(e)}"}
@@ -57,7 +119,12 @@ def run_whois(domain: str) -> Dict[str, Any]:
         "emails": _ensure_list(getattr(w, "emails", None)),
         "country": getattr(w, "country", None),
         "whois_server": getattr(w, "whois_server", None),
-        # opcional: raw text (útil para debugging). Ten cuidado con datos sensibles.
+        "registry_server": servidor_whois(registrado),
+        "queried": registrado,
+        # el registrante sale del texto crudo, que no viaja con el resultado (ver MODULO["textos"])
+        "registrant": _primero(_REGISTRANTE, getattr(w, "text", None)),
+        "registrant_org": _primero(_ORGANIZACION, getattr(w, "text", None)),
+        # raw text (útil para debugging). Ten cuidado con datos sensibles.
         "raw": getattr(w, "text", None)
     }
 
@@ -14,7 +14,7 @@
 
 # if __name__ == "__main__":
 #     target = "madica.it"   # cámbialo por la IP/domino que quieras probar
-#     resultado: List[Dict] = run_dorks(target)
+#     resultado = run_dorks(target)  # {"results": [...], "quota": {...}, "meta": {...}}
 #     print(json.dumps(resultado, indent=2, ensure_ascii=False))
 
 #DNS
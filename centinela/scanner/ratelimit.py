@@ -0,0 +1,99 @@
+# Limitador de tasa compartido (token bucket en Redis) por destino
+#
+# Cada módulo declara en su MODULO["limites"] qué destinos consume y cuántos
+# tokens por ejecución: "host" (el objetivo), "whois" (el servidor whois del registro),
+# "google_cse" (la API key de dorks). Antes de hacer I/O la tarea pide los tokens
+# de todos sus destinos de una sola vez; si no alcanzan, la tarea se reprograma
+# para cuando haya tokens en vez de fallar contra el servidor remoto.
+import logging
+from functools import lru_cache
+from typing import List, Tuple
+
+import redis
+from django.conf import settings
+
+from .modulos.scan_whois import dominio_registrado, servidor_whois
+
+logger = logging.getLogger(__name__)
+
+# Toma los tokens de todos los buckets o de ninguno. Devuelve los segundos a esperar ("0" si se tomaron).
+# KEYS: buckets. ARGV: por cada bucket (capacidad, tokens por segundo, costo).
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local espera = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local cap = tonumber(ARGV[i * 3 - 2])
+    local tasa = tonumber(ARGV[i * 3 - 1])
+    local costo = tonumber(ARGV[i * 3])
+    local b = redis.call('HMGET', key, 'tokens', 'ts')
+    local disponibles = tonumber(b[1]) or cap
+    local ts = tonumber(b[2]) or ahora
+    disponibles = math.min(cap, disponibles + math.max(0, ahora - ts) * tasa)
+    tokens[i] = disponibles
+    if disponibles < costo then
+        espera = math.max(espera, (costo - disponibles) / tasa)
+    end
+end
+if espera > 0 then
+    return tostring(espera)
+end
+for i, key in ipairs(KEYS) do
+    local cap = tonumber(ARGV[i * 3 - 2])
+    local tasa = tonumber(ARGV[i * 3 - 1])
+    local costo = tonumber(ARGV[i * 3])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - costo), 'ts', tostring(ahora))
+    redis.call('EXPIRE', key, math.ceil(cap / tasa) + 1)
+end
+return '0'
+"""
+
+
+@lru_cache(maxsize=None)
+def _script():
+    cliente = redis.Redis.from_url(settings.SCANNER_RATELIMIT_URL)
+    return cliente.register_script(_TOKEN_BUCKET_LUA)
+
+
+def _bucket_whois(objetivo: str) -> str:
+    """
+    Clave del bucket whois: el servidor del registro, o el TLD si la tabla de
+    python-whois no lo conoce (no se sale a IANA solo para elegir el bucket).
+    """
+    registrado = dominio_registrado(objetivo)
+    return servidor_whois(registrado) or f"tld.{registrado.rsplit('.', 1)[-1]}"
+
+
+def destinos(spec, objetivo: str) -> List[Tuple[str, str, float]]:
+    """Traduce MODULO["limites"] a (tipo, clave del bucket, costo) para este objetivo."""
+    claves = {
+        'host': lambda: f"rl:host:{objetivo.lower().rstrip('.')}",
+        # un bucket por servidor: los TLDs que comparten servidor (whois.nic.google...) comparten límite
+        'whois': lambda: f"rl:whois:{_bucket_whois(objetivo)}",
+        'google_cse': lambda: "rl:api:google_cse",
+    }
+    return [(tipo, claves[tipo](), costo) for tipo, costo in spec.limites.items()]
+
+
+def adquirir(spec, objetivo: str) -> float:
+    """
+    Intenta tomar los tokens de todos los destinos del módulo. Devuelve 0 si se
+    tomaron, o los segundos a esperar antes de reintentar. Si Redis no responde
+    no se limita (fail-open): el limitador nunca debe frenar los escaneos por sí solo.
+    """
+    pedidos = destinos(spec, objetivo)
+    if not pedidos:
+        return 0.0
+
+    keys, args = [], []
+    for tipo, clave, costo in pedidos:
+        capacidad, tasa = settings.SCANNER_RATE_LIMITS[tipo]
+        keys.append(clave)
+        args.extend([capacidad, tasa, min(costo, capacidad)])  # un costo mayor a la capacidad nunca se cumpliría
+
+    try:
+        return float(_script()(keys=keys, args=args))
+    except redis.RedisError as e:
+        logger.warning("Limitador de tasa no disponible, se continúa sin limitar: %s", e)
+        return 0.0
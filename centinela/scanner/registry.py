@@ -0,0 +1,114 @@
+# Registro de módulos de escaneo
+#
+# Cada scan_*.py de scanner/modulos/ declara un dict MODULO con sus metadatos
+# (los scripts siguen pudiendo ejecutarse sueltos, no importan nada de Django).
+# Todo lo que antes estaba repetido sale de aquí: choices del formulario,
+# cola de Celery, timeouts, cupo de concurrencia y tamaño de los workers.
+import importlib
+import pkgutil
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+COSTOS = ("cpu", "io", "subprocess")
+TIPOS_OBJETIVO = ("dominio", "ip", "red")
+DESTINOS_LIMITE = ("host", "whois", "google_cse")
+
+
+@dataclass(frozen=True)
+class ModuloSpec:
+    nombre: str                     # clave guardada en resultadoModulo.nombre_modulo
+    etiqueta: str                   # texto para el formulario
+    funcion: Callable               # run_xxx(objetivo) -> dict/list serializable
+    costo: str                      # cpu / io / subprocess
+    cola: str                       # cola de Celery donde se ejecuta
+    soft_timeout: int               # segundos, lanza SoftTimeLimitExceeded dentro del módulo
+    hard_timeout: int               # segundos, el worker mata la tarea
+    concurrencia: int               # máximo de ejecuciones simultáneas del módulo
+    objetivos: Tuple[str, ...]      # tipos de objetivo aceptados (dominio / ip / red)
+    funcion_async: Optional[Callable] = None  # coroutine opcional para el modo asyncio (módulos io)
+    limites: Dict[str, int] = field(default_factory=dict)  # tokens por destino (scanner/ratelimit.py)
+    parciales: bool = False         # acepta on_parcial=callback y emite trozos antes de terminar
+    fragmentar: Optional[Callable] = None  # fragmentar(red, tamano) -> objetivos de cada fragmento (objetivos "red")
+    unir: Optional[Callable] = None        # unir([resultado de cada fragmento]) -> resultado del módulo
+    incremental: bool = False       # acepta previo=<resultado anterior del mismo objetivo> y reutiliza lo vigente
+    certificados: bool = False      # su resultado trae certificados (sha256 + raw_pem) que van a scanner/certificados.py
+    clave_cache: Optional[Callable] = None  # clave_cache(objetivo) -> objetivo con el que se cachea y coalesce
+    textos: Tuple[str, ...] = ()    # claves del resultado con texto crudo que va comprimido a scanner/textos.py
+
+    def acepta(self, tipo_objetivo: str) -> bool:
+        return tipo_objetivo in self.objetivos
+
+
+def _spec_desde_modulo(mod) -> ModuloSpec:
+    meta = dict(mod.MODULO)
+    meta["funcion"] = getattr(mod, meta["funcion"])
+    if meta.get("funcion_async"):
+        meta["funcion_async"] = getattr(mod, meta["funcion_async"])
+    for clave in ("fragmentar", "unir", "clave_cache"):
+        if meta.get(clave):
+            meta[clave] = getattr(mod, meta[clave])
+    meta["objetivos"] = tuple(meta["objetivos"])
+    meta["textos"] = tuple(meta.get("textos", ()))
+    spec = ModuloSpec(**meta)
+    if spec.costo not in COSTOS:
+        raise ValueError(f"Costo desconocido '{spec.costo}' en módulo {spec.nombre}")
+    if not set(spec.objetivos) <= set(TIPOS_OBJETIVO):
+        raise ValueError(f"Tipo de objetivo desconocido en módulo {spec.nombre}: {spec.objetivos}")
+    if not set(spec.limites) <= set(DESTINOS_LIMITE):
+        raise ValueError(f"Destino de límite desconocido en módulo {spec.nombre}: {list(spec.limites)}")
+    if bool(spec.fragmentar) != bool(spec.unir):
+        raise ValueError(f"fragmentar y unir van juntos en módulo {spec.nombre}")
+    if spec.soft_timeout >= spec.hard_timeout:
+        raise ValueError(f"soft_timeout debe ser menor que hard_timeout en módulo {spec.nombre}")
+    return spec
+
+
+@lru_cache(maxsize=None)
+def _registro() -> Dict[str, ModuloSpec]:
+    """Descubre una sola vez los scan_*.py que declaran MODULO."""
+    from . import modulos
+
+    registro: Dict[str, ModuloSpec] = {}
+    for info in sorted(pkgutil.iter_modules(modulos.__path__), key=lambda i: i.name):
+        if not info.name.startswith("scan_"):
+            continue
+        mod = importlib.import_module(f"{modulos.__name__}.{info.name}")
+        if not hasattr(mod, "MODULO"):
+            continue
+        spec = _spec_desde_modulo(mod)
+        if spec.nombre in registro:
+            raise ValueError(f"Módulo registrado dos veces: {spec.nombre}")
+        registro[spec.nombre] = spec
+    return registro
+
+
+def todos() -> List[ModuloSpec]:
+    return list(_registro().values())
+
+
+def obtener(nombre: str) -> Optional[ModuloSpec]:
+    return _registro().get(nombre)
+
+
+def objetivo_compartido(nombre: str, objetivo: str) -> str:
+    """
+    Objetivo con el que el módulo cachea y coalesce: el propio, salvo que el módulo
+    declare clave_cache (whois usa el dominio registrado, así los subdominios comparten).
+    """
+    spec = obtener(nombre)
+    return spec.clave_cache(objetivo) if spec and spec.clave_cache else objetivo
+
+
+def choices() -> List[Tuple[str, str]]:
+    """Choices para el MultipleChoiceField del formulario de escaneo."""
+    return [(spec.nombre, spec.etiqueta) for spec in todos()]
+
+
+def concurrencia_para_colas(colas: Iterable[str]) -> int:
+    """
+    Procesos de worker sugeridos para atender las colas dadas: la suma de los cupos
+    de los módulos que van a esas colas (con al menos 1).
+    """
+    colas = set(colas)
+    return max(1, sum(spec.concurrencia for spec in todos() if spec.cola in colas))
@@ -0,0 +1,147 @@
+# Planificador fair-share: carriles de prioridad y cupo de tareas en vuelo por usuario
+#
+# En vez de mandar todas las tareas de un escaneo directo al broker (FIFO), cada
+# usuario tiene su propia cola en Redis por carril (interactivo, programado,
+# masivo). despachar() recorre los carriles en orden de prioridad y, dentro de
+# cada carril, a los usuarios en round-robin, mandando al broker solo mientras el
+# usuario tenga menos de SCANNER_FAIRSHARE_CUPO tareas en vuelo. Así un lote de
+# miles de objetivos no deja esperando a los escaneos interactivos de otros.
+# Las colas de Celery (default/heavy) no cambian: la prioridad del carril viaja
+# como prioridad del mensaje (CELERY_BROKER_TRANSPORT_OPTIONS).
+import json
+import logging
+from functools import lru_cache
+
+import redis
+from celery import signature
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CARRILES = ("interactivo", "programado", "masivo")  # en orden de prioridad
+
+# Encola items de un usuario en un carril y lo agrega al anillo round-robin si no estaba.
+# KEYS: [anillo, cola del usuario]. ARGV: [usuario, items...]
+_ENCOLAR_LUA = """
+redis.call('RPUSH', KEYS[2], unpack(ARGV, 2))
+if not redis.call('LPOS', KEYS[1], ARGV[1]) then
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+return redis.call('LLEN', KEYS[2])
+"""
+
+# Saca el siguiente item a despachar: primer carril con trabajo, usuarios en round-robin
+# (el anillo rota con LMOVE), saltando usuarios que ya tienen su cupo en vuelo.
+# KEYS: anillos en orden de prioridad. ARGV: [cupo por usuario, ttl del contador en vuelo]
+_SIGUIENTE_LUA = """
+for _, anillo in ipairs(KEYS) do
+    local n = redis.call('LLEN', anillo)
+    for i = 1, n do
+        local usuario = redis.call('LMOVE', anillo, anillo, 'LEFT', 'RIGHT')
+        local cola = anillo .. ':' .. usuario
+        local en_vuelo = 'fs:en_vuelo:' .. usuario
+        if redis.call('LLEN', cola) == 0 then
+            redis.call('LREM', anillo, 0, usuario)
+        elseif tonumber(redis.call('GET', en_vuelo) or '0') < tonumber(ARGV[1]) then
+            local item = redis.call('LPOP', cola)
+            redis.call('INCR', en_vuelo)
+            redis.call('EXPIRE', en_vuelo, ARGV[2])
+            if redis.call('LLEN', cola) == 0 then
+                redis.call('LREM', anillo, 0, usuario)
+            end
+            return {anillo, usuario, item}
+        end
+    end
+end
+return false
+"""
+
+# Devuelve al frente de la cola del usuario un item que no se pudo mandar al broker y suelta su cupo.
+# KEYS: [anillo, cola del usuario, contador en vuelo]. ARGV: [usuario, item]
+_DEVOLVER_LUA = """
+redis.call('LPUSH', KEYS[2], ARGV[2])
+if not redis.call('LPOS', KEYS[1], ARGV[1]) then
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+if redis.call('DECR', KEYS[3]) < 0 then
+    redis.call('SET', KEYS[3], 0)
+end
+"""
+
+
+@lru_cache(maxsize=None)
+def _cliente():
+    return redis.Redis.from_url(settings.SCANNER_FAIRSHARE_URL)
+
+
+@lru_cache(maxsize=None)
+def _scripts():
+    cliente = _cliente()
+    return (cliente.register_script(_ENCOLAR_LUA), cliente.register_script(_SIGUIENTE_LUA),
+            cliente.register_script(_DEVOLVER_LUA))
+
+
+def _anillo(carril):
+    return f"fs:anillo:{carril}"
+
+
+def _aplicar(firma, carril):
+    firma.apply_async(priority=settings.SCANNER_PRIORIDAD_CARRIL[carril])
+
+
+def encolar(user_id, carril, firmas):
+    """
+    Deja las firmas (run_modulo_task / run_modulos_io_task) en la cola fair-share del
+    usuario y despacha lo que quepa. Si Redis no responde se despacha directo al broker.
+    """
+    firmas = list(firmas)
+    if not firmas:
+        return
+    for firma in firmas:
+        firma.kwargs['fs_usuario'] = user_id  # la tarea libera este cupo al terminar
+    try:
+        encolar_lua, _, _ = _scripts()
+        encolar_lua(keys=[_anillo(carril), f"{_anillo(carril)}:{user_id}"],
+                    args=[user_id] + [json.dumps(dict(firma)) for firma in firmas])
+    except redis.RedisError as e:
+        logger.warning("Planificador fair-share no disponible, se despacha directo: %s", e)
+        for firma in firmas:
+            firma.kwargs.pop('fs_usuario', None)
+            _aplicar(firma, carril)
+        return
+    try:
+        despachar()
+    except redis.RedisError as e:
+        # Las firmas ya quedaron en la cola del usuario (mandarlas directo las duplicaría):
+        # salen con el próximo despachar(), cuando termine cualquier tarea
+        logger.warning("Planificador fair-share no disponible al despachar: %s", e)
+
+
+def despachar():
+    """Manda al broker todo lo que permitan los cupos, por carril y en round-robin entre usuarios."""
+    _, siguiente_lua, devolver_lua = _scripts()
+    anillos = [_anillo(c) for c in CARRILES]
+    carril_de = {a: c for a, c in zip(anillos, CARRILES)}
+    while True:
+        item = siguiente_lua(keys=anillos, args=[settings.SCANNER_FAIRSHARE_CUPO, settings.SCANNER_FAIRSHARE_TTL])
+        if not item:
+            break
+        anillo, usuario, datos = (x.decode() for x in item)
+        try:
+            _aplicar(signature(json.loads(datos)), carril_de[anillo])
+        except Exception as e:
+            # Broker caído: la firma vuelve al frente de su cola con su cupo libre y sale en el próximo despachar()
+            devolver_lua(keys=[anillo, f"{anillo}:{usuario}", f"fs:en_vuelo:{usuario}"], args=[usuario, datos])
+            logger.warning("No se pudo mandar la tarea al broker, queda en la cola fair-share: %s", e)
+            break
+
+
+def liberar(user_id):
+    """Una tarea del usuario terminó: baja su contador en vuelo y despacha lo siguiente."""
+    try:
+        cliente = _cliente()
+        if cliente.decr(f"fs:en_vuelo:{user_id}") < 0:
+            cliente.set(f"fs:en_vuelo:{user_id}", 0)  # el contador expiró mientras la tarea corría
+        despachar()
+    except redis.RedisError as e:
+        logger.warning("Planificador fair-share no disponible: %s", e)
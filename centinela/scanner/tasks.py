@@ -1,73 +1,609 @@
-# Transaction
-from pyexpat.errors import messages
-from django.db import transaction
+# Standard Library
+import asyncio
+import threading
+from datetime import timedelta
+from itertools import islice
+# Django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
 # Celery
 from celery import shared_task
 # Modelos
-from .models import resultadoModulo, Escaneo
-#Escaneos
-from .modulos.scan_dns import run_dns
-from .modulos.scan_dorks import run_dorks
-from .modulos.scan_headerhttp import run_headerhttp
-from .modulos.scan_nmap import run_nmap
-from .modulos.scan_ssl import run_ssl
-from .modulos.scan_whois import run_whois
+from .models import resultadoModulo, Escaneo, FragmentoResultado, LoteEscaneo
+# Caché de resultados
+from . import cache
+# Registro de módulos (funciones, colas, timeouts y cupos)
+from . import registry
+# Limitador de tasa por destino
+from . import ratelimit
+# Planificador fair-share (carriles de prioridad y cupo por usuario)
+from . import scheduler
+# Coalescencia de ejecuciones idénticas en vuelo
+from . import coalescencia
+# Almacén de certificados TLS (por huella SHA-256) y de textos crudos comprimidos
+from . import certificados, textos
+# Objetivos de red (CIDR / rangos)
+from .modulos import redes
+
+# Segundos de espera antes de reintentar un módulo cuyo cupo de concurrencia está lleno
+CUPO_REINTENTO = 5
+# Margen sobre hard_timeout antes de dar por perdida la ejecución a la que se suscribió una fila
+VIGILANCIA_MARGEN = 60
+# Margen de la tarea de I/O sobre los timeouts de sus módulos: cada módulo se corta con su
+# propio wait_for (y se guarda como error) antes de que la tarea reciba SoftTimeLimitExceeded
+IO_MARGEN = 30
+# Segundos de espera antes de reintentar un fragmento de red que falló
+FRAGMENTO_REINTENTO = 10
+# Fragmentos por INSERT al repartir una red
+FRAGMENTOS_POR_INSERT = 500
+# Segundos mínimos entre dos escrituras de resultado_parcial de una misma fila
+PARCIAL_CADA = 1.0
+
+
+def _tomar_cupo(spec):
+    """
+    Semáforo compartido (en la caché/Redis) para respetar spec.concurrencia.
+    La clave expira tras hard_timeout sin uso, así un worker muerto no deja el cupo tomado para siempre.
+    """
+    clave = f"cupo:{spec.nombre}"
+    backend = caches['default']
+    backend.add(clave, 0, timeout=spec.hard_timeout)
+    if backend.incr(clave) > spec.concurrencia:
+        backend.decr(clave)
+        return False
+    backend.touch(clave, timeout=spec.hard_timeout)
+    return True
+
+
+def _liberar_cupo(spec):
+    clave = f"cupo:{spec.nombre}"
+    backend = caches['default']
+    try:
+        if backend.decr(clave) < 0:
+            # la clave expiró y se recreó mientras la tarea corría: sin esto quedaría negativa y dejaría pasar de más
+            backend.set(clave, 0, timeout=spec.hard_timeout)
+    except ValueError:
+        pass  # la clave ya expiró
+
+
+class _EmisorParcial:
+    """
+    Callback on_parcial para los módulos que emiten resultados parciales: acumula los
+    trozos y los deja en resultado_parcial para que el polling de la UI los vea antes del final.
+
+    Llamarlo solo encola el trozo (se puede llamar desde el event loop del módulo): la
+    escritura la hace un único hilo propio, a lo sumo cada PARCIAL_CADA segundos, y ese
+    hilo cierra su conexión a la base al terminar. Los módulos mandan un trozo por host o
+    por puerto abierto: sin agrupar, cada uno reescribiría la lista entera.
+    """
+
+    def __init__(self, resultado):
+        self.resultado = resultado
+        self._trozos = []
+        self._sucio = self._fin = False
+        self._condicion = threading.Condition()
+        self._hilo = None
+
+    def __call__(self, trozo):
+        with self._condicion:
+            self._trozos.append(trozo)
+            self._sucio = True
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escribir, name=f"parcial-{self.resultado.id}", daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+
+    async def asincrono(self, trozo):
+        """Versión para los módulos async, que esperan (await) el callback."""
+        self(trozo)
+
+    def _escribir(self):
+        try:
+            while True:
+                with self._condicion:
+                    self._condicion.wait_for(lambda: self._sucio or self._fin)
+                    if self._fin:
+                        return  # el resultado final reemplaza a los parciales
+                    trozos, self._sucio = list(self._trozos), False
+                self.resultado.agregar_parcial(trozos)
+                with self._condicion:
+                    self._condicion.wait_for(lambda: self._fin, timeout=PARCIAL_CADA)
+        finally:
+            connection.close()
+
+    def cerrar(self):
+        """Termina el hilo escritor (lo pendiente ya no se escribe) y espera a que suelte su conexión."""
+        with self._condicion:
+            self._fin = True
+            self._condicion.notify()
+            hilo = self._hilo
+        if hilo is not None:
+            hilo.join()
+
+
+def _previo(resultado, spec):
+    """
+    Re-escaneo incremental: el último resultado completado del mismo módulo sobre el mismo
+    objetivo dentro de SCANNER_INCREMENTAL_VENTANA, o None. Forzar escaneo nuevo lo desactiva.
+    """
+    escaneo = resultado.escaneo
+    if not spec.incremental or escaneo.sin_cache or not settings.SCANNER_INCREMENTAL_VENTANA:
+        return None
+    desde = timezone.now() - timedelta(seconds=settings.SCANNER_INCREMENTAL_VENTANA)
+    return (
+        resultadoModulo.objects
+        .filter(nombre_modulo=spec.nombre, estado='completado', escaneo__objetivo=escaneo.objetivo, fecha_ejecucion__gte=desde)
+        .exclude(id=resultado.id)
+        .order_by('-fecha_ejecucion')
+        .values_list('resultado', flat=True)
+        .first()
+    )
+
+
+def _argumentos(resultado, spec):
+    """kwargs para la función del módulo: las opciones elegidas en el escaneo y, si aplica, el resultado previo."""
+    argumentos = dict(resultado.escaneo.opciones_de(spec.nombre))
+    previo = _previo(resultado, spec)
+    if previo is not None:
+        argumentos['previo'] = previo
+    return argumentos
+
+
+def _extraer_almacenes(spec, resultados_modulo):
+    # los certificados y los textos crudos van una sola vez a su almacén; el resultado (y la caché) guarda su huella
+    if spec and spec.certificados:
+        certificados.extraer(resultados_modulo)
+    if spec and spec.textos:
+        textos.extraer(spec, resultados_modulo)
+    return resultados_modulo
+
+
+def _registrar_exito(resultado, resultados_modulo):
+    _extraer_almacenes(registry.obtener(resultado.nombre_modulo), resultados_modulo)
+    # en_proceso -> completado; descuenta el módulo y cierra el escaneo si era el último
+    resultado.finalizar("completado", resultados_modulo)
+
+    # Guardar en caché para los próximos escaneos del mismo objetivo (y las mismas opciones)
+    escaneo = resultado.escaneo
+    cache.guardar(resultado.nombre_modulo, escaneo.objetivo, resultados_modulo, escaneo.opciones_de(resultado.nombre_modulo))
+
+
+def _registrar_error(resultado_id, e):
+    print(f"Error al ejecutar el módulo: {e}")
+    try:
+        # en_proceso -> error (si la fila no llegó a en_proceso no hay nada que descontar)
+        resultado = resultadoModulo.objects.select_related('escaneo').get(id=resultado_id)
+        resultado.finalizar("error", {"error": str(e)})
+
+    except Exception as ex:
+        # Manejo de errores en la transacción
+        print(f"Error al actualizar el estado del resultado o escaneo: {ex}")
+
+
+def _suscribir(resultado, spec):
+    """
+    Coalescencia: si ya corre el mismo módulo sobre el mismo objetivo (otro escaneo),
+    la fila se suscribe a esa ejecución en lugar de lanzar otra. True si quedó suscrita.
+    """
+    if not spec:
+        return False
+    ttl = spec.hard_timeout + VIGILANCIA_MARGEN
+    opciones = resultado.escaneo.opciones_de(spec.nombre)
+    if coalescencia.tomar_o_suscribir(spec.nombre, resultado.escaneo.objetivo, resultado.id, ttl, opciones):
+        return False
+    # Si la dueña ya la llenó, iniciar() falla y no hay nada que vigilar
+    if resultado.iniciar():
+        vigilar_suscripcion.apply_async(args=[resultado.id], countdown=ttl)
+    return True
+
+
+def _completar_suscriptores(resultado, spec):
+    """
+    Libera la ejecución de esta fila y copia su estado y resultado finales a las
+    filas suscritas; cada una descuenta su módulo en su propio escaneo.
+    """
+    ids = coalescencia.cerrar(spec.nombre, resultado.escaneo.objetivo, resultado.escaneo.opciones_de(spec.nombre))
+    if not ids:
+        return
+    final = resultadoModulo.objects.values('estado', 'resultado').get(id=resultado.id)
+    if final['estado'] not in ('completado', 'error'):
+        _redespachar(ids)  # la dueña no llegó a un resultado: cada suscrita corre por su cuenta
+        return
+    for suscrita in resultadoModulo.objects.select_related('escaneo').filter(id__in=ids):
+        # Puede seguir pendiente: se suscribió pero todavía no había hecho iniciar()
+        suscrita.finalizar(final['estado'], final['resultado'], desde=('pendiente', 'en_proceso'))
+
+
+def _soltar(resultado, spec):
+    """
+    La fila tomó la ejecución en la coalescencia pero no la corrió (iniciar() falló: mensaje
+    re-entregado o fila ya finalizada). Si ya terminó se cierra la ejecución y sus suscritas
+    reciben el resultado; si sigue en_proceso, la cierra la ejecución que la está corriendo.
+    """
+    if resultadoModulo.objects.filter(id=resultado.id).exclude(estado='en_proceso').exists():
+        _completar_suscriptores(resultado, spec)
+
+
+def _redespachar(ids):
+    """Devuelve a pendiente las filas en_proceso indicadas y las despacha de nuevo."""
+    for r in resultadoModulo.objects.select_related('escaneo').filter(id__in=ids, estado='en_proceso'):
+        if resultadoModulo.objects.filter(id=r.id, estado='en_proceso').update(estado='pendiente'):
+            scheduler.encolar(r.escaneo.user_id, r.escaneo.carril, [_firma_modulo(r.id, r.nombre_modulo)])
 
 
 @shared_task
-def run_modulo_task(resultado_id):
+def vigilar_suscripcion(resultado_id):
+    """
+    Red de seguridad de la coalescencia: si la ejecución a la que se suscribió la fila
+    murió sin llenarla (worker caído, hard timeout), la fila se despacha por su cuenta.
+    """
+    _redespachar([resultado_id])
+
+
+@shared_task(bind=True)
+def run_modulo_task(self, resultado_id, fs_usuario=None):
+    resultado = resultadoModulo.objects.select_related('escaneo').get(id=resultado_id)
+    spec = registry.obtener(resultado.nombre_modulo)
+
+    # Ejecución idéntica en curso: la fila espera su resultado sin ocupar cupo ni tokens
+    if _suscribir(resultado, spec):
+        if fs_usuario is not None:
+            scheduler.liberar(fs_usuario)
+        return
+
+    # Cupo de concurrencia del módulo: si está lleno la tarea se reprograma, no falla
+    if spec and not _tomar_cupo(spec):
+        raise self.retry(countdown=CUPO_REINTENTO, max_retries=None)
+
+    # Límite de tasa por destino (host, servidor whois, API key): igual, se difiere
+    espera = ratelimit.adquirir(spec, resultado.escaneo.objetivo) if spec else 0
+    if espera:
+        _liberar_cupo(spec)
+        raise self.retry(countdown=espera, max_retries=None)
+
+    ejecutado = False
     try:
-        # Obtener el resultadoModulo y actualizar estado a "en_proceso"
-        resultado = resultadoModulo.objects.get(id=resultado_id)
-        resultado.estado = "en_proceso"
-        resultado.save()
-
-        # Simulación de ejecución del módulo
-        # Logica para ejecutar el módulo específico
-
-         # Diccionario de funciones disponibles
-        modulos_disponibles = {
-            'dns': run_dns,
-            'dorks': run_dorks,
-            'headers': run_headerhttp,
-            'nmap': run_nmap,
-            'ssl': run_ssl,
-            'whois': run_whois
-        }
+        # Pasar el resultadoModulo a "en_proceso" (solo si seguía pendiente)
+        if not resultado.iniciar():
+            if spec:
+                _soltar(resultado, spec)
+            return  # otra ejecución ya tomó este módulo
+        ejecutado = True
 
         # Ejecutar el módulo correspondiente
-        funcion_modulo = modulos_disponibles.get(resultado.nombre_modulo)
-        if not funcion_modulo:
+        if not spec:
             raise ValueError(f"Módulo desconocido: {resultado.nombre_modulo}")
-        
-        resultados_modulo = funcion_modulo(resultado.escaneo.objetivo)
 
-        resultado.resultado = resultados_modulo
-        resultado.estado = "completado"
-        resultado.save()
+        argumentos = _argumentos(resultado, spec)
+        emisor = _EmisorParcial(resultado) if spec.parciales else None
+        if emisor:
+            argumentos['on_parcial'] = emisor
+        try:
+            resultados_modulo = spec.funcion(resultado.escaneo.objetivo, **argumentos)
+        finally:
+            if emisor:
+                emisor.cerrar()
+        _registrar_exito(resultado, resultados_modulo)
 
-        # Chequear si ya todos los módulos de este escaneo terminaron
+    except Exception as e:
+        _registrar_error(resultado_id, e)
+
+    finally:
+        if spec:
+            _liberar_cupo(spec)
+            if ejecutado:
+                _completar_suscriptores(resultado, spec)
+        if fs_usuario is not None:
+            scheduler.liberar(fs_usuario)  # deja pasar la siguiente tarea en la cola fair-share
+
+
+@shared_task
+def run_modulos_io_task(resultado_ids, fs_usuario=None):
+    """
+    Ejecuta en un solo proceso todos los módulos de I/O de un escaneo (dns, headers,
+    ssl, whois) de forma concurrente sobre un event loop de asyncio. Cada resultado
+    se guarda apenas termina su módulo, sin esperar al resto.
+    """
+    # El ORM es síncrono: las filas se leen y se pasan a en_proceso antes de entrar al loop
+    iniciadas = []
+    cerradas = set()  # filas que el loop ya finalizó o devolvió a la cola
+    error = None
+    try:
+        for r in resultadoModulo.objects.select_related('escaneo').filter(id__in=resultado_ids):
+            spec = registry.obtener(r.nombre_modulo)
+            if _suscribir(r, spec):
+                continue
+            if r.iniciar():
+                iniciadas.append(r)
+            elif spec:
+                _soltar(r, spec)
+        if iniciadas:
+            trabajos = [(r, _argumentos(r, spec) if spec else {})
+                        for r, spec in ((r, registry.obtener(r.nombre_modulo)) for r in iniciadas)]
+            asyncio.run(_ejecutar_modulos_io(trabajos, cerradas))
+    except BaseException as e:  # SoftTimeLimitExceeded incluido
+        error = e
+        raise
+    finally:
+        # Lo que el loop no alcanzó a cerrar no puede quedar en_proceso: el escaneo nunca terminaría
+        for r in iniciadas:
+            if r.id not in cerradas:
+                _registrar_error(r.id, RuntimeError(f"La tarea de I/O terminó antes que el módulo: {error!r}"))
+                spec = registry.obtener(r.nombre_modulo)
+                if spec:
+                    _completar_suscriptores(r, spec)
+        if fs_usuario is not None:
+            scheduler.liberar(fs_usuario)
+
+
+def _diferir(resultado, espera):
+    """
+    Saca un módulo ya iniciado de la tarea de I/O: vuelve a pendiente y a la cola fair-share
+    del usuario, en su carril, para dentro de `espera` segundos (como un retry de run_modulo_task).
+    La fila sigue siendo la dueña de su ejecución en la coalescencia.
+    """
+    if resultadoModulo.objects.filter(id=resultado.id, estado='en_proceso').update(estado='pendiente'):
         escaneo = resultado.escaneo
-        if not escaneo.resultados.filter(estado__in=["pendiente", "en_proceso"]).exists():
-            escaneo.estado = "completado"
-            escaneo.save()
+        firma = _firma_modulo(resultado.id, resultado.nombre_modulo).set(countdown=espera)
+        scheduler.encolar(escaneo.user_id, escaneo.carril, [firma])
 
-    except Exception as e:
-        
-        print(f"Error al ejecutar el módulo: {e}")
+
+async def _ejecutar_modulos_io(resultados, cerradas):
+    registrar_exito = sync_to_async(_registrar_exito)
+    registrar_error = sync_to_async(_registrar_error)
+    completar_suscriptores = sync_to_async(_completar_suscriptores)
+    diferir = sync_to_async(_diferir)
+
+    async def ejecutar(resultado, argumentos):
+        spec = registry.obtener(resultado.nombre_modulo)
+        objetivo = resultado.escaneo.objetivo
+        # Cupo de concurrencia y límite de tasa, igual que run_modulo_task (son idas cortas a Redis)
+        if spec and not _tomar_cupo(spec):
+            await diferir(resultado, CUPO_REINTENTO)
+            cerradas.add(resultado.id)
+            return
+        emisor = None
         try:
-            with transaction.atomic():
-                resultado = resultadoModulo.objects.get(id=resultado_id)
-                resultado.estado = "error"
-                resultado.resultado = {"error": str(e)}
-                resultado.save()
-
-                # También actualizar el estado del escaneo principal a "en_proceso"
-                escaneo = resultado.escaneo
-                if not escaneo.resultados.filter(estado__in=["pendiente", "en_proceso"]).exists():
-                    escaneo.estado = "completado"
-                    escaneo.save()
-                    
-        except Exception as ex:
-            # Manejo de errores en la transacción
-            print(f"Error al actualizar el estado del resultado o escaneo: {ex}")
+            espera = ratelimit.adquirir(spec, objetivo) if spec else 0
+            if espera:
+                await diferir(resultado, espera)
+                cerradas.add(resultado.id)
+                return
+            try:
+                if not spec:
+                    raise ValueError(f"Módulo desconocido: {resultado.nombre_modulo}")
+                if spec.funcion_async:
+                    # En el loop el callback se espera (await): solo encola, escribe el hilo del emisor
+                    if spec.parciales:
+                        emisor = _EmisorParcial(resultado)
+                        argumentos = {**argumentos, "on_parcial": emisor.asincrono}
+                    corrutina = spec.funcion_async(objetivo, **argumentos)
+                else:
+                    # Módulos sin versión async (whois, headers): a un hilo, sin bloquear el loop
+                    corrutina = asyncio.to_thread(spec.funcion, objetivo, **argumentos)
+                try:
+                    datos = await asyncio.wait_for(corrutina, timeout=spec.soft_timeout)
+                finally:
+                    if emisor:
+                        await asyncio.to_thread(emisor.cerrar)
+                await registrar_exito(resultado, datos)
+            except Exception as e:
+                await registrar_error(resultado.id, e)
+            cerradas.add(resultado.id)
+            if spec:
+                await completar_suscriptores(resultado, spec)
+        finally:
+            if spec:
+                _liberar_cupo(spec)
+
+    await asyncio.gather(*(ejecutar(r, argumentos) for r, argumentos in resultados))
+
+
+def _fragmentar(resultado_id, spec, red, user_id, carril):
+    """
+    Reparte un módulo sobre una red en FragmentoResultado de SCANNER_FRAGMENTO_HOSTS
+    direcciones y los encola como tareas independientes. La red se recorre de a un
+    fragmento (nunca se arma la lista de hosts) y las filas se insertan por tandas.
+    """
+    if not resultadoModulo.objects.filter(id=resultado_id, estado='pendiente').update(estado='en_proceso'):
+        return
+    fragmentos = enumerate(spec.fragmentar(red, settings.SCANNER_FRAGMENTO_HOSTS))
+    total = 0
+    while True:
+        tanda = [
+            FragmentoResultado(resultado_id=resultado_id, indice=indice, objetivo=objetivo,
+                               hosts=sum(redes.cantidad_hosts(b) for b in objetivo.split()))
+            for indice, objetivo in islice(fragmentos, FRAGMENTOS_POR_INSERT)
+        ]
+        if not tanda:
+            break
+        FragmentoResultado.objects.bulk_create(tanda)
+        total += len(tanda)
+    # El contador queda listo antes de encolar: ningún fragmento puede terminar antes
+    resultadoModulo.objects.filter(id=resultado_id).update(fragmentos_total=total, fragmentos_pendientes=total)
+    scheduler.encolar(user_id, carril, (_firma_fragmento(resultado_id, i, spec) for i in range(total)))
+
+
+def _firma_fragmento(resultado_id, indice, spec):
+    return run_fragmento_task.si(resultado_id, indice).set(
+        queue=spec.cola, soft_time_limit=spec.soft_timeout, time_limit=spec.hard_timeout)
+
+
+def _unir_fragmentos(resultado, spec):
+    """
+    Lo hace el worker del último fragmento: une los datos de los fragmentos completados
+    en el resultado del módulo. Con algún fragmento fallido el resultado es incompleto y
+    no se cachea; si fallaron todos, el módulo termina en error.
+    """
+    resumen = resultado.resumen_fragmentos()
+    print(f"{spec.nombre} sobre {resultado.escaneo.objetivo}: {resumen['hosts']} hosts en "
+          f"{resumen['duracion']}s con {resumen['workers']} workers ({resumen['hosts_por_minuto']} hosts/min)")
+    datos = list(resultado.fragmentos.filter(estado='completado').order_by('indice').values_list('datos', flat=True))
+    if not datos:
+        resultado.finalizar("error", {"error": f"Fallaron los {resumen['total']} fragmentos"})
+        return
+    unido = _extraer_almacenes(spec, spec.unir(datos))
+    resultado.finalizar("completado", unido)
+    if not resumen['fallidos']:
+        cache.guardar(resultado.nombre_modulo, resultado.escaneo.objetivo, unido, resultado.escaneo.opciones_de(spec.nombre))
+
+
+@shared_task(bind=True)
+def run_fragmento_task(self, resultado_id, indice, fs_usuario=None):
+    """
+    Ejecuta el módulo sobre un fragmento de una red. Los fragmentos no pasan por el cupo
+    global del módulo (los acota el pool de los workers de la cola y el cupo fair-share):
+    así el rendimiento crece con la cantidad de workers. Un fragmento que falla se
+    reintenta solo, hasta SCANNER_FRAGMENTO_REINTENTOS veces.
+    """
+    fragmento = FragmentoResultado.objects.select_related('resultado__escaneo').get(
+        resultado_id=resultado_id, indice=indice)
+    resultado = fragmento.resultado
+    spec = registry.obtener(resultado.nombre_modulo)
+
+    espera = ratelimit.adquirir(spec, fragmento.objetivo)
+    if espera:
+        raise self.retry(countdown=espera, max_retries=None)
+
+    reintentar = terminado = False
+    try:
+        if not fragmento.iniciar(self.request.hostname or ''):
+            return  # otra ejecución ya tomó este fragmento
+        datos = spec.funcion(fragmento.objetivo, **resultado.escaneo.opciones_de(spec.nombre))
+        if isinstance(datos, dict) and 'error' in datos:
+            raise RuntimeError(datos['error'])
+    except Exception as e:
+        if fragmento.intentos < settings.SCANNER_FRAGMENTO_REINTENTOS and fragmento.reintentar():
+            reintentar = True
+        else:
+            print(f"Error en el fragmento {indice} de {resultado}: {e}")
+            terminado = fragmento.finalizar('error', {'error': str(e)})
+    else:
+        terminado = fragmento.finalizar('completado', datos)
+    finally:
+        if fs_usuario is not None and not reintentar:
+            scheduler.liberar(fs_usuario)
+
+    if reintentar:
+        # mismo mensaje (y mismo cupo fair-share): solo este fragmento vuelve a la cola
+        raise self.retry(countdown=FRAGMENTO_REINTENTO, max_retries=None)
+    if terminado and resultado.fragmento_terminado():
+        _unir_fragmentos(resultado, spec)
+
+
+@shared_task
+def start_scan(escaneo_id, modulos):
+    """
+    Orquestador del escaneo: crea todos los resultadoModulo de una vez y los
+    despacha en paralelo como un group. El cierre del escaneo lo hace el último
+    módulo en terminar (contador atómico en Escaneo.modulo_terminado).
+    Los módulos con resultado en caché se completan aquí mismo y no ocupan worker.
+    Así la vista solo encola esta tarea y responde de inmediato.
+    """
+    _despachar_escaneos([Escaneo.objects.get(id=escaneo_id)], modulos)
+
+
+@shared_task
+def start_lote(lote_id):
+    """
+    Orquestador de un escaneo masivo: toma los escaneos pendientes del lote de a
+    SCANNER_LOTE_CHUNK y los despacha igual que start_scan, así la memoria y el
+    tamaño de cada INSERT no crecen con el lote.
+    """
+    lote = LoteEscaneo.objects.get(id=lote_id)
+    while True:
+        # Cada vuelta pasa su chunk a en_proceso, así la siguiente consulta trae el próximo
+        chunk = list(Escaneo.objects.filter(lote=lote, estado='pendiente').order_by('id')[:settings.SCANNER_LOTE_CHUNK])
+        if not chunk:
+            break
+        _despachar_escaneos(chunk, lote.modulos)
+
+
+def _despachar_escaneos(escaneos, modulos):
+    """
+    Crea (bulk_create) los resultadoModulo de varios escaneos y despacha los que no están en caché.
+    A cada escaneo solo se le crean los módulos que aceptan su tipo de objetivo.
+    """
+    planes = {
+        e.id: [m for m in modulos if not registry.obtener(m) or registry.obtener(m).acepta(e.tipo_objetivo)]
+        for e in escaneos
+    }
+
+    # 1. Buscar en caché (una sola consulta para todo el chunk), salvo escaneos que pidan resultados frescos
+    en_cache = cache.obtener_varios(
+        (m, e.objetivo, e.opciones_de(m)) for e in escaneos if not e.sin_cache for m in planes[e.id]
+    )
+
+    # 2. Crear todas las filas en un solo INSERT (las de caché ya completadas)
+    filas = []
+    for e in escaneos:
+        a_ejecutar = 0
+        for modulo in planes[e.id]:
+            clave = cache.clave(modulo, e.objetivo, e.opciones_de(modulo))
+            if not e.sin_cache and clave in en_cache:
+                filas.append(resultadoModulo(escaneo=e, nombre_modulo=modulo, estado='completado', resultado=en_cache[clave]))
+            else:
+                filas.append(resultadoModulo(escaneo=e, nombre_modulo=modulo, estado='pendiente', resultado={}))
+                a_ejecutar += 1
+
+        # 3. Inicializar el contador antes de despachar (ningún módulo puede terminar antes)
+        e.estado = 'en_proceso'
+        e.modulos_total = len(planes[e.id])
+        e.modulos_pendientes = a_ejecutar
+        e.modulos_fallidos = 0
+
+    resultadoModulo.objects.bulk_create(filas)
+    Escaneo.objects.bulk_update(escaneos, ['estado', 'modulos_total', 'modulos_pendientes', 'modulos_fallidos'])
+
+    for e in escaneos:
+        if e.modulos_pendientes == 0:
+            # Todo vino de caché (o ningún módulo aplica): el escaneo termina sin despachar nada
+            final = 'completado' if e.modulos_total else 'error'
+            e.transicion(['en_proceso'], final, fecha_fin=timezone.now())
+
+    # 4. Releer los ids pendientes (MySQL no los devuelve en bulk_create)
+    resultados = resultadoModulo.objects.filter(
+        escaneo_id__in=[e.id for e in escaneos if e.modulos_pendientes], estado='pendiente'
+    ).order_by().values_list('id', 'nombre_modulo', 'escaneo_id')
+
+    # 5. Fan-out: cada módulo va a la cola y con los timeouts que declara en el registro.
+    #    En modo asyncio los módulos de I/O de un escaneo y misma cola van juntos en una sola tarea.
+    #    Sobre una red, los módulos que saben fragmentarse se reparten en fragmentos.
+    por_escaneo = {e.id: e for e in escaneos}
+    firmas, io_por_cola = {}, {}
+    for resultado_id, nombre, escaneo_id in resultados:
+        spec = registry.obtener(nombre)
+        e = por_escaneo[escaneo_id]
+        if spec and spec.fragmentar and e.tipo_objetivo == 'red':
+            _fragmentar(resultado_id, spec, e.objetivo, e.user_id, e.carril)
+        elif settings.SCANNER_IO_ASYNC and spec and spec.costo == 'io':
+            io_por_cola.setdefault((escaneo_id, spec.cola), []).append((resultado_id, spec))
+        else:
+            firmas.setdefault(escaneo_id, []).append(_firma_modulo(resultado_id, nombre))
+
+    for (escaneo_id, cola), items in io_por_cola.items():
+        firmas.setdefault(escaneo_id, []).append(run_modulos_io_task.si([resultado_id for resultado_id, _ in items]).set(
+            queue=cola,
+            soft_time_limit=max(spec.soft_timeout for _, spec in items) + IO_MARGEN,
+            time_limit=max(spec.hard_timeout for _, spec in items) + IO_MARGEN,
+        ))
+
+    # 6. Las firmas pasan por el planificador fair-share (carril del escaneo + cupo por usuario)
+    por_usuario = {}
+    for escaneo_id, lista in firmas.items():
+        e = por_escaneo[escaneo_id]
+        por_usuario.setdefault((e.user_id, e.carril), []).extend(lista)
+    for (user_id, carril), lista in por_usuario.items():
+        scheduler.encolar(user_id, carril, lista)
+
+
+def _firma_modulo(resultado_id, nombre):
+    """Firma de run_modulo_task con la cola y los límites de tiempo del módulo."""
+    spec = registry.obtener(nombre)
+    firma = run_modulo_task.si(resultado_id)
+    if spec:
+        firma = firma.set(queue=spec.cola, soft_time_limit=spec.soft_timeout, time_limit=spec.hard_timeout)
+    return firma
@@ -1,3 +1,1344 @@
-from django.test import TestCase
+import asyncio
+import json
+import dataclasses
+import socket
+import ssl
+import tempfile
+import os
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as tz
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import dns.resolver
+import redis
+from celery import signature
+from celery.exceptions import SoftTimeLimitExceeded
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import cache, ratelimit, registry, scheduler, tasks
+from .api_views import CertificadoViewSet, LoteEscaneoViewSet, ResultadoModuloViewSet, TextoCrudoViewSet
+from .lotes import crear_lote
+from .modulos import barrido, dnscache, motor_dorks, scan_nmap, scan_subdomains, redes, reglas_headers, scan_dorks, scan_headerhttp, scan_ssl, scan_whois
+from .models import Certificado, Escaneo, LoteEscaneo, TextoCrudo, resultadoModulo
+
+try:  # Redis en memoria (con Lua) para los scripts del planificador; opcional
+    import fakeredis
+    import lupa  # noqa: F401
+except ImportError:
+    fakeredis = None
+
+# Escaneos sembrados (cada uno con MODULOS resultados). El valor por defecto corre en
+# segundos; para volúmenes reales: SCANNER_TEST_VOLUMEN=500000 (2 millones de resultados)
+VOLUMEN = int(os.getenv('SCANNER_TEST_VOLUMEN', 2000))
+MODULOS = ('dns', 'nmap', 'ssl', 'whois')
+USUARIOS = 20
+LOTES = 10
+TANDA = 5000
+
+
+def _plan(sql, params=()):
+    """Texto del plan de una consulta (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en MySQL)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        return "\n".join(" ".join(str(c) for c in fila) for fila in cursor.fetchall())
+
+
+def _plan_qs(qs):
+    return _plan(*qs.query.sql_with_params())
+
+
+class IndicesConsultasTests(TestCase):
+    """
+    Cantidad de consultas y planes de las rutas calientes sobre un volumen sembrado:
+    si un cambio vuelve a ordenar aparte, recorre la tabla entera o agrega consultas
+    por fila, el test lo muestra.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = User.objects.bulk_create([User(username=f'u{i}') for i in range(USUARIOS)])
+        lotes = LoteEscaneo.objects.bulk_create(
+            [LoteEscaneo(user=usuarios[i], modulos=list(MODULOS)) for i in range(LOTES)])
+        objetivos = max(1, VOLUMEN // 4)  # cada objetivo se escanea unas 4 veces
+
+        for desde in range(0, VOLUMEN, TANDA):
+            escaneos = Escaneo.objects.bulk_create([
+                Escaneo(
+                    user=usuarios[i % USUARIOS],
+                    objetivo=f'host{i % objetivos}.ejemplo.cl',
+                    tipo_objetivo='dominio',
+                    estado='pendiente' if i % 7 == 0 else 'completado',
+                    lote=lotes[i % LOTES] if i % 3 == 0 else None,
+                    carril='masivo' if i % 3 == 0 else 'interactivo',
+                )
+                for i in range(desde, min(desde + TANDA, VOLUMEN))
+            ])
+            if connection.vendor == 'mysql':  # MySQL no devuelve los ids del bulk_create
+                escaneos = list(Escaneo.objects.order_by('-id')[:len(escaneos)])
+            resultadoModulo.objects.bulk_create(
+                [resultadoModulo(escaneo=e, nombre_modulo=m, estado='completado', resultado={'ok': True})
+                 for e in escaneos for m in MODULOS],
+                batch_size=TANDA,
+            )
+
+        # Estadísticas para el planificador. En MySQL ANALYZE TABLE hace commit implícito
+        # (rompería el TestCase); InnoDB estima con index dives, que bastan aquí.
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        cls.usuario = usuarios[1]
+        cls.lote = lotes[0]
+        cls.escaneo = Escaneo.objects.filter(user=cls.usuario).order_by('id').first()
+
+    def assertUsaIndice(self, plan, nombre):
+        self.assertIn(nombre, plan, f'el plan no usa {nombre}:\n{plan}')
+
+    def assertSinOrdenar(self, plan):
+        self.assertNotIn('TEMP B-TREE', plan.upper(), f'el plan ordena aparte:\n{plan}')
+        self.assertNotIn('FILESORT', plan.upper(), f'el plan ordena aparte:\n{plan}')
+
+    # ---------------- Cantidad de consultas ----------------
+
+    def test_api_resultados_una_consulta(self):
+        peticion = APIRequestFactory().get('/resultadosmodulos/', {'escaneo_id': self.escaneo.id})
+        force_authenticate(peticion, user=self.usuario)
+        vista = ResultadoModuloViewSet.as_view({'get': 'list'})
+        with self.assertNumQueries(1):
+            respuesta = vista(peticion)
+        self.assertEqual([r['nombre_modulo'] for r in respuesta.data], sorted(MODULOS))
+
+    def test_api_resultados_certificados_sin_consultas_por_fila(self):
+        sha = 'a' * 64
+        Certificado.objects.create(sha256=sha, pem='', datos={'subject': {}})
+        resultadoModulo.objects.filter(escaneo=self.escaneo).update(resultado={'certificado': sha})
+        peticion = APIRequestFactory().get('/resultadosmodulos/', {'escaneo_id': self.escaneo.id})
+        force_authenticate(peticion, user=self.usuario)
+        with self.assertNumQueries(2):  # resultados + una sola consulta al almacén de certificados
+            respuesta = ResultadoModuloViewSet.as_view({'get': 'list'})(peticion)
+        self.assertTrue(all(r['resultado'].get('sha256') == sha for r in respuesta.data))
+
+    def test_progreso_lote_una_consulta(self):
+        with self.assertNumQueries(1):
+            progreso = self.lote.progreso()
+        self.assertEqual(progreso['modulos_total'], progreso['completados'])
+
+    def test_previo_incremental_una_consulta(self):
+        resultado = resultadoModulo.objects.select_related('escaneo').filter(
+            escaneo__objetivo=self.escaneo.objetivo, nombre_modulo='nmap').order_by('-id').first()
+        with self.assertNumQueries(1):
+            previo = tasks._previo(resultado, registry.obtener('nmap'))
+        self.assertEqual(previo, {'ok': True})
+
+    # ---------------- Planes ----------------
+
+    def test_plan_resultados_de_escaneo(self):
+        # la consulta real del ViewSet (usuario normal, filtrada por escaneo, orden por defecto)
+        peticion = APIRequestFactory().get('/resultadosmodulos/', {'escaneo_id': self.escaneo.id})
+        force_authenticate(peticion, user=self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            ResultadoModuloViewSet.as_view({'get': 'list'})(peticion)
+        plan = _plan(consultas[0]['sql'])
+        self.assertUsaIndice(plan, 'resultado_escaneo_modulo_idx')
+        self.assertSinOrdenar(plan)
+
+    def test_plan_escaneos_de_usuario(self):
+        plan = _plan_qs(Escaneo.objects.filter(user=self.usuario)[:20])
+        self.assertUsaIndice(plan, 'escaneo_user_fecha_idx')
+        self.assertSinOrdenar(plan)
+
+    def test_plan_historial_de_objetivo(self):
+        plan = _plan_qs(Escaneo.objects.filter(objetivo=self.escaneo.objetivo))
+        self.assertUsaIndice(plan, 'escaneo_objetivo_fecha_idx')
+        self.assertSinOrdenar(plan)
+
+    def test_plan_previo_incremental(self):
+        resultado = resultadoModulo.objects.select_related('escaneo').filter(escaneo=self.escaneo, nombre_modulo='nmap').get()
+        with CaptureQueriesContext(connection) as consultas:
+            tasks._previo(resultado, registry.obtener('nmap'))
+        plan = _plan(consultas[0]['sql'])
+        self.assertUsaIndice(plan, 'escaneo_objetivo_fecha_idx')
+        self.assertUsaIndice(plan, 'resultado_escaneo_modulo_idx')
+
+    def test_plan_chunk_de_lote(self):
+        # start_lote pide el próximo chunk de pendientes del lote en cada vuelta
+        plan = _plan_qs(Escaneo.objects.filter(lote=self.lote, estado='pendiente').order_by('id')[:500])
+        self.assertUsaIndice(plan, 'escaneo_lote_estado_idx')
+        self.assertSinOrdenar(plan)
+
+    def test_plan_lotes_de_usuario(self):
+        plan = _plan_qs(LoteEscaneo.objects.filter(user=self.lote.user))
+        self.assertUsaIndice(plan, 'lote_user_fecha_idx')
+        self.assertSinOrdenar(plan)
+
+    def test_plan_transiciones_por_clave_primaria(self):
+        # las transiciones (estado__in en run_modulo_task y compañía) van por id: no necesitan índice propio
+        desde = ['pendiente', 'en_proceso']
+        for qs in (Escaneo.objects.filter(id=self.escaneo.id, estado__in=desde),
+                   resultadoModulo.objects.filter(id=1, estado__in=desde)):
+            self.assertIn('PRIMARY', _plan_qs(qs.order_by()).upper())
+
+    def test_ventana_incremental_respetada(self):
+        # el índice no cambia la semántica: fuera de la ventana no hay previo
+        resultadoModulo.objects.filter(escaneo__objetivo=self.escaneo.objetivo).update(
+            fecha_ejecucion=self.escaneo.fecha_inicio - timedelta(days=30))
+        resultado = resultadoModulo.objects.select_related('escaneo').filter(escaneo=self.escaneo, nombre_modulo='nmap').get()
+        self.assertIsNone(tasks._previo(resultado, registry.obtener('nmap')))
+
+
+class ContadorModulosTests(TestCase):
+    """Cierre del escaneo por el contador atómico de módulos pendientes (Escaneo.modulo_terminado)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create(username='contador')
+
+    def _escaneo(self, modulos):
+        escaneo = Escaneo.objects.create(user=self.usuario, objetivo='ejemplo.cl', tipo_objetivo='dominio',
+                                         estado='en_proceso', modulos_total=len(modulos), modulos_pendientes=len(modulos))
+        filas = [resultadoModulo.objects.create(escaneo=escaneo, nombre_modulo=m, estado='en_proceso', resultado={})
+                 for m in modulos]
+        return escaneo, filas
+
+    def test_todos_completados(self):
+        escaneo, filas = self._escaneo(['dns', 'ssl'])
+        for fila in filas:
+            fila.finalizar('completado', {'ok': True})
+        escaneo.refresh_from_db()
+        self.assertEqual((escaneo.estado, escaneo.modulos_pendientes, escaneo.modulos_fallidos), ('completado', 0, 0))
+
+    def test_alguno_fallido_es_parcial(self):
+        escaneo, (dns, ssl) = self._escaneo(['dns', 'ssl'])
+        dns.finalizar('error', {'error': 'timeout'})
+        ssl.finalizar('completado', {'ok': True})
+        escaneo.refresh_from_db()
+        self.assertEqual((escaneo.estado, escaneo.modulos_fallidos), ('parcial', 1))
+
+    def test_todos_fallidos_es_error(self):
+        escaneo, filas = self._escaneo(['dns', 'ssl'])
+        for fila in filas:
+            fila.finalizar('error', {'error': 'timeout'})
+        escaneo.refresh_from_db()
+        self.assertEqual(escaneo.estado, 'error')
+
+    def test_sigue_en_proceso_mientras_quedan_modulos(self):
+        escaneo, (dns, _) = self._escaneo(['dns', 'ssl'])
+        dns.finalizar('completado', {'ok': True})
+        escaneo.refresh_from_db()
+        self.assertEqual((escaneo.estado, escaneo.modulos_pendientes), ('en_proceso', 1))
+
+    def test_finalizar_dos_veces_descuenta_una(self):
+        # una re-entrega del mensaje no puede descontar el mismo módulo otra vez
+        escaneo, (dns, _) = self._escaneo(['dns', 'ssl'])
+        self.assertTrue(dns.finalizar('completado', {'ok': True}))
+        self.assertFalse(dns.finalizar('error', {'error': 'otra vez'}))
+        escaneo.refresh_from_db()
+        self.assertEqual((escaneo.estado, escaneo.modulos_pendientes, escaneo.modulos_fallidos), ('en_proceso', 1, 0))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-cache'}},
+                   SCANNER_CACHE_TTL={'dns': 3600, 'whois': 7 * 24 * 3600, 'headers': 3600, 'nmap': 0})
+class CacheResultadosTests(SimpleTestCase):
+    """Qué se guarda en la caché de resultados y por cuánto (scanner/cache.py)."""
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_guarda_y_encuentra_con_objetivo_normalizado(self):
+        self.assertEqual(cache.guardar('headers', 'Ejemplo.CL.', {'ok': True}), 3600)
+        self.assertEqual(cache.obtener_varios([('headers', 'ejemplo.cl', None)]),
+                         {cache.clave('headers', 'ejemplo.cl'): {'ok': True}})
+
+    def test_opciones_separan_la_clave(self):
+        self.assertNotEqual(cache.clave('nmap', 'ejemplo.cl'), cache.clave('nmap', 'ejemplo.cl', {'perfil': 'web'}))
+        self.assertEqual(cache.clave('nmap', 'ejemplo.cl'), cache.clave('nmap', 'ejemplo.cl', {}))
+
+    def test_no_guarda_errores_ni_incompletos(self):
+        self.assertIsNone(cache.guardar('headers', 'ejemplo.cl', {'error': 'timeout'}))
+        self.assertIsNone(cache.guardar('headers', 'ejemplo.cl', {'results': [], 'incomplete': True}))
+        self.assertEqual(cache.obtener_varios([('headers', 'ejemplo.cl', None)]), {})
+
+    def test_ttl_cero_no_guarda(self):
+        self.assertIsNone(cache.guardar('nmap', 'ejemplo.cl', {'ok': True}))
+        self.assertEqual(cache.obtener_varios([('nmap', 'ejemplo.cl', None)]), {})
+
+    def test_ttl_dns_acotado_por_registros(self):
+        self.assertEqual(cache.ttl_para('dns', {'meta': {'ttl': {'A': 300, 'MX': 0, 'NS': 86400}}}), 300)
+        self.assertEqual(cache.ttl_para('dns', {'meta': {'ttl': {'A': 86400}}}), 3600)
+        self.assertEqual(cache.ttl_para('dns', {}), 3600)
+
+    def test_ttl_whois_acotado_por_expiracion(self):
+        en_un_dia = (datetime.now(tz.utc) + timedelta(days=1)).isoformat()
+        self.assertAlmostEqual(cache.ttl_para('whois', {'expiration_date': en_un_dia}), 24 * 3600, delta=60)
+        # lista de fechas: manda la más próxima; las ilegibles no acotan
+        self.assertAlmostEqual(cache.ttl_para('whois', {'expiration_date': ['no-es-fecha', en_un_dia]}), 24 * 3600, delta=60)
+        vencida = (datetime.now(tz.utc) - timedelta(days=1)).isoformat()
+        self.assertEqual(cache.ttl_para('whois', {'expiration_date': vencida}), 0)
+        self.assertEqual(cache.ttl_para('whois', {'expiration_date': ['no-es-fecha']}), 7 * 24 * 3600)
+        self.assertIsNone(cache.guardar('whois', 'vencido.com', {'expiration_date': vencida}))
+
+
+class RegistroModulosTests(SimpleTestCase):
+    """Descubrimiento de los scan_*.py y lo que se deriva del registro (scanner/registry.py)."""
+
+    def test_descubre_los_modulos(self):
+        self.assertEqual({spec.nombre for spec in registry.todos()},
+                         {'dns', 'dorks', 'headers', 'nmap', 'ssl', 'subdomains', 'whois'})
+        self.assertIsNone(registry.obtener('no_existe'))
+
+    def test_choices_siguen_al_registro(self):
+        self.assertEqual(registry.choices(), [(spec.nombre, spec.etiqueta) for spec in registry.todos()])
+        self.assertEqual(dict(registry.choices())['dns'], registry.obtener('dns').etiqueta)
+
+    def test_specs_validas(self):
+        for spec in registry.todos():
+            with self.subTest(modulo=spec.nombre):
+                self.assertIn(spec.costo, registry.COSTOS)
+                self.assertLess(spec.soft_timeout, spec.hard_timeout)
+                self.assertGreater(spec.concurrencia, 0)
+                self.assertTrue(callable(spec.funcion))
+
+    def test_rutas_y_tipos_de_objetivo(self):
+        self.assertEqual(registry.obtener('nmap').cola, 'heavy')
+        self.assertTrue(registry.obtener('nmap').acepta('red'))
+        self.assertFalse(registry.obtener('whois').acepta('ip'))
+
+    def test_concurrencia_por_colas(self):
+        esperado = sum(spec.concurrencia for spec in registry.todos() if spec.cola == 'heavy')
+        self.assertEqual(registry.concurrencia_para_colas(['heavy']), esperado)
+        self.assertEqual(registry.concurrencia_para_colas(['cola_sin_modulos']), 1)
+
+    def test_rechaza_metadatos_invalidos(self):
+        base = dict(nombre='x', etiqueta='X', funcion='run', costo='io', cola='default',
+                    soft_timeout=10, hard_timeout=20, concurrencia=1, objetivos=('dominio',))
+        for cambio in ({'costo': 'gpu'}, {'objetivos': ('url',)}, {'soft_timeout': 20}, {'limites': {'api': 1}}):
+            with self.subTest(cambio=cambio):
+                modulo = SimpleNamespace(MODULO={**base, **cambio}, run=lambda objetivo: {})
+                with self.assertRaises(ValueError):
+                    registry._spec_desde_modulo(modulo)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-cupo'}})
+class CupoModulosTests(SimpleTestCase):
+    """Semáforo de concurrencia por módulo (tasks._tomar_cupo / _liberar_cupo)."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.spec = SimpleNamespace(nombre='prueba', concurrencia=2, hard_timeout=60)
+
+    def test_respeta_la_concurrencia(self):
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+        self.assertFalse(tasks._tomar_cupo(self.spec))
+        tasks._liberar_cupo(self.spec)
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+
+    def test_liberar_tras_expirar_no_deja_negativo(self):
+        # la clave venció con dos tareas corriendo y otra la recreó: al liberar las viejas no se abre cupo de más
+        tasks._tomar_cupo(self.spec)
+        tasks._tomar_cupo(self.spec)
+        caches['default'].delete('cupo:prueba')
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+        tasks._liberar_cupo(self.spec)
+        tasks._liberar_cupo(self.spec)
+        self.assertEqual(caches['default'].get('cupo:prueba'), 0)
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+        self.assertTrue(tasks._tomar_cupo(self.spec))
+        self.assertFalse(tasks._tomar_cupo(self.spec))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-io'}})
+class TareaModulosIOTests(TransactionTestCase):
+    """
+    run_modulos_io_task: cupos por módulo y ninguna fila abandonada en_proceso.
+    TransactionTestCase: el loop escribe desde el hilo del ORM (sync_to_async), con otra conexión.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.usuario = User.objects.create(username='io')
+        self.escaneo = Escaneo.objects.create(user=self.usuario, objetivo='ejemplo.cl', tipo_objetivo='dominio', sin_cache=True,
+                                              estado='en_proceso', modulos_total=1, modulos_pendientes=1)
+        self.fila = resultadoModulo.objects.create(escaneo=self.escaneo, nombre_modulo='dns', estado='pendiente', resultado={})
+
+    def _con_dns(self, funcion_async):
+        spec = dataclasses.replace(registry.obtener('dns'), funcion_async=funcion_async, parciales=False)
+        return mock.patch.dict(registry._registro(), {'dns': spec})
+
+    def test_ejecuta_y_libera_el_cupo(self):
+        async def dns_falso(objetivo, **kwargs):
+            return {'records': {}, 'meta': {}}
+
+        with self._con_dns(dns_falso):
+            tasks.run_modulos_io_task([self.fila.id])
+        self.fila.refresh_from_db()
+        self.escaneo.refresh_from_db()
+        self.assertEqual((self.fila.estado, self.escaneo.estado), ('completado', 'completado'))
+        self.assertEqual(caches['default'].get('cupo:dns'), 0)
+
+    def test_cupo_lleno_vuelve_a_la_cola_fair_share(self):
+        caches['default'].set('cupo:dns', registry.obtener('dns').concurrencia)
+        with mock.patch.object(tasks.scheduler, 'encolar') as encolar:
+            tasks.run_modulos_io_task([self.fila.id])
+        self.fila.refresh_from_db()
+        self.assertEqual(self.fila.estado, 'pendiente')
+        (user_id, carril, (firma,)), _ = encolar.call_args
+        self.assertEqual((user_id, carril), (self.usuario.id, 'interactivo'))
+        self.assertEqual(firma.options['countdown'], tasks.CUPO_REINTENTO)
+
+    def test_limite_de_tasa_vuelve_a_la_cola_fair_share(self):
+        with mock.patch.object(tasks.ratelimit, 'adquirir', return_value=7.0), \
+                mock.patch.object(tasks.scheduler, 'encolar') as encolar:
+            tasks.run_modulos_io_task([self.fila.id])
+        self.fila.refresh_from_db()
+        self.assertEqual(self.fila.estado, 'pendiente')
+        self.assertEqual(encolar.call_args[0][2][0].options['countdown'], 7.0)
+        self.assertEqual(caches['default'].get('cupo:dns'), 0)
+
+    def test_soft_time_limit_no_deja_filas_en_proceso(self):
+        with mock.patch.object(tasks, '_ejecutar_modulos_io', side_effect=SoftTimeLimitExceeded()):
+            with self.assertRaises(SoftTimeLimitExceeded):
+                tasks.run_modulos_io_task([self.fila.id])
+        self.fila.refresh_from_db()
+        self.escaneo.refresh_from_db()
+        self.assertEqual((self.fila.estado, self.escaneo.estado, self.escaneo.modulos_pendientes), ('error', 'error', 0))
+
+    def test_limite_de_la_tarea_sobre_el_de_sus_modulos(self):
+        with mock.patch.object(tasks.scheduler, 'encolar') as encolar:
+            tasks.start_scan(self.escaneo.id, ['dns', 'whois'])
+        (firma,) = [f for llamada in encolar.call_args_list for f in llamada[0][2] if f.name.endswith('run_modulos_io_task')]
+        modulos = [registry.obtener('dns'), registry.obtener('whois')]
+        self.assertGreater(firma.options['soft_time_limit'], max(m.soft_timeout for m in modulos))
+        self.assertGreater(firma.options['time_limit'], firma.options['soft_time_limit'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-parciales'}})
+class ResultadosParcialesTests(TransactionTestCase):
+    """
+    Resultados parciales (tasks._EmisorParcial): se ven en resultado_parcial mientras la fila
+    está en_proceso, agrupados. TransactionTestCase: escribe el hilo del emisor, con otra conexión.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        usuario = User.objects.create(username='parciales')
+        self.escaneo = Escaneo.objects.create(user=usuario, objetivo='ejemplo.cl', tipo_objetivo='dominio', sin_cache=True,
+                                              estado='en_proceso', modulos_total=1, modulos_pendientes=1)
+        self.fila = resultadoModulo.objects.create(escaneo=self.escaneo, nombre_modulo='nmap', estado='pendiente', resultado={})
+
+    def _esperar_parcial(self, minimo):
+        limite = time.monotonic() + 5
+        while time.monotonic() < limite:
+            fila = resultadoModulo.objects.get(id=self.fila.id)
+            if len(fila.resultado_parcial or []) >= minimo:
+                return fila
+            time.sleep(0.01)
+        self.fail(f'resultado_parcial no llegó a {minimo} trozos')
+
+    def test_parciales_visibles_en_proceso_y_agrupados(self):
+        vistos = []
+
+        def nmap_falso(objetivo, on_parcial=None, **kwargs):
+            on_parcial({'ip': '10.0.0.1', 'port': '22'})
+            fila = self._esperar_parcial(1)
+            vistos.append((fila.estado, fila.resultado_parcial))
+            for puerto in range(1000, 1200):  # una ráfaga: un trozo por puerto abierto
+                on_parcial({'ip': '10.0.0.1', 'port': str(puerto)})
+            vistos.append(self._esperar_parcial(201).resultado_parcial[-1])
+            return [{'ip': '10.0.0.1', 'ports': []}]
+
+        spec = dataclasses.replace(registry.obtener('nmap'), funcion=nmap_falso, parciales=True, incremental=False)
+        escrituras = mock.patch.object(resultadoModulo, 'agregar_parcial', autospec=True, side_effect=resultadoModulo.agregar_parcial)
+        with mock.patch.dict(registry._registro(), {'nmap': spec}), mock.patch.object(tasks, 'PARCIAL_CADA', 0.05), \
+                escrituras as agregar_parcial:
+            tasks.run_modulo_task(self.fila.id)
+
+        self.assertEqual(vistos[0], ('en_proceso', [{'ip': '10.0.0.1', 'port': '22'}]))
+        self.assertEqual(vistos[1], {'ip': '10.0.0.1', 'port': '1199'})
+        self.assertLess(agregar_parcial.call_count, 20)  # 201 trozos, pocas escrituras
+        fila = resultadoModulo.objects.get(id=self.fila.id)
+        self.assertEqual((fila.estado, fila.resultado_parcial), ('completado', []))
+        self.assertFalse([h for h in threading.enumerate() if h.name == f'parcial-{self.fila.id}'])
+
+
+class PlanificadorTests(SimpleTestCase):
+    """Despacho fair-share (scanner/scheduler.py) cuando Redis o el broker fallan a medias."""
+
+    def _firma(self, n):
+        return signature('scanner.tasks.run_modulo_task', args=[n])
+
+    def test_sin_redis_despacha_directo(self):
+        with mock.patch.object(scheduler, '_scripts', side_effect=redis.ConnectionError('caído')), \
+                mock.patch.object(scheduler, '_aplicar') as aplicar:
+            scheduler.encolar(1, 'interactivo', [self._firma(1), self._firma(2)])
+        self.assertEqual(aplicar.call_count, 2)
+        self.assertNotIn('fs_usuario', aplicar.call_args[0][0].kwargs)  # sin cupo tomado, nada que liberar
+
+    def test_error_de_redis_al_despachar_no_sale_de_encolar(self):
+        scripts = (mock.Mock(), mock.Mock(side_effect=redis.ConnectionError('caído')), mock.Mock())
+        with mock.patch.object(scheduler, '_scripts', return_value=scripts), \
+                mock.patch.object(scheduler, '_aplicar') as aplicar:
+            scheduler.encolar(1, 'interactivo', [self._firma(1)])  # no lanza
+        aplicar.assert_not_called()  # la firma quedó en su cola: mandarla directo la duplicaría
+
+    def test_broker_caido_devuelve_la_firma_y_su_cupo(self):
+        datos = '{"task": "scanner.tasks.run_modulo_task"}'
+        siguiente = mock.Mock(side_effect=[[b'fs:anillo:masivo', b'7', datos.encode()], None])
+        devolver = mock.Mock()
+        with mock.patch.object(scheduler, '_scripts', return_value=(mock.Mock(), siguiente, devolver)), \
+                mock.patch.object(scheduler, '_aplicar', side_effect=ConnectionRefusedError('broker')):
+            scheduler.despachar()
+        devolver.assert_called_once_with(
+            keys=['fs:anillo:masivo', 'fs:anillo:masivo:7', 'fs:en_vuelo:7'], args=['7', datos])
+        self.assertEqual(siguiente.call_count, 1)  # con el broker caído no se sigue sacando
+
+
+@skipUnless(fakeredis, 'requiere fakeredis y lupa')
+@override_settings(SCANNER_FAIRSHARE_CUPO=2)
+class PlanificadorRedisTests(SimpleTestCase):
+    """Los scripts Lua del planificador sobre un Redis en memoria."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        scheduler._scripts.cache_clear()
+        self.addCleanup(scheduler._scripts.cache_clear)
+        parche = mock.patch.object(scheduler, '_cliente', return_value=self.redis)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.enviadas = []
+        parche = mock.patch.object(scheduler, '_aplicar', side_effect=lambda firma, carril: self.enviadas.append((firma.args[0], carril)))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _firmas(self, *ns):
+        return [signature('scanner.tasks.run_modulo_task', args=[n]) for n in ns]
+
+    def test_cupo_por_usuario_y_prioridad_de_carril(self):
+        scheduler.encolar(1, 'masivo', self._firmas(*range(10)))
+        self.assertEqual(self.enviadas, [(0, 'masivo'), (1, 'masivo')])  # cupo de 2 en vuelo
+        scheduler.encolar(2, 'interactivo', self._firmas(100))
+        self.assertEqual(self.enviadas[-1], (100, 'interactivo'))  # otro usuario no espera al lote
+        scheduler.liberar(1)
+        self.assertEqual(self.enviadas[-1], (2, 'masivo'))
+
+    def test_round_robin_entre_usuarios(self):
+        with override_settings(SCANNER_FAIRSHARE_CUPO=0):
+            scheduler.encolar(1, 'masivo', self._firmas(10, 11))
+            scheduler.encolar(2, 'masivo', self._firmas(20, 21))
+        scheduler.despachar()
+        self.assertEqual([n for n, _ in self.enviadas], [10, 20, 11, 21])
+
+    def test_liberar_no_deja_el_contador_negativo(self):
+        scheduler.liberar(3)
+        self.assertEqual(int(self.redis.get('fs:en_vuelo:3')), 0)
+
+    def test_broker_caido_no_pierde_la_firma(self):
+        with mock.patch.object(scheduler, '_aplicar', side_effect=ConnectionRefusedError('broker')):
+            scheduler.encolar(1, 'interactivo', self._firmas(1, 2))
+        self.assertEqual(int(self.redis.get('fs:en_vuelo:1')), 0)
+        self.assertEqual(self.redis.llen('fs:anillo:interactivo:1'), 2)
+        scheduler.despachar()  # el broker volvió
+        self.assertEqual([n for n, _ in self.enviadas], [1, 2])
+
+
+class CoalescenciaDuenaTests(TestCase):
+    """Una fila dueña de su ejecución (coalescencia) que no llega a correrla la suelta igual."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create(username='duena')
+
+    def setUp(self):
+        self.escaneo = Escaneo.objects.create(user=self.usuario, objetivo='ejemplo.cl', tipo_objetivo='dominio',
+                                              estado='en_proceso', modulos_total=1, modulos_pendientes=1)
+        otro = Escaneo.objects.create(user=self.usuario, objetivo='ejemplo.cl', tipo_objetivo='dominio',
+                                      estado='en_proceso', modulos_total=1, modulos_pendientes=1)
+        self.suscrita = resultadoModulo.objects.create(escaneo=otro, nombre_modulo='whois', estado='en_proceso', resultado={})
+        for nombre in ('tomar_o_suscribir', 'cerrar'):
+            parche = mock.patch.object(tasks.coalescencia, nombre)
+            self.addCleanup(parche.stop)
+            setattr(self, nombre, parche.start())
+        self.tomar_o_suscribir.return_value = True  # la fila es la dueña
+        self.cerrar.return_value = [self.suscrita.id]
+
+    def _fila(self, estado, resultado):
+        return resultadoModulo.objects.create(escaneo=self.escaneo, nombre_modulo='whois', estado=estado, resultado=resultado)
+
+    def test_mensaje_re_entregado_de_fila_terminada_cierra_y_completa_suscritas(self):
+        fila = self._fila('completado', {'domain_name': 'ejemplo.cl'})
+        with mock.patch.object(tasks, '_tomar_cupo', return_value=True), mock.patch.object(tasks, '_liberar_cupo'), \
+                mock.patch.object(tasks.ratelimit, 'adquirir', return_value=0):
+            tasks.run_modulo_task(fila.id)
+        self.cerrar.assert_called_once()
+        self.suscrita.refresh_from_db()
+        self.assertEqual((self.suscrita.estado, self.suscrita.resultado), ('completado', {'domain_name': 'ejemplo.cl'}))
+
+    def test_tarea_io_con_fila_terminada_cierra(self):
+        fila = self._fila('error', {'error': 'timeout'})
+        tasks.run_modulos_io_task([fila.id])
+        self.cerrar.assert_called_once()
+        self.suscrita.refresh_from_db()
+        self.assertEqual(self.suscrita.estado, 'error')
+
+    def test_fila_en_proceso_la_cierra_quien_la_corre(self):
+        fila = self._fila('en_proceso', {})
+        with mock.patch.object(tasks, '_tomar_cupo', return_value=True), mock.patch.object(tasks, '_liberar_cupo'), \
+                mock.patch.object(tasks.ratelimit, 'adquirir', return_value=0):
+            tasks.run_modulo_task(fila.id)
+        self.cerrar.assert_not_called()
+
+
+class RedesTests(SimpleTestCase):
+    """CIDR y rangos como objetivo (scanner/modulos/redes.py): sin armar la lista de hosts."""
+
+    def test_parsea_cidr_y_rangos(self):
+        self.assertEqual(redes.cantidad_hosts('10.0.0.0/24'), 256)
+        self.assertEqual(redes.cantidad_hosts('10.0.0.7/30'), 4)  # no estricto: 10.0.0.4/30
+        self.assertEqual(redes.cantidad_hosts('10.0.0.1-10.0.0.50'), 50)
+        self.assertEqual(redes.cantidad_hosts('10.0.0.1-50'), 50)  # forma corta: último octeto
+        self.assertEqual(redes.cantidad_hosts('2001:db8::/120'), 256)
+        self.assertEqual(redes.cantidad_hosts('10.0.0.0/8'), 2 ** 24)
+
+    def test_no_son_redes(self):
+        for objetivo in ('10.0.0.1', 'ejemplo.cl', '10.0.0.50-10.0.0.1', '10.0.0.1-2001:db8::1', '10.0.0.1-300', '10.0.0.0/33'):
+            with self.subTest(objetivo=objetivo):
+                self.assertFalse(redes.es_red(objetivo))
+                with self.assertRaises(ValueError):
+                    redes.parsear(objetivo)
+
+    def test_fragmentos_cubren_la_red_exacta(self):
+        fragmentos = list(redes.fragmentos('10.0.0.10-10.0.0.200', 64))
+        # 10.0.0.10-73 no es un bloque alineado: va como los CIDR mínimos que lo cubren
+        self.assertEqual(fragmentos[0], '10.0.0.10/31 10.0.0.12/30 10.0.0.16/28 10.0.0.32/27 10.0.0.64/29 10.0.0.72/31')
+        self.assertEqual(sum(redes.cantidad_hosts(b) for f in fragmentos for b in f.split()), 191)
+        self.assertEqual(len(fragmentos), 3)
+        direcciones = list(redes.direcciones(' '.join(fragmentos)))
+        self.assertEqual((direcciones[0], direcciones[-1], len(set(direcciones))), ('10.0.0.10', '10.0.0.200', 191))
+
+    def test_fragmentos_no_materializan_la_red(self):
+        # una /8 se recorre de a un fragmento: el primero sale sin generar los demás
+        fragmentos = redes.fragmentos('10.0.0.0/8', 64)
+        self.assertEqual(next(fragmentos), '10.0.0.0/26')
+        self.assertEqual(next(fragmentos), '10.0.0.64/26')
+
+    def test_direcciones_y_orden(self):
+        self.assertEqual(list(redes.direcciones('10.0.0.1-3 192.168.1.1')), ['10.0.0.1', '10.0.0.2', '10.0.0.3', '192.168.1.1'])
+        ips = ['10.0.0.10', '::1', 'no-ip', '10.0.0.9']
+        self.assertEqual(sorted(ips, key=redes.clave_orden), ['10.0.0.9', '10.0.0.10', '::1', 'no-ip'])
+
+
+class BarridoPuertosTests(SimpleTestCase):
+    """Fase asyncio del escaneo de puertos (scanner/modulos/barrido.py)."""
+
+    def test_parsear_puertos(self):
+        self.assertEqual(barrido.parsear_puertos('443, 22,80-82,22'), [22, 80, 81, 82, 443])
+        for invalida in ('', '0', '70000', '80-x', ',,'):
+            with self.subTest(puertos=invalida), self.assertRaises(ValueError):
+                barrido.parsear_puertos(invalida)
+
+    def test_distingue_abiertos_y_cerrados(self):
+        async def barrer():
+            servidor = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+            abierto = servidor.sockets[0].getsockname()[1]
+            with socket.socket() as s:  # puerto libre sin nadie escuchando: RST
+                s.bind(('127.0.0.1', 0))
+                cerrado = s.getsockname()[1]
+            avisados = []
+
+            async def on_abierto(host, puerto):
+                avisados.append((host, puerto))
+
+            async with servidor:
+                resultado = await barrido.barrer(['127.0.0.1'], [abierto, cerrado], timeout=2, on_abierto=on_abierto)
+            return resultado, abierto, cerrado, avisados
+
+        resultado, abierto, cerrado, avisados = asyncio.run(barrer())
+        self.assertEqual(resultado['hosts'], {'127.0.0.1': {abierto: 'open', cerrado: 'closed'}})
+        self.assertEqual(avisados, [('127.0.0.1', abierto)])
+        self.assertEqual((resultado['meta']['probes'], resultado['meta']['open']), (2, 1))
+
+    def test_nunca_supera_la_concurrencia(self):
+        en_vuelo = pico = 0
+
+        async def sondear(host, puerto, timeout):
+            nonlocal en_vuelo, pico
+            en_vuelo += 1
+            pico = max(pico, en_vuelo)
+            await asyncio.sleep(0.001)
+            en_vuelo -= 1
+            return 'filtered'
+
+        with mock.patch.object(barrido, 'sondear', sondear):
+            resultado = asyncio.run(barrido.barrer((f'10.0.0.{i}' for i in range(20)), list(range(1, 51)), concurrencia=16))
+        self.assertEqual((resultado['meta']['probes'], pico), (1000, 16))
+
+
+class NmapParcialesTests(SimpleTestCase):
+    """Avisos de puertos abiertos de scan_nmap.run_nmap durante el barrido."""
+
+    def test_abierto_se_avisa_sin_hilos_extra(self):
+        with socket.socket() as servidor:
+            servidor.bind(('127.0.0.1', 0))
+            servidor.listen()
+            puerto = servidor.getsockname()[1]
+            avisos = []
+            hosts = scan_nmap.run_nmap('127.0.0.1', service_detection=False, perfil='custom', puertos=str(puerto),
+                                       on_parcial=lambda trozo: avisos.append((threading.get_ident(), trozo)))
+        # desde el loop del barrido, en el mismo hilo: el callback de las tareas solo encola
+        self.assertEqual(avisos, [(threading.get_ident(), {'ip': '127.0.0.1', 'port': str(puerto), 'protocol': 'tcp', 'state': 'open'})])
+        self.assertEqual([p['port'] for p in hosts[0]['ports'] if p['state'] == 'open'], [str(puerto)])
+
+
+def _certificado_autofirmado(nombre='ejemplo.cl'):
+    """DER de un certificado autofirmado (EC) válido por 30 días."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    clave = ec.generate_private_key(ec.SECP256R1())
+    sujeto = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, nombre)])
+    ahora = datetime.now(tz.utc).replace(microsecond=0)
+    cert = (x509.CertificateBuilder().subject_name(sujeto).issuer_name(sujeto).public_key(clave.public_key())
+            .serial_number(1234).not_valid_before(ahora).not_valid_after(ahora + timedelta(days=30))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName(nombre)]), critical=False)
+            .sign(clave, hashes.SHA256()))
+    return cert.public_bytes(serialization.Encoding.DER), ahora
+
+
+def _servidor_con_intermedia(directorio):
+    """Hoja 'localhost' firmada por una intermedia (firmada por una raíz): PEM de hoja + intermedia y clave en `directorio`."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    ahora = datetime.now(tz.utc)
+    emisor = None
+    for nombre, ca in (('Raíz de prueba', True), ('Intermedia de prueba', True), ('localhost', False)):
+        clave = ec.generate_private_key(ec.SECP256R1())
+        sujeto = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, nombre)])
+        firma_clave, firma_nombre = emisor or (clave, sujeto)
+        cert = (x509.CertificateBuilder().subject_name(sujeto).issuer_name(firma_nombre).public_key(clave.public_key())
+                .serial_number(x509.random_serial_number()).not_valid_before(ahora).not_valid_after(ahora + timedelta(days=1))
+                .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+                .sign(firma_clave, hashes.SHA256()))
+        if ca:
+            emisor, intermedia = (clave, sujeto), cert
+    cadena, llave = os.path.join(directorio, 'cadena.pem'), os.path.join(directorio, 'clave.pem')
+    with open(cadena, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM) + intermedia.public_bytes(serialization.Encoding.PEM))
+    with open(llave, 'wb') as f:
+        f.write(clave.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return cadena, llave
+
+
+class CertificadoSSLTests(SimpleTestCase):
+    """Parseo de certificados y cadena presentada en scanner/modulos/scan_ssl.py."""
+
+    @skipUnless(hasattr(ssl.SSLObject, 'get_unverified_chain'), 'la cadena presentada se lee desde Python 3.13')
+    def test_cadena_con_intermedia(self):
+        async def escanear(cadena, llave):
+            contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            contexto.load_cert_chain(cadena, llave)
+            servidor = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0, ssl=contexto)
+            async with servidor:
+                escaner = scan_ssl.SSLCertScanner('localhost', servidor.sockets[0].getsockname()[1])
+                handshake = await escaner._handshake_en('127.0.0.1', escaner.port, 'localhost')
+            return escaner._procesar(handshake, extendido={})
+
+        with tempfile.TemporaryDirectory() as directorio:
+            resultado = asyncio.run(escanear(*_servidor_con_intermedia(directorio)))
+        self.assertEqual([c['subject'] for c in resultado['chain']],
+                         [{'commonName': ['localhost']}, {'commonName': ['Intermedia de prueba']}])
+        self.assertEqual(resultado['chain'][0]['sha256'], resultado['sha256'])
+
+    def test_cadena_solo_con_api_publica(self):
+        der, _ = _certificado_autofirmado()
+        self.assertEqual(scan_ssl._cadena_presentada(SimpleNamespace()), [])
+        self.assertEqual(scan_ssl._cadena_presentada(SimpleNamespace(get_unverified_chain=lambda: [der])), [der])
+
+    def test_procesar_sin_cadena_usa_la_hoja(self):
+        der, ahora = _certificado_autofirmado()
+        handshake = {'der': der, 'cadena': [], 'protocol': 'TLSv1.3', 'cipher': 'TLS_AES_128_GCM_SHA256', 'bits': 128}
+        resultado = scan_ssl.SSLCertScanner('ejemplo.cl')._procesar(handshake, extendido={})
+        self.assertEqual(resultado['subject'], {'commonName': ['ejemplo.cl']})
+        self.assertEqual((resultado['san'], resultado['serial_number']), (['ejemplo.cl'], '1234'))
+        self.assertEqual(resultado['public_key'], {'type': 'EC', 'curve': 'secp256r1'})
+        self.assertEqual(resultado['not_before'], ahora.isoformat())
+        self.assertEqual(resultado['not_after'], (ahora + timedelta(days=30)).isoformat())
+        self.assertFalse(resultado['expired'])
+        self.assertEqual([c['sha256'] for c in resultado['chain']], [resultado['sha256']])
+
+
+class ReglasHeadersTests(SimpleTestCase):
+    """Calificación de headers HTTP con el motor de reglas (scanner/modulos/reglas_headers.py)."""
+
+    # los mensajes que scan_headerhttp armaba a mano antes del motor, en el mismo orden
+    MENSAJES_ANTERIORES = [
+        'HSTS no configurado (Strict-Transport-Security)',
+        'Protección clickjacking ausente (X-Frame-Options)',
+        'Protección MIME sniffing ausente (X-Content-Type-Options)',
+        'Política de seguridad de contenido ausente (Content-Security-Policy)',
+        'Política de referrer no definida (Referrer-Policy)',
+    ]
+    SEGUROS = {
+        'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+        'X-Frame-Options': 'DENY',
+        'X-Content-Type-Options': 'nosniff',
+        'Content-Security-Policy': "default-src 'self'",
+        'Referrer-Policy': 'strict-origin-when-cross-origin',
+    }
+
+    def _ids(self, headers):
+        return [h['id'] for h in scan_headerhttp.calificar({'headers': headers})['findings']]
+
+    def test_sin_headers_mismos_mensajes_que_antes(self):
+        result = scan_headerhttp.calificar({'headers': {}})
+        self.assertEqual(result['security_issues'], self.MENSAJES_ANTERIORES)
+        self.assertEqual(result['rules_version'], reglas_headers.motor().version)
+
+    def test_cada_header_faltante_da_su_mensaje_anterior(self):
+        for header, mensaje in zip(self.SEGUROS, self.MENSAJES_ANTERIORES):
+            with self.subTest(header=header):
+                headers = {k: v for k, v in self.SEGUROS.items() if k != header}
+                self.assertEqual(scan_headerhttp.calificar({'headers': headers})['security_issues'], [mensaje])
+
+    def test_headers_seguros_sin_hallazgos(self):
+        self.assertEqual(self._ids(self.SEGUROS), [])
+        self.assertEqual(self._ids({k.lower(): v for k, v in self.SEGUROS.items()}), [])
+
+    def test_valores_debiles(self):
+        casos = {
+            'Strict-Transport-Security': ('max-age=300', 'hsts-max-age-bajo'),
+            'X-Frame-Options': ('ALLOW-FROM https://otro.cl', 'xfo-invalido'),
+            'X-Content-Type-Options': ('sniff', 'xcto-invalido'),
+            'Referrer-Policy': ('unsafe-url', 'referrer-unsafe-url'),
+        }
+        for header, (valor, regla) in casos.items():
+            with self.subTest(header=header):
+                self.assertEqual(self._ids({**self.SEGUROS, header: valor}), [regla])
+        self.assertEqual(self._ids({**self.SEGUROS, 'Server': 'nginx/1.18.0', 'X-Powered-By': 'PHP'}),
+                         ['server-version', 'x-powered-by'])
+
+    def test_csp_script_src_cae_en_default_src(self):
+        csp = lambda valor: self._ids({**self.SEGUROS, 'Content-Security-Policy': valor})
+        self.assertEqual(csp("default-src 'self' 'unsafe-inline'"), ['csp-unsafe-inline'])
+        self.assertEqual(csp("default-src 'unsafe-inline'; script-src 'self'"), [])
+        self.assertEqual(csp("script-src * 'unsafe-eval'"), ['csp-unsafe-eval', 'csp-comodin'])
+
+    def test_http_sin_redireccion(self):
+        probes = {'https': {'url': 'https://ejemplo.cl/'}, 'http': {'url': 'http://ejemplo.cl/'}}
+        result = scan_headerhttp.calificar({'headers': self.SEGUROS, 'probes': probes})
+        self.assertEqual(result['security_issues'], ['HTTP no redirige a HTTPS'])
+
+    def test_regla_invalida(self):
+        for regla in ({'id': 'x', 'header': 'A', 'tipo': 'otro', 'mensaje': 'm'},
+                      {'id': 'x', 'header': 'A', 'tipo': 'regex', 'patron': '(', 'mensaje': 'm'},
+                      {'id': 'x', 'header': 'A', 'tipo': 'ausente', 'severidad': 'grave', 'mensaje': 'm'}):
+            with self.subTest(regla=regla), self.assertRaises(ValueError):
+                reglas_headers.Motor([regla])
+
+
+class AlmacenesPorUsuarioTests(TestCase):
+    """Certificados y textos crudos: solo los referenciados por resultados propios (o cualquiera para staff)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dueno = User.objects.create_user(username='dueno')
+        cls.otro = User.objects.create_user(username='otro')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.cert, cls.texto = 'c' * 64, 'd' * 64
+        Certificado.objects.create(sha256=cls.cert, pem='PEM', datos={'subject': {}})
+        TextoCrudo.objects.create(sha256=cls.texto, comprimido=zlib.compress(b'Domain: ejemplo.cl'), tamano=18)
+        escaneo = Escaneo.objects.create(user=cls.dueno, objetivo='ejemplo.cl', tipo_objetivo='dominio')
+        resultadoModulo.objects.create(escaneo=escaneo, nombre_modulo='ssl', estado='completado',
+                                       resultado={'certificado': cls.cert, 'tls': {}})
+        resultadoModulo.objects.create(escaneo=escaneo, nombre_modulo='whois', estado='completado',
+                                       resultado={'raw': {'texto': cls.texto, 'bytes': 18}})
+        # el otro usuario tiene la huella en un módulo que no guarda certificados: no cuenta
+        ajeno = Escaneo.objects.create(user=cls.otro, objetivo='ejemplo.cl', tipo_objetivo='dominio')
+        resultadoModulo.objects.create(escaneo=ajeno, nombre_modulo='dorks', estado='completado',
+                                       resultado={'nota': cls.cert + cls.texto})
+
+    def _pedir(self, vista, ruta, huella, usuario):
+        peticion = APIRequestFactory().get(f'/{ruta}/{huella}/')
+        force_authenticate(peticion, user=usuario)
+        return vista.as_view({'get': 'retrieve'})(peticion, pk=huella)
+
+    def test_certificados(self):
+        for usuario, codigo in ((self.dueno, 200), (self.otro, 404), (self.admin, 200)):
+            with self.subTest(usuario=usuario.username):
+                respuesta = self._pedir(CertificadoViewSet, 'certificados', self.cert, usuario)
+                self.assertEqual(respuesta.status_code, codigo)
+        self.assertEqual(self._pedir(CertificadoViewSet, 'certificados', self.cert, self.dueno).data['pem'], 'PEM')
+
+    def test_textos(self):
+        for usuario, codigo in ((self.dueno, 200), (self.otro, 404), (self.admin, 200)):
+            with self.subTest(usuario=usuario.username):
+                respuesta = self._pedir(TextoCrudoViewSet, 'textos', self.texto, usuario)
+                self.assertEqual(respuesta.status_code, codigo)
+        self.assertEqual(self._pedir(TextoCrudoViewSet, 'textos', self.texto, self.dueno).data['texto'], 'Domain: ejemplo.cl')
+
+    def test_huella_de_otro_almacen_no_sirve(self):
+        # la huella del texto aparece en un resultado propio, pero de un módulo sin certificados
+        Certificado.objects.create(sha256=self.texto, pem='', datos={})
+        self.assertEqual(self._pedir(CertificadoViewSet, 'certificados', self.texto, self.dueno).status_code, 404)
+
+
+class WhoisTests(SimpleTestCase):
+    """Dominio registrado y servidor whois (scanner/modulos/scan_whois.py), sin red."""
+
+    def test_dominio_registrado(self):
+        casos = {
+            'www.bbc.co.uk': 'bbc.co.uk',
+            'a.b.minsal.gob.cl': 'minsal.gob.cl',
+            'ejemplo.cl': 'ejemplo.cl',
+            ' WWW.Ejemplo.CL. ': 'ejemplo.cl',
+            'localhost': 'localhost',
+        }
+        for objetivo, esperado in casos.items():
+            with self.subTest(objetivo=objetivo):
+                self.assertEqual(scan_whois.dominio_registrado(objetivo), esperado)
+
+    def test_servidor_whois(self):
+        with mock.patch('socket.create_connection', side_effect=AssertionError('sin red')):
+            self.assertEqual(scan_whois.servidor_whois('minsal.gob.cl'), 'whois.nic.cl')
+            self.assertEqual(scan_whois.servidor_whois('EJEMPLO.CL.'), 'whois.nic.cl')
+            self.assertEqual(scan_whois.servidor_whois('ejemplo.google'), 'whois.nic.google')
+            # TLD que la tabla no conoce: no se consulta a IANA ni se inventa un servidor
+            self.assertIsNone(scan_whois.servidor_whois('ejemplo.localhost'))
+
+    def test_bucket_whois_por_servidor(self):
+        spec = registry.obtener('whois')
+        with mock.patch('socket.create_connection', side_effect=AssertionError('sin red')):
+            self.assertEqual(ratelimit.destinos(spec, 'www.minsal.gob.cl'), [('whois', 'rl:whois:whois.nic.cl', 1)])
+            # el nombre inventado para el TLD desconocido solo vive en la clave del bucket
+            self.assertEqual(ratelimit.destinos(spec, 'a.ejemplo.localhost'), [('whois', 'rl:whois:tld.localhost', 1)])
+
+
+class _GoogleFalso(BaseHTTPRequestHandler):
+    """Google CSE local: `totales` dice cuántos resultados tiene cada consulta (100 si no está)."""
+    totales = {}
+    pedidas = []
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        self.pedidas.append((params['q'], int(params['start'])))
+        if params['q'] == 'limitada':
+            self.send_response(429)
+            self.end_headers()
+            return
+        total, inicio = self.totales.get(params['q'], 100), int(params['start'])
+        items = [{'title': f"{params['q']} {n}", 'link': f'https://ejemplo.cl/{n}', 'snippet': ''}
+                 for n in range(inicio, min(total + 1, inicio + int(params['num'])))]
+        cuerpo = json.dumps({'items': items, 'searchInformation': {'totalResults': str(total)}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class MotorDorksTests(SimpleTestCase):
+    """Paginación, caché y libro de cuota de scanner/modulos/motor_dorks.py contra un CSE falso local."""
+    CRED = {'api_key': 'clave', 'cx': 'motor'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _GoogleFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.servidor.server_close)
+        cls.addClassCleanup(cls.servidor.shutdown)
+
+    def setUp(self):
+        # caché y libro solo en el proceso, vacíos en cada prueba
+        url = motor_dorks._config['url']
+        motor_dorks.configurar(None)
+        self.addCleanup(motor_dorks.configurar, url)
+        motor_dorks._lru.clear()
+        motor_dorks._cuota_local.clear()
+        _GoogleFalso.totales, _GoogleFalso.pedidas = {}, []
+        patcher = mock.patch.object(motor_dorks, 'CSE_URL', f'http://127.0.0.1:{self.servidor.server_port}/')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pagina_hasta_la_cantidad(self):
+        salida = motor_dorks.dork(self.CRED, 'site:ejemplo.cl', 25)
+        self.assertEqual(len(salida['results']), 25)
+        self.assertEqual(_GoogleFalso.pedidas, [('site:ejemplo.cl', 1), ('site:ejemplo.cl', 11), ('site:ejemplo.cl', 21)])
+        self.assertEqual((salida['requests'], salida['cache_hits']), (3, 0))
+
+    def test_deja_de_paginar_sin_mas_resultados(self):
+        _GoogleFalso.totales = {'pocos': 13}
+        salida = motor_dorks.dork(self.CRED, 'pocos', 50)
+        self.assertEqual(len(salida['results']), 13)
+        self.assertEqual(salida['requests'], 2)
+
+    def test_cache_por_pagina(self):
+        motor_dorks.dork(self.CRED, 'site:ejemplo.cl', 15)
+        salida = motor_dorks.dork(self.CRED, 'site:ejemplo.cl', 5)
+        self.assertEqual((salida['requests'], salida['cache_hits']), (0, 1))
+        self.assertEqual(len(_GoogleFalso.pedidas), 2)
+        self.assertEqual(motor_dorks.cuota()['used'], 2)  # lo que sale de caché no gasta cuota
+
+    def test_entrada_corrupta_es_fallo_de_cache(self):
+        guardadas = {}
+        cliente = SimpleNamespace(get=lambda clave: b'{"items": [', set=lambda clave, valor, ex: guardadas.update({clave: valor}),
+                                  pipeline=mock.Mock(side_effect=redis.ConnectionError))
+        with mock.patch.object(motor_dorks, '_redis', return_value=cliente):
+            datos, desde_cache = motor_dorks.pagina(self.CRED, 'site:ejemplo.cl')
+        self.assertFalse(desde_cache)
+        self.assertEqual(len(datos['items']), 10)
+        self.assertEqual(json.loads(next(iter(guardadas.values()))), datos)  # la respuesta nueva pisa la corrupta
+
+    def test_cuota_agotada_no_sale(self):
+        with mock.patch.object(motor_dorks, 'CUOTA_DIARIA', 2):
+            salida = motor_dorks.dork(self.CRED, 'site:ejemplo.cl', 50)
+            self.assertEqual(len(salida['results']), 20)
+            self.assertIn('Cuota diaria', salida['error'])
+            self.assertEqual(len(_GoogleFalso.pedidas), 2)
+            self.assertEqual(motor_dorks.cuota()['remaining'], 0)
+
+    def test_429_agota_el_dia(self):
+        salida = motor_dorks.dork(self.CRED, 'limitada', 10)
+        self.assertEqual(salida['error'], 'Google CSE respondió HTTP 429')
+        self.assertEqual(motor_dorks.cuota()['remaining'], 0)
+        self.assertIn('Cuota diaria', motor_dorks.dork(self.CRED, 'otra', 10)['error'])
+
+    def test_run_dorks_no_consulta_despues_del_tope(self):
+        plantillas = tuple((f'q{i} {{domain}}', f'd{i}') for i in range(8))
+        _GoogleFalso.totales = {'q1 ejemplo.cl': 0}
+        with mock.patch.object(motor_dorks, 'credenciales', return_value=self.CRED), \
+                mock.patch.object(motor_dorks, 'plantillas', return_value=plantillas):
+            salida = scan_dorks.run_dorks('ejemplo.cl', results_per_dork=1, max_total_results=5)
+        # q1 no trae nada: hacen falta 6 plantillas para 5 resultados, y ninguna más
+        self.assertEqual(sorted(q for q, _ in _GoogleFalso.pedidas), [f'q{i} ejemplo.cl' for i in range(6)])
+        self.assertEqual([d['query'] for d in salida['results']], [f'q{i} ejemplo.cl' for i in range(6)])
+        self.assertEqual(sum(len(d['results']) for d in salida['results']), 5)
+        self.assertEqual(salida['meta']['requests'], 6)
+
+
+@override_settings(SCANNER_LOTE_MAX=5, SCANNER_LOTE_CHUNK=2)
+class LotesTests(TestCase):
+    """Creación de lotes (scanner/lotes.py), su API y el progreso por objetivos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(username='masivo')
+        cls.otro = User.objects.create_user(username='otro-masivo')
+
+    def test_crear_lote_valida_y_cuenta_rechazados(self):
+        objetivos = ['ejemplo.cl', 'no es un dominio', '10.0.0.1', 'x' * 100 + '.cl', '10.0.0.0/30', 'sobra.cl']
+        with mock.patch.object(tasks.start_lote, 'delay') as delay, self.captureOnCommitCallbacks(execute=True) as despachos:
+            lote = crear_lote(self.usuario, iter(objetivos), ['dns'], sin_cache=True, opciones={'dns': {'x': 1}})
+        # SCANNER_LOTE_MAX corta la entrada: 'sobra.cl' ni se lee
+        self.assertEqual((lote.total_objetivos, lote.rechazados), (3, 2))
+        escaneos = list(lote.escaneos.order_by('id').values_list('objetivo', 'tipo_objetivo', 'estado', 'carril', 'sin_cache'))
+        self.assertEqual(escaneos, [('ejemplo.cl', 'dominio', 'pendiente', 'masivo', True),
+                                    ('10.0.0.1', 'ip', 'pendiente', 'masivo', True),
+                                    ('10.0.0.0/30', 'red', 'pendiente', 'masivo', True)])
+        self.assertEqual(len(despachos), 1)
+        delay.assert_called_once_with(lote.id)
+
+    def test_crear_lote_sin_validos_no_despacha(self):
+        with self.captureOnCommitCallbacks() as despachos:
+            lote = crear_lote(self.usuario, iter(['nada válido', '']), ['dns'])
+        self.assertEqual((lote.total_objetivos, lote.rechazados), (0, 2))
+        self.assertEqual(despachos, [])
+
+    def _api(self, metodo, usuario, ruta='/lotes/', datos=None, **kwargs):
+        peticion = getattr(APIRequestFactory(), metodo)(ruta, datos, format='json')
+        force_authenticate(peticion, user=usuario)
+        accion = {'post': 'create', 'get': 'retrieve' if kwargs else 'list'}[metodo]
+        return LoteEscaneoViewSet.as_view({metodo: accion})(peticion, **kwargs)
+
+    def test_api_crear(self):
+        with self.captureOnCommitCallbacks(), mock.patch.object(tasks.start_lote, 'delay'):
+            respuesta = self._api('post', self.usuario, datos={'objetivos': ['ejemplo.cl', '???'], 'modules': ['dns']})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.data['total_objetivos'], respuesta.data['rechazados']), (1, 1))
+        self.assertEqual(respuesta.data['progreso']['objetivos_en_curso'], 1)
+        self.assertEqual(self._api('post', self.usuario, datos={'objetivos': 'ejemplo.cl', 'modules': ['nada']}).status_code, 400)
+        self.assertEqual(self._api('post', self.usuario, datos={'modules': ['dns']}).status_code, 400)
+
+    def test_api_lista_sin_consultas_por_lote(self):
+        for usuario in (self.usuario, self.usuario, self.usuario, self.otro):
+            lote = LoteEscaneo.objects.create(user=usuario, modulos=['dns'], total_objetivos=1)
+            escaneo = Escaneo.objects.create(user=usuario, lote=lote, objetivo='ejemplo.cl', tipo_objetivo='dominio')
+            resultadoModulo.objects.create(escaneo=escaneo, nombre_modulo='dns', estado='pendiente', resultado={})
+        with self.assertNumQueries(1):
+            respuesta = self._api('get', self.usuario)
+        self.assertEqual(len(respuesta.data), 3)  # solo los propios
+        self.assertTrue(all(l['progreso']['pendientes'] == 1 for l in respuesta.data))
+        ajeno = LoteEscaneo.objects.get(user=self.otro)
+        self.assertEqual(self._api('get', self.usuario, ruta=f'/lotes/{ajeno.id}/', pk=ajeno.id).status_code, 404)
+
+    def test_progreso_sigue_en_curso_con_objetivos_sin_expandir(self):
+        # el primer chunk salió entero de caché; el resto del lote todavía no tiene módulos
+        lote = LoteEscaneo.objects.create(user=self.usuario, modulos=['dns'], total_objetivos=3)
+        for i, estado in enumerate(('completado', 'pendiente', 'pendiente')):
+            escaneo = Escaneo.objects.create(user=self.usuario, lote=lote, objetivo=f'h{i}.ejemplo.cl',
+                                             tipo_objetivo='dominio', estado=estado)
+            if estado == 'completado':
+                resultadoModulo.objects.create(escaneo=escaneo, nombre_modulo='dns', estado='completado', resultado={})
+        progreso = lote.progreso()
+        self.assertEqual((progreso['modulos_total'], progreso['pendientes']), (1, 0))
+        self.assertEqual(progreso['objetivos_en_curso'], 2)
+        lote.escaneos.update(estado='completado')
+        self.assertEqual(self._api('get', self.usuario, ruta=f'/lotes/{lote.id}/', pk=lote.id).data['progreso']['objetivos_en_curso'], 0)
+
+
+class _ResolverFalso:
+    """dns.resolver.Resolver de prueba: `respuestas` por (nombre, tipo) -> (ttl, textos) o excepción."""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.consultas = []
+
+    def resolve(self, nombre, tipo):
+        self.consultas.append((nombre, tipo))
+        respuesta = self.respuestas[(nombre, tipo)]
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        ttl, textos = respuesta
+        return _Respuestas(ttl, textos)
+
+
+class _Respuestas(list):
+    def __init__(self, ttl, textos):
+        super().__init__(SimpleNamespace(to_text=lambda t=t: t) for t in textos)
+        self.rrset = SimpleNamespace(ttl=ttl)
+
+
+class CacheDNSTests(SimpleTestCase):
+    """LRU del proceso, negativos, TTL y Redis de scanner/modulos/dnscache.py."""
+
+    def setUp(self):
+        url = dnscache._config['url']
+        dnscache.configurar(None)
+        self.addCleanup(dnscache.configurar, url)
+        for estado in (dnscache._lru, dnscache._contadores, dnscache._pendientes):
+            estado.clear()
+        self.ahora = 1000.0
+        reloj = mock.patch.object(dnscache, 'time', SimpleNamespace(time=lambda: self.ahora))
+        reloj.start()
+        self.addCleanup(reloj.stop)
+        self.resolver = _ResolverFalso({('ejemplo.cl', 'A'): (60, ['192.0.2.1']),
+                                        ('nada.ejemplo.cl', 'A'): dns.resolver.NXDOMAIN()})
+
+    def test_hit_de_la_lru(self):
+        for nombre, tipo in (('ejemplo.cl', 'A'), ('Ejemplo.CL.', 'a'), ('EJEMPLO.cl', 'A')):  # misma clave
+            respuesta = dnscache.consultar(self.resolver, nombre, tipo)
+        self.assertEqual((respuesta.textos, respuesta.ttl), (['192.0.2.1'], 60))
+        self.assertEqual(len(self.resolver.consultas), 1)
+        self.assertEqual(dnscache.estadisticas()['proceso'], {'miss': 1, 'hit_local': 2})
+
+    def test_ttl_vence(self):
+        dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        self.ahora += 59
+        self.assertEqual(dnscache.consultar(self.resolver, 'ejemplo.cl', 'A').ttl, 1)
+        self.ahora += 1
+        dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        self.assertEqual(len(self.resolver.consultas), 2)
+
+    def test_ttl_acotado(self):
+        self.resolver.respuestas[('ejemplo.cl', 'A')] = (86400, ['192.0.2.1'])
+        self.assertEqual(dnscache.consultar(self.resolver, 'ejemplo.cl', 'A').ttl, dnscache.TTL_MAX)
+
+    def test_negativo_se_cachea(self):
+        with self.assertRaises(dns.resolver.NXDOMAIN):
+            dnscache.consultar(self.resolver, 'nada.ejemplo.cl', 'A')
+        with self.assertRaises(dnscache.RespuestaNegativa):
+            dnscache.consultar(self.resolver, 'nada.ejemplo.cl', 'A')
+        self.ahora += dnscache.NEGATIVO_MAX
+        with self.assertRaises(dns.resolver.NXDOMAIN):
+            dnscache.consultar(self.resolver, 'nada.ejemplo.cl', 'A')
+        self.assertEqual(len(self.resolver.consultas), 2)
+
+    def test_timeout_no_se_cachea(self):
+        self.resolver.respuestas[('lento.cl', 'A')] = dns.resolver.LifetimeTimeout(timeout=1.0, errors={})
+        for _ in range(2):
+            with self.assertRaises(dns.resolver.LifetimeTimeout):
+                dnscache.consultar(self.resolver, 'lento.cl', 'A')
+        self.assertEqual(len(self.resolver.consultas), 2)
+
+    def test_sin_redis_sigue_con_la_lru(self):
+        dnscache.configurar('redis://127.0.0.1:1/0')
+        with self.assertLogs(dnscache.logger, 'WARNING'):
+            dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        self.assertEqual(len(self.resolver.consultas), 1)
+
+    def test_entrada_corrupta_es_miss(self):
+        guardadas = {}
+        cliente = SimpleNamespace(get=lambda clave: b'{"x": 1', set=lambda clave, valor, ex: guardadas.update({clave: valor}))
+        with mock.patch.object(dnscache, '_redis', return_value=cliente), self.assertLogs(dnscache.logger, 'WARNING'):
+            respuesta = dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        self.assertEqual(respuesta.textos, ['192.0.2.1'])
+        self.assertEqual(json.loads(guardadas['dns:A:ejemplo.cl'])['t'], ['192.0.2.1'])  # la respuesta nueva la pisa
+
+    @skipUnless(fakeredis, 'requiere fakeredis')
+    def test_redis_compartido_entre_procesos(self):
+        compartido = fakeredis.FakeRedis()
+        with mock.patch.object(dnscache, '_redis', return_value=compartido):
+            dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+            dnscache._lru.clear()  # otro proceso: LRU vacía, mismo Redis
+            self.ahora += 10
+            respuesta = dnscache.consultar(self.resolver, 'ejemplo.cl', 'A')
+        self.assertEqual((respuesta.textos, respuesta.ttl), (['192.0.2.1'], 50))
+        self.assertEqual(len(self.resolver.consultas), 1)
+        self.assertEqual(dnscache.estadisticas()['proceso'].get('hit_redis'), 1)
+
+
+class _ResolverAsincronoFalso:
+    """dns.asyncresolver de prueba: A de `registros`; bajo `comodin` cualquier otro nombre responde su IP."""
+
+    def __init__(self, registros, comodin=None):
+        self.registros, self.comodin = registros, comodin
+        self.en_vuelo = self.pico = 0
+
+    async def resolve(self, nombre, tipo):
+        self.en_vuelo += 1
+        self.pico = max(self.pico, self.en_vuelo)
+        try:
+            await asyncio.sleep(0.001)
+            if nombre in self.registros:
+                ips = self.registros[nombre]
+            elif self.comodin and nombre.endswith('.' + self.comodin[0]):
+                ips = [self.comodin[1]]
+            else:
+                raise dns.resolver.NXDOMAIN()
+            return [SimpleNamespace(to_text=lambda ip=ip: ip) for ip in ips]
+        finally:
+            self.en_vuelo -= 1
+
+
+class SubdominiosTests(SimpleTestCase):
+    """Enumerador de subdominios (scanner/modulos/scan_subdomains.py) contra un resolver falso."""
+
+    def _enumerar(self, resolver, wordlist, sans=(), en_vuelo=8, on_parcial=None):
+        enumerador = scan_subdomains.SubdomainEnumerator('Ejemplo.cl.', wordlist=wordlist, en_vuelo=en_vuelo)
+        with mock.patch.object(enumerador, '_resolver', return_value=resolver):
+            return asyncio.run(enumerador.enumerar(sans=list(sans), on_parcial=on_parcial))
+
+    def test_filtra_el_comodin(self):
+        resolver = _ResolverAsincronoFalso({'www.ejemplo.cl': ['192.0.2.10'], 'vpn.ejemplo.cl': ['203.0.113.9', '192.0.2.20']},
+                                           comodin=('ejemplo.cl', '203.0.113.9'))
+        resultado = self._enumerar(resolver, ['www', 'mail', 'vpn', 'ftp'])
+        # mail y ftp solo responden por el comodín; vpn tiene además una IP propia
+        self.assertEqual([s['name'] for s in resultado['subdomains']], ['vpn.ejemplo.cl', 'www.ejemplo.cl'])
+        self.assertEqual(resultado['wildcard'], ['203.0.113.9'])
+        self.assertEqual((resultado['meta']['tested'], resultado['meta']['found']), (4, 2))
+
+    def test_sans_primero_y_sin_repetir(self):
+        resolver = _ResolverAsincronoFalso({'api.ejemplo.cl': ['192.0.2.1'], 'www.ejemplo.cl': ['192.0.2.2']})
+        resultado = self._enumerar(resolver, ['www', 'api', 'nada'], sans=['api.ejemplo.cl'])
+        self.assertEqual(resultado['meta']['sources'], {'wordlist': 2, 'san': 1})  # 'api' de la wordlist ya venía del SAN
+        self.assertEqual(resultado['meta']['found'], 2)
+
+    def test_trabajadores_acotados(self):
+        resolver = _ResolverAsincronoFalso({})
+        wordlist = (f'w{i}' for i in range(2000))  # generador: se consume de a poco
+        resultado = self._enumerar(resolver, wordlist, en_vuelo=16)
+        self.assertEqual(resultado['meta']['tested'], 2000)
+        self.assertLessEqual(resolver.pico, 16)
+
+    def test_cosechar_sans(self):
+        datos = {'san': ['*.ejemplo.cl', 'www.ejemplo.cl', 'otro.cl', 'Api.Ejemplo.cl.', '*.dev.ejemplo.cl', 'www.ejemplo.cl']}
+        with mock.patch.object(scan_ssl.SSLCertScanner, 'scan_async', mock.AsyncMock(return_value=datos)):
+            nombres = asyncio.run(scan_subdomains.cosechar_sans('ejemplo.cl'))
+        self.assertEqual(nombres, ['www.ejemplo.cl', 'api.ejemplo.cl', 'dev.ejemplo.cl'])
+
+    def test_parciales_agrupados_en_el_mismo_hilo(self):
+        resolver = _ResolverAsincronoFalso({f'w{i}.ejemplo.cl': ['192.0.2.1'] for i in range(50)})
+        avisos = []
+        with mock.patch.object(scan_subdomains.SubdomainEnumerator, '_resolver', return_value=resolver), \
+                mock.patch.object(scan_subdomains, 'PARCIAL_CADA', 60):
+            resultado = scan_subdomains.run_subdomains('ejemplo.cl', wordlist=[f'w{i}' for i in range(50)], sans=False,
+                                                       on_parcial=lambda trozo: avisos.append((threading.get_ident(), trozo)))
+        # todo lo encontrado sale en un solo envío al terminar, desde el hilo que llamó
+        self.assertEqual(len(avisos), 1)
+        self.assertEqual(avisos[0][0], threading.get_ident())
+        self.assertEqual(sorted(avisos[0][1]['subdomains']), sorted(s['name'] for s in resultado['subdomains']))
+
+
+class _SitioFalso(BaseHTTPRequestHandler):
+    """Sitio HTTP local: /a y /b redirigen a /final, que responde con headers de seguridad."""
+    pedidas = []
+
+    def do_GET(self):
+        self.pedidas.append(self.path)
+        if self.path in ('/', '/a', '/b'):
+            self.send_response(301)
+            self.send_header('Location', '/final')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(0.05)  # /final tarda: la otra cadena llega mientras está en curso
+        self.send_response(200)
+        self.send_header('X-Frame-Options', 'DENY')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class SondasHeadersTests(SimpleTestCase):
+    """Peticiones de scan_headerhttp.run_headerhttp contra un sitio local."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _SitioFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.servidor.server_close)
+        cls.addClassCleanup(cls.servidor.shutdown)
+        cls.base = f'127.0.0.1:{cls.servidor.server_port}'
+
+    def setUp(self):
+        _SitioFalso.pedidas = []
+
+    def test_redireccion_compartida_se_pide_una_vez(self):
+        peticiones = scan_headerhttp._Peticiones(timeout=5)
+        with ThreadPoolExecutor(max_workers=2) as hilos:
+            a, b = hilos.map(peticiones.cadena, [f'http://{self.base}/a', f'http://{self.base}/b'])
+        self.assertEqual((a['status'], b['status']), (200, 200))
+        self.assertEqual(a['url'], b['url'])
+        self.assertEqual(sorted(_SitioFalso.pedidas), ['/a', '/b', '/final'])
+        self.assertEqual(len(peticiones), 3)
+
+    def test_https_y_http_en_paralelo(self):
+        resultado = scan_headerhttp.run_headerhttp(self.base, timeout=5)
+        # el sitio no habla TLS: los headers salen de la cadena de http
+        self.assertIn('error', resultado['probes']['https'])
+        self.assertEqual(resultado['probes']['http']['chain'], [{'url': f'http://{self.base}', 'status': 301, 'location': '/final'}])
+        self.assertEqual(resultado['url'], f'http://{self.base}/final')
+        self.assertEqual(resultado['headers']['X-Frame-Options'], 'DENY')
+        self.assertEqual(resultado['meta']['requests'], 3)  # https (falla), http y /final
+        self.assertNotIn('error', resultado)
+
+    def test_cualquier_excepcion_queda_como_error(self):
+        peticiones = scan_headerhttp._Peticiones(timeout=5)
+        with mock.patch.object(scan_headerhttp.sesion(), 'get', side_effect=ValueError('URL rara')):
+            self.assertEqual(peticiones.cadena('http://ejemplo.cl/'),
+                             {'url': 'http://ejemplo.cl/', 'error': 'ValueError: URL rara', 'chain': []})
+        # quien esperaba la misma URL ve el mismo error, no un KeyError
+        self.assertEqual(peticiones.pedir('http://ejemplo.cl/'), {'error': 'ValueError: URL rara'})
@@ -0,0 +1,36 @@
+# Textos crudos de los módulos, guardados aparte y comprimidos
+#
+# Los módulos con MODULO["textos"] devuelven en esas claves un texto largo que casi
+# nadie lee (la respuesta completa de whois). Antes de guardar el resultado, extraer()
+# lo comprime con zlib en la tabla TextoCrudo (una fila por huella SHA-256, se inserta
+# solo si no estaba) y en el resultado deja {"texto": <sha256>, "bytes": <tamaño>}.
+# El texto se descomprime solo cuando alguien lo abre (GET /textos/<sha256>/).
+import hashlib
+import zlib
+from typing import Any
+
+from .models import TextoCrudo
+
+REFERENCIA = "texto"
+
+
+def extraer(spec, resultado: Any) -> Any:
+    """
+    Mueve los textos de las claves spec.textos al almacén y los reemplaza por su
+    referencia. Modifica el resultado en el lugar y lo devuelve. Es idempotente: lo
+    que ya es una referencia no se toca.
+    """
+    if not isinstance(resultado, dict):
+        return resultado
+    nuevos = {}
+    for clave in spec.textos:
+        texto = resultado.get(clave)
+        if not isinstance(texto, str):
+            continue
+        crudo = texto.encode("utf-8")
+        sha256 = hashlib.sha256(crudo).hexdigest()
+        nuevos.setdefault(sha256, TextoCrudo(sha256=sha256, comprimido=zlib.compress(crudo, 9), tamano=len(crudo)))
+        resultado[clave] = {REFERENCIA: sha256, "bytes": len(crudo)}
+    if nuevos:
+        TextoCrudo.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+    return resultado
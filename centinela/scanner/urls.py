@@ -1,6 +1,6 @@
 # Router y URLs para la API REST de resultados de módulos
 from rest_framework import routers
-from .api_views import ResultadoModuloViewSet
+from .api_views import CertificadoViewSet, DNSCacheStatsView, DorksCuotaView, LoteEscaneoViewSet, ResultadoModuloViewSet, TextoCrudoViewSet
 
 from django.urls import path
 from django.contrib.auth import views as auth_views
@@ -10,6 +10,9 @@ router = routers.DefaultRouter()
 
 # Registrar el ViewSet con el router
 router.register(r'resultadosmodulos', ResultadoModuloViewSet, basename='resultadosModulos')
+router.register(r'lotes', LoteEscaneoViewSet, basename='lotes')
+router.register(r'certificados', CertificadoViewSet, basename='certificados')
+router.register(r'textos', TextoCrudoViewSet, basename='textos')
 
 urlpatterns = [
     # Tus patrones de URL van aquí
@@ -23,6 +26,9 @@ urlpatterns = [
     path("modules/<str:name>/", views.module_visual, name="module_visual"),  # Vista para renderizar los visuals de cada módulo, esta api sirve los fragmentos html
     path("scan_report/<int:escaneo_id>/", views.scan_report_view, name="scan_report_view"), # Vista para el informe detallado de un escaneo específico
     path("escaneo/<int:escaneo_id>/status/", views.escaneo_status_view, name="escaneo_status_view"),  # Vista para obtener el estado de un escaneo específico
+    path("lote/", views.lote_view, name="lote_view"),                                      # Escaneo masivo: formulario de carga y progreso del lote
+    path("dnscache/", DNSCacheStatsView.as_view(), name="dnscache_stats"),                 # Contadores hit/miss de la caché DNS compartida (admin)
+    path("dorks/cuota/", DorksCuotaView.as_view(), name="dorks_cuota"),                    # Uso del día de la cuota de Google CSE (admin)
 
 
     # Las siguientes vistas son para configurar mas adelante
@@ -1,6 +1,5 @@
 #Standard Library
 import io
-from time import sleep, timezone
 import json
 from datetime import datetime
 
@@ -18,13 +17,19 @@ from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 
-from scanner.tasks import run_modulo_task
+from scanner.tasks import start_scan
 
 #Forms
-from .forms import CustomUserCreationForm, ScanForm  # Importar nuestro formulario personalizado
+from .forms import BulkScanForm, CustomUserCreationForm, ScanForm, opciones_modulos, tipo_objetivo  # Importar nuestro formulario personalizado
 
 #Models
-from .models import Escaneo, resultadoModulo
+from .models import Escaneo, LoteEscaneo, resultadoModulo
+
+#Escaneos masivos
+from .lotes import crear_lote
+
+#Almacén de certificados TLS (los resultados guardan solo la huella)
+from . import certificados
 
 
 def index_view(request): # el escaneo se hace aqui
@@ -41,12 +46,14 @@ def index_view(request): # el escaneo se hace aqui
                     """
                     -------FLUJO--------
                     1. Crear instancia de Escaneo en estado 'pendiente'
-                    2. Para cada módulo seleccionado, crear instancia de resultadoModulo en estado 'pendiente' con referencia al Escaneo
-                    3. Iniciar tareas asíncronas (usando Celery) para ejecutar cada módulo
+                    2. La tarea start_scan crea (bulk_create) un resultadoModulo por cada módulo seleccionado
+                       ('completado' al tiro si el resultado está en caché, 'pendiente' si no)
+                    3. start_scan despacha los módulos sin caché como un group de Celery
                     4. Cada tarea actualiza el estado del resultadoModulo y guarda resultados
+                       (nmap y dns van dejando trozos en resultado_parcial mientras corren)
                     5. Cuando termine un módulo se guarda en la base de datos y de alguna manera se da aviso de que tal modulo terminó
                     6. Con ese aviso, en el index, se renderiza el resultado de ese módulo con el visuals .html correspondiente
-                    7. Cuando todos los módulos de un escaneo terminan, actualizar el estado del Escaneo a 'completado'
+                    7. El último módulo en terminar (contador atómico) cierra el Escaneo: 'completado', 'parcial' o 'error'
                     -------------------
                     """
 
@@ -54,25 +61,14 @@ def index_view(request): # el escaneo se hace aqui
                     escaneo = Escaneo.objects.create(
                         user=request.user,
                         objetivo=target,
-                        tipo_objetivo='dominio' if not target.replace('.', '').isdigit() else 'ip',
-                        estado='en_proceso'
+                        tipo_objetivo=tipo_objetivo(target),
+                        estado='en_proceso',
+                        sin_cache=form.cleaned_data['forzar'],
+                        opciones=opciones_modulos(form.cleaned_data),
                     )
 
-                    # 2. Crear instancias de resultadoModulo
-                    for modulo in modules:
-                        
-                        resultado = resultadoModulo.objects.create(
-                            escaneo=escaneo, # Foranea al escaneo creado
-                            nombre_modulo=modulo,
-                            estado='pendiente',
-                            resultado={}
-                        )
-                        # 3. Iniciar tarea asíncrona
-                        if modulo.lower() == "nmap": # nmap es pesado, va en cola heavy
-                            run_modulo_task.apply_async(args=[resultado.id], queue="heavy") 
-                        else: # el resto va en cola default
-                            sleep(1) # Simulamos retardo para pruebas
-                            run_modulo_task.delay(resultado.id) # Llamada asíncrona con Celery
+                    # 2-3. El orquestador crea los resultadoModulo y despacha los módulos en paralelo
+                    start_scan.delay(escaneo.id, modules)
 
                     messages.success(request, f'Scan iniciado para {target} con módulos: {", ".join(modules)}')
 
@@ -110,6 +106,35 @@ def index_view(request): # el escaneo se hace aqui
 
 
 
+def lote_view(request): # escaneo masivo: lista o CSV de objetivos
+    if not request.user.is_authenticated:
+        messages.info(request, 'Por favor, inicia sesión para realizar escaneos.')
+        return redirect('auth_view')
+
+    if request.method == 'POST':
+        form = BulkScanForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                # Crea los Escaneo por tandas; los módulos los crea y despacha la tarea start_lote
+                lote = crear_lote(request.user, form.iterar_objetivos(), form.cleaned_data['modules'], form.cleaned_data['forzar'],
+                                  opciones_modulos(form.cleaned_data))
+                messages.success(request, f'Lote #{lote.id} iniciado con {lote.total_objetivos} objetivos ({lote.rechazados} rechazados)')
+                return redirect(f'{reverse("lote_view")}?lote_id={lote.id}')
+            except Exception as e:
+                messages.error(request, f'Error al iniciar el lote: {e}')
+    else:
+        form = BulkScanForm()
+
+    lote = None
+    lote_id = request.GET.get('lote_id')
+    if lote_id:
+        lote = LoteEscaneo.objects.filter(id=lote_id, user=request.user).first()
+        if lote is None:
+            messages.error(request, 'Lote no encontrado o no tienes permiso para verlo.')
+
+    return render(request, 'lote.html', {'form': form, 'lote': lote})
+
+
 def auth_view(request):
     # Si el usuario ya está autenticado, redirigir a la página principal
     if request.user.is_authenticated:
@@ -172,6 +197,7 @@ def scan_report_view(request, escaneo_id):
         # Obtener escaneo y sus resultados
         escaneo = get_object_or_404(Escaneo, id=escaneo_id)
         resultados = resultadoModulo.objects.filter(escaneo=escaneo)
+        certificados.hidratar(r.resultado for r in resultados)
 
         # Crear un buffer de memoria
         buffer = io.BytesIO()
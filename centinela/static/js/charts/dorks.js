@@ -4,7 +4,7 @@
  * - Entrada: initGraficosDorks(datos)
  *   datos puede ser:
  *     1) un array de dorks: [ { description, query, results:[{title,snippet,link}], ... }, ... ]
- *     2) un objeto con .results que sea array (por compatibilidad): { results: [...] }
+ *     2) un objeto con .results que sea array: { results: [...], template_set, quota:{used,budget,remaining}, meta }
  *
  * - Registra: window.Visuals['dorks'] = initGraficosDorks;
  *
@@ -60,6 +60,7 @@
               <div class="small text-muted text-truncate" title="${escapeHTML(dork.query || '')}">
                 <code style="white-space:nowrap; max-width:100%; display:inline-block;">${escapeHTML(dork.query || '')}</code>
               </div>
+              ${dork.error ? `<div class="small text-danger mt-1">⚠️ ${escapeHTML(dork.error)}</div>` : ''}
               <div class="mt-2">${preview}</div>
             </div>
 
@@ -131,7 +132,7 @@
     }
   }
 
-  function renderAll(container, dataArray) {
+  function renderAll(container, dataArray, cuota) {
     const list = container.querySelector('#dorksList');
     const summary = container.querySelector('#dorksSummary');
     const empty = container.querySelector('#dorksEmpty');
@@ -150,7 +151,10 @@
 
     // render cards
     list.innerHTML = dataArray.map((d, i) => createCardHTML(d, i)).join('');
-    if (summary) summary.textContent = `${dataArray.length} dorks — ${dataArray.filter(d => (d.results||[]).length>0).length} con resultados`;
+    if (summary) {
+      summary.textContent = `${dataArray.length} dorks — ${dataArray.filter(d => (d.results||[]).length>0).length} con resultados`;
+      if (cuota) summary.textContent += ` · cuota del día: ${cuota.used}/${cuota.budget} (quedan ${cuota.remaining})`;
+    }
 
     // bind events per card
     const cards = list.querySelectorAll('.card');
@@ -183,7 +187,7 @@
       // Render en el DOM
       const container = document.getElementById('dorksModule');
       if (!container) throw new Error('Contenedor #dorksModule no encontrado en el DOM.');
-      renderAll(container, dorksArray);
+      renderAll(container, dorksArray, Array.isArray(datos) ? null : datos.quota);
 
     } catch (err) {
       console.error('Error al renderizar Dorks:', err);
@@ -56,11 +56,11 @@
                 return;
             }
 
-            // Extraer todos los puertos del primer host
-            const host = datos[0];
-            const ports = host.ports || [];
+            // Un host, o todos los de una red (CIDR / rango): en ese caso cada puerto lleva su IP
+            const variosHosts = datos.length > 1;
+            const ports = datos.flatMap(host => (host.ports || []).map(p => ({ ...p, ip: host.ip })));
 
-            if (ports.length === 0) {
+            if (ports.length === 0 && !datos.some(host => host.extraports)) {
                 console.warn("No se encontraron puertos escaneados");
                 return;
             }
@@ -79,6 +79,16 @@
                 }
             });
 
+            // Con perfiles grandes los puertos no abiertos vienen resumidos por estado (extraports)
+            datos.forEach(host => {
+                Object.entries(host.extraports || {}).forEach(([estado, n]) => {
+                    if (estados.hasOwnProperty(estado)) {
+                        estados[estado] += n;
+                    }
+                });
+            });
+            const totalPuertos = estados.open + estados.closed + estados.filtered;
+
             // === 1. Crear gráfico de dona ===
             const chartEl = document.getElementById('nmapChart');
             if (!chartEl) {
@@ -110,7 +120,7 @@
                         },
                         title: { 
                             display: true, 
-                            text: `Puertos Escaneados: ${ports.length} total`,
+                            text: `Puertos Escaneados: ${totalPuertos} total`,
                             font: { size: 14, weight: 'bold' }
                         },
                         tooltip: {
@@ -118,7 +128,7 @@
                                 label: function(context) {
                                     const label = context.label || '';
                                     const value = context.parsed || 0;
-                                    const total = ports.length;
+                                    const total = totalPuertos;
                                     const percentage = ((value / total) * 100).toFixed(0);
                                     return `${label}: ${value} (${percentage}%)`;
                                 }
@@ -166,7 +176,7 @@
 
                 tbody.innerHTML += `
                     <tr class="${estadoClass}">
-                        <td class="border"><strong>${port.port}/${port.protocol}</strong></td>
+                        <td class="border"><strong>${variosHosts ? port.ip + ' ' : ''}${port.port}/${port.protocol}</strong></td>
                         <td class="border">${estadoBadge}</td>
                         <td class="border">${servicio}</td>
                         <td class="border" style="font-size: 0.80rem;">${producto}</td>
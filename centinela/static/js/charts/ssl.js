@@ -56,6 +56,12 @@
                 return;
             }
 
+            // === Modo barrido: varios certificados (puertos x nombres SNI) ===
+            if (Array.isArray(datos.certificates)) {
+                renderBarrido(datos);
+                return;
+            }
+
             // === Verificar validez del certificado ===
             const daysToExpire = datos.days_to_expire || 0;
             const isExpired = datos.expired || false;
@@ -176,9 +182,41 @@
                     campo: 'Algoritmo', 
                     valor: datos.signature_algorithm || '—',
                     class: ''
+                },
+                {
+                    campo: 'Protocolo',
+                    valor: datos.tls?.protocol || '—',
+                    class: ''
+                },
+                {
+                    campo: 'Cifrado',
+                    valor: datos.tls?.cipher ? `${datos.tls.cipher} (${datos.tls.bits} bits)` : '—',
+                    class: ''
                 }
             ];
 
+            // Modo extendido: cadena presentada y lo que acepta el servidor
+            if (datos.chain) {
+                info.push({
+                    campo: 'Cadena',
+                    valor: datos.chain.map(c => c.subject?.commonName?.[0] || c.sha256.slice(0, 16)).join('<br>↳ '),
+                    class: ''
+                });
+            }
+            const obsoletos = ['TLSv1', 'TLSv1.1', '3DES', 'RC4', 'NULL'];
+            [['protocols', 'Protocolos'], ['cipher_groups', 'Cifrados']].forEach(([clave, campo]) => {
+                if (!datos[clave]) return;
+                const aceptados = Object.entries(datos[clave]).filter(([, r]) => r.supported).map(([n]) => n);
+                const inseguros = aceptados.some(n => obsoletos.includes(n));
+                info.push({
+                    campo: campo,
+                    valor: aceptados.map(n => obsoletos.includes(n)
+                        ? `<span class="badge bg-danger">${n}</span>`
+                        : `<span class="badge bg-secondary">${n}</span>`).join(' ') || '—',
+                    class: inseguros ? 'table-danger' : ''
+                });
+            });
+
             info.forEach(item => {
                 tbody.innerHTML += `
                     <tr class="${item.class}">
@@ -212,6 +250,72 @@
         }
     }
 
+    /**
+     * Modo barrido: un gráfico con los días restantes de cada certificado y una fila
+     * por certificado con los puertos / nombres SNI que lo presentaron.
+     */
+    function renderBarrido(datos) {
+        const certs = datos.certificates;
+        const nombre = c => c.subject?.commonName?.[0] || c.sha256.slice(0, 16);
+        const color = c => c.expired ? '#dc3545' : (c.days_to_expire || 0) <= 30 ? '#ffc107' : '#28a745';
+
+        const chartEl = document.getElementById('sslChart');
+        if (!chartEl) {
+            throw new Error("Elemento canvas no encontrado en el DOM.");
+        }
+        new Chart(chartEl, {
+            type: 'bar',
+            data: {
+                labels: certs.map(nombre),
+                datasets: [{
+                    label: 'Días restantes',
+                    data: certs.map(c => c.days_to_expire || 0),
+                    backgroundColor: certs.map(color),
+                    borderWidth: 0
+                }]
+            },
+            options: {
+                indexAxis: 'y',
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: { display: false },
+                    title: {
+                        display: true,
+                        text: `${certs.length} certificados en ${Object.values(datos.ports || {}).filter(e => e === 'tls').length} puertos TLS`,
+                        font: { size: 14, weight: 'bold' }
+                    }
+                }
+            }
+        });
+
+        const tbody = document.getElementById('sslTableBody');
+        if (!tbody) {
+            throw new Error("Elemento tbody no encontrado en el DOM.");
+        }
+        tbody.innerHTML = '';
+        certs.forEach(c => {
+            const endpoints = c.endpoints
+                .map(e => `<span class="badge bg-secondary">${e.port} ${e.sni}</span>`)
+                .join(' ');
+            tbody.innerHTML += `
+                <tr class="${c.expired ? 'table-danger' : (c.days_to_expire || 0) <= 30 ? 'table-warning' : ''}">
+                    <td class="border"><strong>${nombre(c)}</strong><br><small>${c.issuer?.organizationName?.[0] || ''} · ${c.days_to_expire ?? '—'} días</small></td>
+                    <td class="border" style="font-size: 0.85rem;">${endpoints}</td>
+                </tr>
+            `;
+        });
+        if (certs.length === 0) {
+            tbody.innerHTML = `
+                <tr>
+                    <td colspan="2" class="text-center text-muted py-3">
+                        <em>Ningún puerto respondió con TLS</em>
+                    </td>
+                </tr>
+            `;
+        }
+    }
+
     // Registrar en el namespace global
     window.Visuals = window.Visuals || {};
     window.Visuals["ssl"] = initGraficosSSL;
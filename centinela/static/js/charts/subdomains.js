@@ -0,0 +1,56 @@
+/**
+ * Función para inicializar la vista del módulo de subdominios.
+ * @param {Object} datos - JSON de resultados del módulo de subdominios.
+ */
+(function() {
+    function initGraficosSubdomains(datos) {
+        try {
+            console.log("(desde subdomains.js) Datos recibidos para subdominios:", datos);
+
+            if (!datos || !datos.subdomains || !datos.meta) {
+                console.warn("Módulo aún en proceso, datos incompletos.");
+                return;
+            }
+
+            // === 1. Resumen ===
+            const resumen = document.getElementById('subdomainsResumen');
+            if (resumen) {
+                const comodin = datos.wildcard && datos.wildcard.length > 0
+                    ? `DNS comodín detectado (${datos.wildcard.join(', ')}), filtrado.`
+                    : 'Sin DNS comodín.';
+                resumen.textContent = `${datos.meta.found} encontrados de ${datos.meta.tested} probados `
+                    + `(${datos.meta.qps ?? '—'} consultas/s). ${comodin}`;
+            }
+
+            // === 2. Llenar tabla ===
+            const tbody = document.getElementById('subdomainsTableBody');
+            if (!tbody) {
+                throw new Error("Elemento tbody no encontrado en el DOM.");
+            }
+
+            tbody.innerHTML = ''; // limpiar contenido previo
+            datos.subdomains.forEach(sub => {
+                tbody.innerHTML += `
+                    <tr>
+                    <td class="border">${sub.name}</td>
+                    <td class="border">${sub.ips.join('<br>')}</td>
+                    </tr>
+                `;
+            });
+
+        } catch (err) {
+            console.error("Error al renderizar subdominios:", err);
+
+            const tbody = document.getElementById('subdomainsTableBody');
+            const container = tbody?.closest('.bg-light')?.querySelector('.container-errores');
+            if (container) {
+                container.innerHTML = `<strong class="fw-bold">Error:</strong>
+                    <span class="block sm:inline">⚠️ Error al renderizar datos: ${err.message}</span>`;
+                container.classList.remove('d-none');
+            }
+        }
+    }
+// Registrar en el namespace global
+window.Visuals = window.Visuals || {};
+window.Visuals["subdomains"] = initGraficosSubdomains;
+})();
@@ -133,11 +133,11 @@
                 }
             });
 
-            // === 2. Extraer información del registrante del campo raw ===
-            let registrantName = '—';
-            let registrantOrg = '—';
+            // === 2. Información del registrante (los resultados antiguos la traen solo en raw) ===
+            let registrantName = datos.registrant || '—';
+            let registrantOrg = datos.registrant_org || '—';
             
-            if (datos.raw) {
+            if (typeof datos.raw === 'string') {
                 const nameMatch = datos.raw.match(/Registrant name:\s*(.+)/i);
                 const orgMatch = datos.raw.match(/Registrant organisation:\s*(.+)/i);
                 
@@ -222,6 +222,16 @@
                 }
             ];
 
+            // El texto crudo está guardado aparte y comprimido: se pide solo si el usuario lo abre
+            if (datos.raw && datos.raw.texto) {
+                info.push({
+                    campo: 'Texto WHOIS',
+                    valor: `<button type="button" class="btn btn-sm btn-outline-secondary whois-raw" data-texto="${datos.raw.texto}">Ver (${Math.ceil(datos.raw.bytes / 1024)} KB)</button>
+                            <pre class="whois-raw-texto d-none mt-2 mb-0" style="max-height: 300px; overflow: auto; font-size: 0.75rem;"></pre>`,
+                    class: ''
+                });
+            }
+
             info.forEach(item => {
                 tbody.innerHTML += `
                     <tr class="${item.class}">
@@ -231,6 +241,25 @@
                 `;
             });
 
+            tbody.querySelectorAll('.whois-raw').forEach(boton => {
+                boton.addEventListener('click', async () => {
+                    const pre = boton.nextElementSibling;
+                    if (!pre.textContent) {
+                        boton.disabled = true;
+                        try {
+                            const resp = await fetch(`/textos/${boton.dataset.texto}/`, {
+                                credentials: 'same-origin',
+                                headers: { 'Accept': 'application/json' }
+                            });
+                            pre.textContent = resp.ok ? (await resp.json()).texto : 'No se pudo cargar el texto';
+                        } finally {
+                            boton.disabled = false;
+                        }
+                    }
+                    pre.classList.toggle('d-none');
+                });
+            });
+
         } catch (err) {
             console.error("Error al renderizar gráficos WHOIS:", err);
             